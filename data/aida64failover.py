@@ -0,0 +1,70 @@
+#
+# aida64failover - Picks which of several redundant AIDA64 SSE endpoints feeds the dash
+# ====================================================================================
+#
+# Author: Adam J. Bauman (https://gist.github.com/adambauman)
+#
+# Every endpoint is read at once on the IORuntime loop, only frames from the active one are parsed
+# and published. The list order is the preference, a frame from a higher priority endpoint takes
+# over straight away, a lower priority one only takes over once the active endpoint drops or goes
+# quiet for failover_seconds. Standbys are already streaming when that happens so the switch costs one frame.
+#
+
+class AIDA64Endpoint:
+    def __init__(self, index, address):
+        assert(0 != len(address))
+
+        self.index = index
+        self.address = address
+        self.last_frame_time = None
+        self.frame_count = 0
+        self.connection_count = 0
+
+    def is_healthy(self, now, failover_seconds):
+        return self.last_frame_time is not None and failover_seconds > now - self.last_frame_time
+
+class AIDA64Failover:
+
+    def __init__(self, addresses, failover_seconds=1.0):
+        assert(0 != len(addresses))
+        assert(0 < failover_seconds)
+
+        self.endpoints = [AIDA64Endpoint(index, address) for index, address in enumerate(addresses)]
+        self.failover_seconds = failover_seconds
+        self.active_index = 0
+        self.switch_count = 0
+
+    def __switch__(self, endpoint):
+        if __debug__:
+            print("AIDA64 failover from {} to {}".format(
+                self.endpoints[self.active_index].address, endpoint.address))
+
+        self.active_index = endpoint.index
+        self.switch_count += 1
+
+    def accept(self, endpoint, now):
+        # Call for every frame received, True if it should go to the dash
+        endpoint.last_frame_time = now
+        endpoint.frame_count += 1
+        if endpoint.index == self.active_index:
+            return True
+
+        if endpoint.index < self.active_index or \
+            not self.endpoints[self.active_index].is_healthy(now, self.failover_seconds):
+            self.__switch__(endpoint)
+            return True
+
+        return False
+
+    def dropped(self, endpoint, now):
+        # Returns True if the dash lost its feed, False if a standby took over or it wasn't active
+        endpoint.last_frame_time = None
+        if endpoint.index != self.active_index:
+            return False
+
+        for standby in self.endpoints:
+            if standby.is_healthy(now, self.failover_seconds):
+                self.__switch__(standby)
+                return False
+
+        return True
@@ -0,0 +1,146 @@
+#
+# aida64layout - Reads the field schema out of an AIDA64 RemoteSensor LCD layout export (.rslcd)
+# =============================================================================================
+#
+# Author: Adam J. Bauman (https://gist.github.com/adambauman)
+#
+# The export is plain text, one item per line inside <LCDPAGEn> blocks:
+#   <ID>[SIMPLE]TCPU</ID>...<SHWLBL>1</SHWLBL><LBL>cpu_temp</LBL><SHWUNT>0</SHWUNT><UNT>°C</UNT>...
+# Simple items stream as "SimpleN|<label> <value>", so the label is the field name the dash sees.
+#
+
+import sys, getopt
+import os
+import re
+
+from .dataobjects import DataField, DashData
+
+class AIDA64LayoutItem:
+    def __init__(self, sensor_id, field_name, page_index, show_label=True, show_unit=False, unit_text=""):
+        self.sensor_id = sensor_id
+        self.field_name = field_name
+        self.page_index = page_index
+        self.show_label = show_label
+        self.show_unit = show_unit
+        self.unit_text = unit_text
+
+class AIDA64Layout:
+    default_layout_file = "assets/aida64_layouts/neuromancer_dash_export.rslcd"
+
+    _page_pattern = re.compile(r"<LCDPAGE(\d+)>")
+    _tag_pattern = re.compile(r"<(\w+)>([^<]*)</\1>")
+
+    # Parsed layouts keyed by (path, modified time)
+    _cache = {}
+
+    @classmethod
+    def load(class_object, layout_file=None):
+        # Returns the AIDA64LayoutItem list for every Simple item in the export
+        if layout_file is None:
+            layout_file = class_object.default_layout_file
+
+        cache_key = (os.path.abspath(layout_file), os.path.getmtime(layout_file))
+        layout_items = class_object._cache.get(cache_key)
+        if layout_items is not None:
+            return layout_items
+
+        layout_items = []
+        page_index = 0
+        # AIDA64 writes the export in the Windows codepage, the degree sign in units isn't UTF-8
+        with open(layout_file, "r", encoding="latin-1") as layout_stream:
+            for line in layout_stream:
+                page_match = class_object._page_pattern.search(line)
+                if page_match:
+                    page_index = int(page_match.group(1))
+                    continue
+
+                tags = dict(class_object._tag_pattern.findall(line))
+                sensor_id = tags.get("ID")
+                if sensor_id is None or not sensor_id.startswith("[SIMPLE]"):
+                    continue
+
+                field_name = tags.get("LBL", "").strip()
+                if 0 == len(field_name):
+                    continue
+
+                layout_items.append(AIDA64LayoutItem(
+                    sensor_id, field_name, page_index,
+                    "1" == tags.get("SHWLBL"), "1" == tags.get("SHWUNT"), tags.get("UNT", "")))
+
+        class_object._cache[cache_key] = layout_items
+        return layout_items
+
+    @classmethod
+    def layout_fields(class_object, layout_items):
+        # DataFields for the registry, types are left to the parser unless DashData declares them
+        layout_fields = []
+        for layout_item in layout_items:
+            if not layout_item.show_label:
+                # Without the label AIDA64 streams the bare value, the dash can't key it
+                if __debug__:
+                    print("Layout item {} doesn't show its label, skipping".format(layout_item.field_name))
+                continue
+
+            layout_fields.append(DataField(layout_item.field_name, layout_item.sensor_id, value_type=None))
+
+        return layout_fields
+
+    @classmethod
+    def compile_field_registry(class_object, layout_file=None):
+        # Builds the DashData registry from the layout, has to run before pages are built
+        layout_items = class_object.load(layout_file)
+        assert(0 != len(layout_items))
+
+        field_registry = DashData.field_registry(class_object.layout_fields(layout_items))
+
+        # Pages are numbered from 1 in the export and from 0 in the stream, <LCDPAGE1> streams as Page0
+        for layout_item in layout_items:
+            field_registry.set_field_page(layout_item.field_name, layout_item.page_index - 1)
+
+        if __debug__:
+            print("Compiled field schema from {}, {} layout field(s), {} slot(s)".format(
+                layout_file, len(layout_items), len(field_registry)))
+
+        return field_registry
+
+
+def print_usage():
+    print("")
+    print("Usage: python3 -m data.aida64layout --file <AIDA64 .rslcd export>")
+    print("Example: python3 -m data.aida64layout --file " + AIDA64Layout.default_layout_file)
+
+def get_command_args(argv):
+    layout_file = AIDA64Layout.default_layout_file
+    try:
+        opts, args = getopt.getopt(argv, "h", ["file="])
+
+    except getopt.GetoptError:
+        print_usage()
+        sys.exit(2)
+
+    for opt, arg in opts:
+        if opt == '-h':
+            print_usage()
+            sys.exit()
+        elif opt == "--file":
+            layout_file = arg
+
+    return layout_file
+
+def main(argv):
+    # Lists the layout fields and flags any DashData doesn't know about
+    layout_file = get_command_args(argv)
+    field_types = DashData.field_types()
+
+    for layout_item in AIDA64Layout.load(layout_file):
+        note = ""
+        if layout_item.field_name not in field_types:
+            note = " (not a DashData field)"
+        elif not layout_item.show_label:
+            note = " (label hidden, won't stream a key)"
+
+        print("Page {} {:<22} {}{}".format(layout_item.page_index - 1, layout_item.sensor_id, layout_item.field_name, note))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -6,15 +6,135 @@
 #
 
 import sys, getopt
-from time import sleep
+import re
+import asyncio
+from time import time, perf_counter
+from urllib.parse import urlsplit
 
-from sseclient import SSEClient
+from .dataobjects import DashData, DashSample
+from .capturelog import CaptureLogWriter
+from .linkstate import LinkStatus, ReconnectBackoff
+from .aida64failover import AIDA64Failover
 
 if __debug__:
     import traceback
 
+class AIDA64SSEProtocol(asyncio.Protocol):
+    # Receives straight into one growing buffer and cuts complete events out of it, no per-line
+    # objects. Events that are a single "data:" line, which is all AIDA64 sends, are decoded once
+    # from the buffer and handed to on_payload. Anything else takes the general path.
+
+    def __init__(self, on_payload):
+        self.on_payload = on_payload
+        self.closed = asyncio.get_running_loop().create_future()
+        self.last_receive_time = 0.0
+
+        self._loop = asyncio.get_running_loop()
+        self._transport = None
+        self._buffer = bytearray()
+        self._headers_done = False
+        self._event_end = None
+
+    def connection_made(self, transport):
+        self._transport = transport
+        self.last_receive_time = self._loop.time()
+
+    def connection_lost(self, exception):
+        if not self.closed.done():
+            self.closed.set_result(exception or ConnectionError("AIDA64 SSE stream dropped"))
+
+    def __fail__(self, reason):
+        if not self.closed.done():
+            self.closed.set_result(ConnectionError(reason))
+        self._transport.close()
+
+    def __read_headers__(self):
+        header_end = self._buffer.find(b"\r\n\r\n")
+        separator_length = 4
+        if -1 == header_end:
+            header_end = self._buffer.find(b"\n\n")
+            separator_length = 2
+            if -1 == header_end:
+                return False
+
+        status_line = bytes(self._buffer[:self._buffer.find(b"\n")]).strip()
+        if b" 200" not in status_line:
+            self.__fail__("AIDA64 SSE request failed: {}".format(status_line))
+            return False
+
+        if b"chunked" in self._buffer[:header_end].lower():
+            self.__fail__("Chunked SSE responses aren't supported")
+            return False
+
+        del self._buffer[:header_end + separator_length]
+        self._headers_done = True
+        return True
+
+    @staticmethod
+    def __event_payload__(event):
+        # General path for multi-line events, comments, ids, etc. Data lines join with newlines.
+        data_lines = []
+        for line in event.decode("utf-8", errors="replace").splitlines():
+            if line.startswith("data:"):
+                line = line[5:]
+                data_lines.append(line[1:] if line.startswith(" ") else line)
+
+        return "\n".join(data_lines)
+
+    def data_received(self, data):
+        self.last_receive_time = self._loop.time()
+
+        buffer = self._buffer
+        buffer += data
+        if not self._headers_done and not self.__read_headers__():
+            return
+
+        event_end = self._event_end
+        if event_end is None:
+            # Servers end events with a blank line using either newline style, lock in whichever
+            # the first event uses instead of searching for both every time
+            crlf_end = buffer.find(b"\r\n\r\n")
+            lf_end = buffer.find(b"\n\n")
+            if -1 == crlf_end and -1 == lf_end:
+                return
+            if -1 != crlf_end and (-1 == lf_end or crlf_end < lf_end):
+                event_end = b"\r\n\r\n"
+            else:
+                event_end = b"\n\n"
+            self._event_end = event_end
+
+        event_start = 0
+        end_length = len(event_end)
+        while True:
+            event_stop = buffer.find(event_end, event_start)
+            if -1 == event_stop:
+                break
+
+            if buffer.startswith(b"data: ", event_start) and -1 == buffer.find(b"\n", event_start, event_stop):
+                payload = buffer[event_start + 6:event_stop].decode("utf-8", errors="replace")
+            else:
+                payload = self.__event_payload__(bytes(buffer[event_start:event_stop]))
+
+            event_start = event_stop + end_length
+            self.on_payload(payload)
+
+        if 0 != event_start:
+            del buffer[:event_start]
+
 class AIDA64LCDSSE:
 
+    # Matches a single field, "Simple1|cpu_util 6{|}" captures the key and value
+    _item_pattern = re.compile(r"\|([^|{} ]+) ([^{]+)\{\|\}")
+
+    # Subscribed parsing, a pattern per subscription that only matches its keys, and per page the item
+    # count and keys of its last full scan with the keys a subscription skips
+    _subscribed_patterns = {}
+    _page_keys = {}
+
+    # Missing fields are reported once every page the layout lists has arrived and this long after the
+    # first frame, streamed pages the layout doesn't know about get that long to show up
+    missing_field_seconds = 5.0
+
     # TODO: (Adam) 2020-11-14 Very simple static class right now, could definitely tighten things up, use
     #       user-specified callbacks to send out data, etc.
 
@@ -71,8 +191,8 @@ class AIDA64LCDSSE:
         split_message_data = message_data.split("{|}")
         assert(0 != len(split_message_data))
 
-        # TODO: (Adam) 2020-11-14 Multi-page handling? Right now one page can fit a ton of data but it
-        #       could be split into multiple pages to decrease the size of the stream packet.
+        # Multi-page streams are handled by __parse_typed_data__ and DashSample page merging, this
+        # only returns the fields from the one page
 
         # First item should be the page name, process it seperatly
         page_name = split_message_data.pop(0)
@@ -108,48 +228,335 @@ class AIDA64LCDSSE:
 
         return parsed_datas
 
+    @staticmethod
+    def __type_number_text__(value_text, value_type=None):
+        # Returns an int or float if the text converts, otherwise hands back the text untouched
+        if value_type is not None:
+            try:
+                return value_type(value_text)
+            except ValueError:
+                # Fall through and take whatever the data looks like
+                pass
+
+        if value_text.isdigit():
+            return int(value_text)
+
+        try:
+            return float(value_text)
+        except ValueError:
+            return value_text
+
     @classmethod
-    def threadable_stream_read(class_object, data_queue, aida64_lcd_sse_address):
-        assert(data_queue is not None)
-        assert(aida64_lcd_sse_address is not None)
-        assert(0 != len(aida64_lcd_sse_address))
+    def __type_value_text__(class_object, value_text, value_type=None):
+        # Slow path for anything that isn't a plain number
+        value_text = value_text.strip()
+        if -1 == value_text.find(" "):
+            if str is value_type:
+                return value_text
+            return class_object.__type_number_text__(value_text, value_type)
+
+        # Desktop resolution reporting is inconsistant, sometimes it's split into width, "x", and height.
+        # Glom it together like __extract_single_item_data__ does unless it's a number with a unit
+        # suffix (3.344 V), in that case drop the suffix.
+        split_value_text = value_text.split()
+        if str is not value_type and 2 == len(split_value_text) and split_value_text[1].isalpha():
+            value = class_object.__type_number_text__(split_value_text[0], value_type)
+            if not isinstance(value, str):
+                return value
+
+        return "".join(split_value_text)
+
+    @classmethod
+    def __parse_typed_data__(
+        class_object, message_data, field_types=None, parse_failures=None, subscribed_fields=None, skipped_fields=None):
+        # Single pass alternative to __parse_data__. One regex scan pulls every key and value out of
+        # the message instead of building split lists per field, values come back as ints, floats, or
+        # strings. Passing field_types ({key: int/float/str}) skips guessing the type, keys whose text
+        # didn't convert to their numeric type are dropped and appended to parse_failures if it's passed.
+        # With subscribed_fields (a frozenset of names) only those items are matched, the keys of the
+        # rest are appended to skipped_fields if that's passed, see __subscribed_items__.
+        # Example data: 'Page0|{|}Simple1|cpu_util 6{|}Simple2|cpu_temp 32{|}'
+        assert(0 != len(message_data))
+        assert(message_data.startswith("Page"))
+
+        if subscribed_fields is None:
+            items = class_object._item_pattern.findall(message_data)
+        else:
+            items = class_object.__subscribed_items__(message_data, subscribed_fields, skipped_fields)
+
+        type_value_text = class_object.__type_value_text__
+        parsed_datas = {}
+        for key, value_text in items:
+            value_type = None
+            if field_types is not None:
+                value_type = field_types.get(key)
 
-        retry_attempts = 0
-        while True:
             try:
-                if __debug__:
-                    print("Making SSE AIDA64 connection...")
+                if value_type is None:
+                    if value_text.isdigit():
+                        value = int(value_text)
+                    else:
+                        value = float(value_text)
+                elif str is value_type:
+                    value = type_value_text(value_text, value_type)
+                else:
+                    value = value_type(value_text)
+            except ValueError:
+                # Unit suffixes, split values, plain strings
+                value = type_value_text(value_text, value_type)
+                if value_type is not None and isinstance(value, str):
+                    # Typed as a number but the text wasn't one, leave it out so readers see the field
+                    # as missing instead of comparing against a string
+                    if parse_failures is not None:
+                        parse_failures.append(key)
+                    continue
+
+            parsed_datas[key] = value
+
+        return parsed_datas
+
+    @classmethod
+    def __subscribed_items__(class_object, message_data, subscribed_fields, skipped_fields=None):
+        # Returns (key, value text) for subscribed keys only, the rest of the values are never sliced
+        # out of the message. Skipped keys come from the page's last full scan as long as it still
+        # sends the same number of items and every subscribed key found was in it.
+        if 0 == len(subscribed_fields):
+            items = []
+        else:
+            pattern = class_object._subscribed_patterns.get(subscribed_fields)
+            if pattern is None:
+                pattern = re.compile(
+                    r"\|(" + "|".join(re.escape(key) for key in sorted(subscribed_fields)) + r") ([^{]+)\{\|\}")
+                class_object._subscribed_patterns[subscribed_fields] = pattern
+            items = pattern.findall(message_data)
+
+        if skipped_fields is None:
+            return items
+
+        page_name = message_data[:message_data.index("|")]
+        item_count = message_data.count("{|}")
+        page_keys = class_object._page_keys.get(page_name)
+        if page_keys is None or item_count != page_keys[0] or not all(key in page_keys[1] for key, value_text in items):
+            # First frame of the page or its layout changed, AIDA64 sends each page's items the same way every frame
+            page_keys = [item_count, frozenset(key for key, value_text in class_object._item_pattern.findall(message_data)), None, None]
+            class_object._page_keys[page_name] = page_keys
+
+        if subscribed_fields is not page_keys[2]:
+            page_keys[2] = subscribed_fields
+            page_keys[3] = tuple(key for key in page_keys[1] if key not in subscribed_fields)
+        skipped_fields.extend(page_keys[3])
+
+        return items
+
+    @staticmethod
+    def page_index(message_data):
+        # AIDA64 numbers the streamed pages from zero, 'Page1|{|}Simple1|...' is 1
+        return int(message_data[4:message_data.index("|")])
+
+    @staticmethod
+    def __capture_message__(capture_stream, message_data, timestamp):
+        # Captures stay in the SSE text format so they replay the same as stream_response_example.txt,
+        # receive time rides along as an SSE comment line that clients ignore.
+        capture_stream.write(": {:.3f}\ndata: {}\n\n".format(timestamp, message_data))
+
+    @staticmethod
+    async def read_sse(address, on_payload, connect_timeout=2.0, read_timeout=5.0):
+        # Minimal SSE client, calls on_payload(data) for each event and only returns by raising:
+        # ConnectionError when the stream drops or read_timeout passes without any bytes arriving.
+        # AIDA64 sends a plain unchunked response that stays open.
+        url = urlsplit(address)
+        path = url.path or "/"
+        if url.query:
+            path += "?" + url.query
+
+        loop = asyncio.get_running_loop()
+        transport, protocol = await asyncio.wait_for(
+            loop.create_connection(lambda : AIDA64SSEProtocol(on_payload), url.hostname, url.port or 80),
+            connect_timeout)
+        try:
+            transport.write((
+                "GET {} HTTP/1.1\r\nHost: {}\r\nAccept: text/event-stream\r\nCache-Control: no-cache\r\n\r\n"
+                ).format(path, url.netloc).encode("latin-1"))
+
+            # The protocol only stamps the time it last received, waking up when the stream could
+            # have gone quiet beats re-arming a timer for every chunk
+            while True:
+                quiet_seconds = loop.time() - protocol.last_receive_time
+                if read_timeout <= quiet_seconds:
+                    raise ConnectionError("AIDA64 SSE stream quiet for {}s".format(read_timeout))
+
+                try:
+                    await asyncio.wait_for(asyncio.shield(protocol.closed), read_timeout - quiet_seconds)
+                except asyncio.TimeoutError:
+                    continue
+
+                # closed resolves with the reason the stream ended
+                raise protocol.closed.result()
+        finally:
+            transport.close()
+
+    @classmethod
+    async def __read_endpoint__(
+        class_object, endpoint, on_message, on_drop, connect_timeout=2.0, reconnect_after_seconds=5.0):
+        # Connection loop for one endpoint, runs until cancelled. Owns reconnects, every drop goes
+        # through on_drop(endpoint, retry_delay) before backing off.
+        backoff = ReconnectBackoff()
 
-                server_messages = SSEClient(aida64_lcd_sse_address, timeout=1.0)
+        def on_payload(message_data):
+            if 0 == len(message_data):
+                return
 
+            if "reload" == message_data.lower():
                 if __debug__:
-                    print("Connection successful!")
+                    print("Encountered reload message")
+
+                # The layout changed, pages are scanned in full again for their keys
+                class_object._page_keys.clear()
+                return
+
+            # Only a connection that delivers frames resets the backoff, a server that accepts
+            # and immediately drops keeps backing off
+            if 0 != backoff.attempt:
+                backoff.reset()
 
-                retry_attempts = 0
-                for server_message in server_messages:
-                    if 0 == len(server_message.data) or server_message.data is None:
-                        continue
+            on_message(endpoint, message_data)
 
-                    if "reload" == server_message.data.lower():
-                        if __debug__:
-                            print("Encountered reload message")
-                        continue
+        while True:
+            try:
+                if __debug__:
+                    print("Making SSE AIDA64 connection to {}...".format(endpoint.address))
 
-                    parsed_data = class_object.__parse_data__(server_message.data)
-                    assert(0 != len(parsed_data))
+                endpoint.connection_count += 1
 
-                    data_queue.append(parsed_data)
+                # Read timeout is how long a quiet stream is held open before it's dropped and retried
+                await class_object.read_sse(endpoint.address, on_payload, connect_timeout, reconnect_after_seconds)
+            except asyncio.CancelledError:
+                raise
             except:
                 if __debug__:
-                    print("Stream read excepted, will restart connection in two seconds...")
+                    print("Stream read from {} excepted, reconnecting...".format(endpoint.address))
                     traceback.print_exc()
 
-                # Back off retries after a few quick attempts
-                if 50 < retry_attempts:
-                    sleep(10)
-                else:
-                    sleep(0.1)
+            retry_delay = backoff.next_delay()
+            on_drop(endpoint, retry_delay)
+            if __debug__:
+                print("Reconnect attempt {} to {} in {:.2f}s".format(backoff.attempt, endpoint.address, retry_delay))
+            await asyncio.sleep(retry_delay)
+
+    @classmethod
+    async def stream_read(
+        class_object, data_queue, aida64_lcd_sse_address, capture_file=None, capture_log_file=None, metrics=None,
+        link_status=None, connect_timeout=2.0, reconnect_after_seconds=5.0, failover_seconds=1.0):
+        # IORuntime source. aida64_lcd_sse_address can be a list of redundant endpoints in order of
+        # preference, all of them are read and the healthiest feeds data_queue, see AIDA64Failover.
+        # link_status (LinkStatus) is told about every frame and every lost feed so the render loop
+        # can react without counting empty polls.
+        assert(data_queue is not None)
+        assert(aida64_lcd_sse_address is not None)
+        assert(0 != len(aida64_lcd_sse_address))
 
+        addresses = aida64_lcd_sse_address
+        if isinstance(addresses, str):
+            addresses = [addresses]
+
+        # Optionally record the raw session for AIDA64Replay, line buffered so a killed dash keeps its frames
+        capture_stream = None
+        if capture_file is not None:
+            capture_stream = open(capture_file, "a", buffering=1)
+
+        # Binary log of the parsed frames, much smaller than the text capture for long runs
+        capture_log = None
+        if capture_log_file is not None:
+            capture_log = CaptureLogWriter(capture_log_file)
+
+        if link_status is None:
+            link_status = LinkStatus()
+
+        failover = AIDA64Failover(addresses, failover_seconds)
+        field_registry = DashData.field_registry()
+        field_types = DashData.field_types()
+        previous_sample = None
+        first_frame_time = None
+        missing_fields_checked = False
+
+        def on_message(endpoint, message_data):
+            nonlocal previous_sample, first_frame_time, missing_fields_checked
+
+            received_time = time()
+            # Standby frames only keep the endpoint's health current, they're never parsed
+            if not failover.accept(endpoint, received_time):
+                return
+
+            # Convert to typed values once here, elements use the numbers directly. Samples
+            # carry the fields that changed since the last one so pages can skip the rest.
+            if capture_stream is not None:
+                class_object.__capture_message__(capture_stream, message_data, received_time)
+
+            # Only decode what the visible dash page reads, the binary log needs every field
+            subscribed_fields = None
+            skipped_fields = None
+            if capture_log is None:
+                subscribed_fields = field_registry.active_fields
+                skipped_fields = []
+
+            parse_failures = []
+            parse_start = perf_counter()
+            page_index = class_object.page_index(message_data)
+            parsed_data = class_object.__parse_typed_data__(
+                message_data, field_types, parse_failures, subscribed_fields, skipped_fields)
+            if metrics is not None:
+                metrics.record_frame(perf_counter() - parse_start)
+
+            # Check the first frame of each page against the layout
+            if page_index not in field_registry.page_frame_counts:
+                arrived_fields = set(parsed_data)
+                if skipped_fields:
+                    arrived_fields.update(skipped_fields)
+                for warning in field_registry.validate_frame(arrived_fields, page_index):
+                    print("Field warning: Page{} {}".format(page_index, warning))
+
+            link_status.frame_received(received_time)
+
+            # Pages are merged into one sample, each frame only marks what its own page changed
+            previous_sample = DashSample(
+                parsed_data, received_time, previous_sample, page_index, skipped_fields, subscribed_fields)
+            field_registry.record_frame(previous_sample, parse_failures)
+            data_queue.publish(previous_sample)
+
+            # Fields can arrive on any page, only call one missing after every page had its chance
+            if first_frame_time is None:
+                first_frame_time = received_time
+            if not missing_fields_checked and field_registry.has_seen_all_pages() and \
+                    class_object.missing_field_seconds <= received_time - first_frame_time:
+                missing_fields_checked = True
+                for warning in field_registry.missing_field_warnings():
+                    print("Field warning: {}".format(warning))
+
+            # Log the merged values so every record replays on its own, columns are fixed by the
+            # first record so hold off until every page the layout lists has arrived
+            if capture_log is not None and field_registry.has_seen_all_pages():
+                capture_log.append(previous_sample.values, received_time)
+
+        def on_drop(endpoint, retry_delay):
+            # A standby dropping, or the active one with a standby ready to take over, isn't an outage
+            if not failover.dropped(endpoint, time()):
+                return
+
+            # Optional IngestionMetrics, counts every attempt made while the dash has no feed
+            if metrics is not None:
+                metrics.record_reconnect()
+            link_status.reconnecting(retry_delay)
+
+        # Every endpoint is read concurrently on the runtime's loop
+        try:
+            await asyncio.gather(*(
+                class_object.__read_endpoint__(endpoint, on_message, on_drop, connect_timeout, reconnect_after_seconds)
+                for endpoint in failover.endpoints))
+        finally:
+            if capture_stream is not None:
+                capture_stream.close()
+            if capture_log is not None:
+                capture_log.close()
 
 
 def print_usage():
@@ -0,0 +1,203 @@
+#
+# aida64replay - Replays a captured AIDA64 LCD SSE session in place of the live stream
+# ====================================================================================
+#
+# Author: Adam J. Bauman (https://gist.github.com/adambauman)
+#
+# Captures are plain SSE text, either recorded with --capture or a raw response like
+# assets/aida64_layouts/stream_response_example.txt. Frames recorded by the dash are preceded by a
+# ": <receive time>" comment line, frames without one are spaced default_interval seconds apart.
+# Binary logs recorded with --capturelog are also accepted, see capturelog.py.
+#
+
+import sys, getopt
+import asyncio
+from time import time
+
+from .aida64lcdsse import AIDA64LCDSSE
+from .dataobjects import DashData, DashSample
+from .capturelog import CaptureLog, CaptureLogReader
+
+class AIDA64Replay:
+
+    # AIDA64's usual fastest LCD update interval
+    default_interval = 0.1
+
+    @classmethod
+    def load_frames(class_object, replay_file):
+        # Returns a list of (seconds from first frame, message data)
+        frames = []
+        capture_time = None
+        first_time = None
+        with open(replay_file, "r") as replay_stream:
+            for line in replay_stream:
+                line = line.rstrip("\r\n")
+
+                if line.startswith(":"):
+                    try:
+                        capture_time = float(line[1:])
+                    except ValueError:
+                        # Regular SSE comment, not one of ours
+                        pass
+                    continue
+
+                # Skips the HTTP response header, blank event separators, event/id fields, etc.
+                if not line.startswith("data:"):
+                    continue
+
+                message_data = line[len("data:"):]
+                if message_data.startswith(" "):
+                    message_data = message_data[1:]
+
+                if 0 == len(message_data) or "reload" == message_data.lower():
+                    continue
+
+                if capture_time is None:
+                    if 0 == len(frames):
+                        frame_offset = 0.0
+                    else:
+                        frame_offset = frames[-1][0] + class_object.default_interval
+                else:
+                    if first_time is None:
+                        first_time = capture_time
+                    frame_offset = capture_time - first_time
+
+                frames.append((frame_offset, message_data))
+                capture_time = None
+
+        return frames
+
+    @staticmethod
+    def is_capture_log(replay_file):
+        with open(replay_file, "rb") as replay_stream:
+            return replay_stream.read(len(CaptureLog.magic)) == CaptureLog.magic.encode("utf-8")
+
+    @staticmethod
+    def __capture_log_frames__(capture_log):
+        # Read in order each frame applies one record from the mapping, only the one being published becomes a dict
+        timestamps_ms = capture_log.timestamps_ms()
+        for frame_index in range(len(capture_log)):
+            # Logged frames are already merged across pages
+            yield timestamps_ms[frame_index] / 1000, capture_log.frame_values(frame_index), None
+
+    # Speed 0 polls for the renderer taking the last frame this often, seconds
+    taken_poll_interval = 0.0005
+
+    @classmethod
+    async def replay(class_object, data_queue, replay_file, speed=1.0, loop=True, metrics=None, link_status=None):
+        # IORuntime source, drop-in for AIDA64LCDSSE.stream_read. speed scales the captured timing, 2.0 plays
+        # twice as fast. A speed of 0 ignores timing and hands over frames as fast as the consumer takes
+        # them so every frame is drawn exactly once, handy for benchmarking pages on identical input.
+        assert(data_queue is not None)
+        assert(replay_file is not None)
+        assert(0 <= speed)
+
+        if class_object.is_capture_log(replay_file):
+            # Hours of frames, leave them in the mapping instead of loading everything
+            capture_log = CaptureLogReader(replay_file)
+            assert(0 != len(capture_log))
+
+            frame_count = len(capture_log)
+            last_offset = capture_log.timestamps_ms()[-1] / 1000
+            frames = lambda : class_object.__capture_log_frames__(capture_log)
+            frame_parse_failures = None
+        else:
+            # Parse everything up front, replay cost shouldn't depend on the parser and each pass is identical
+            field_types = DashData.field_types()
+            parsed_frames = []
+            frame_parse_failures = []
+            for frame_offset, message_data in class_object.load_frames(replay_file):
+                parse_failures = []
+                parsed_frames.append((
+                    frame_offset, AIDA64LCDSSE.__parse_typed_data__(message_data, field_types, parse_failures),
+                    AIDA64LCDSSE.page_index(message_data)))
+                frame_parse_failures.append(parse_failures)
+            assert(0 != len(parsed_frames))
+
+            frame_count = len(parsed_frames)
+            last_offset = parsed_frames[-1][0]
+            frames = lambda : iter(parsed_frames)
+
+        if __debug__:
+            print("Replaying {} frame(s) from {} at speed {}".format(frame_count, replay_file, speed))
+
+        # Looping picks back up one interval after the last frame
+        loop_length = last_offset + class_object.default_interval
+
+        field_registry = DashData.field_registry()
+        previous_sample = None
+        pass_offset = 0.0
+        start_time = time()
+        while True:
+            for frame_index, (frame_offset, parsed_data, page_index) in enumerate(frames()):
+                if 0 == speed:
+                    # Blocking on the mailbox would stall every other source on the loop
+                    while 0 != len(data_queue):
+                        await asyncio.sleep(class_object.taken_poll_interval)
+                else:
+                    # Schedule against the start time so sleep overshoot doesn't accumulate
+                    delay = start_time + ((pass_offset + frame_offset) / speed) - time()
+                    if 0 < delay:
+                        await asyncio.sleep(delay)
+
+                # Copy, the sample owns its values once published
+                received_time = time()
+                if metrics is not None:
+                    # Frames were parsed up front, only arrival timing is meaningful here
+                    metrics.record_frame()
+                if link_status is not None:
+                    link_status.frame_received(received_time)
+
+                previous_sample = DashSample(dict(parsed_data), received_time, previous_sample, page_index)
+                field_registry.record_frame(
+                    previous_sample, frame_parse_failures[frame_index] if frame_parse_failures else None)
+                data_queue.publish(previous_sample)
+
+            if not loop:
+                break
+
+            pass_offset += loop_length
+
+        if __debug__:
+            print("Replay finished")
+
+
+def print_usage():
+    print("")
+    print("Usage: python3 -m data.aida64replay --file <captured SSE stream>")
+    print("Example: python3 -m data.aida64replay --file assets/aida64_layouts/stream_response_example.txt")
+
+def get_command_args(argv):
+    replay_file = None
+    try:
+        opts, args = getopt.getopt(argv, "h", ["file="])
+
+    except getopt.GetoptError:
+        print_usage()
+        sys.exit(2)
+
+    for opt, arg in opts:
+        if opt == '-h':
+            print_usage()
+            sys.exit()
+        elif opt == "--file":
+            replay_file = arg
+
+    if replay_file is None:
+        print_usage()
+        sys.exit()
+
+    return replay_file
+
+def main(argv):
+    # Summarizes a text capture file, use capturelog.py for binary logs
+    replay_file = get_command_args(argv)
+    frames = AIDA64Replay.load_frames(replay_file)
+
+    print("{} frame(s) spanning {:.3f} seconds".format(len(frames), frames[-1][0] if 0 != len(frames) else 0))
+    if 0 != len(frames):
+        print("{} field(s) in the first frame".format(len(AIDA64LCDSSE.__parse_typed_data__(frames[0][1]))))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
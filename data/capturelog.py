@@ -0,0 +1,548 @@
+#
+# capturelog - Compact append-only binary log of parsed AIDA64 frames, read back through mmap
+# ===========================================================================================
+#
+# Author: Adam J. Bauman (https://gist.github.com/adambauman)
+#
+# Layout:
+#   Header, text padded with spaces to a 4 byte boundary:
+#       NDCAPLOG2
+#       <log start time, epoch seconds>
+#       <column count>
+#       <field_name>:<i|f|s>,... one column per field present in the first frame
+#   Records, little-endian, padded to a 4 byte boundary:
+#       uint32 milliseconds since log start
+#       uint32 record size in 4 byte units in the low 16 bits, flags above
+#       uint32 changed mask words, one bit per column that has a new value in this record
+#       uint32 absent mask words, with the flag, columns that stopped being reported
+#       uint32 wide mask words, with the flag, changed columns stored in 4 bytes
+#       One value per changed column in column order. Narrow values are int16, floats as
+#       thousandths. Wide values are int32, float32, or uint32 string indexes into <log file>.strings
+#
+# Only fields that changed since the previous record are written, a keyframe with every present
+# field starts each session and repeats every keyframe_interval records so readers can seek.
+# Records are 8 bytes plus 4 per 32 columns per mask plus 2 per changed field, 4 if it's wide.
+# With the stock 52 fields at 100ms that's ~5MB an hour if every field moves every frame like the
+# simulator's waveforms, AIDA64 only refreshes sensors every second or so, a real system is <1MB.
+# Reopening an existing log appends after its last complete record, the header has to match.
+#
+
+import sys, getopt
+import os
+import mmap
+import struct
+from array import array
+from bisect import bisect_right
+
+from .dataobjects import DashData
+
+class CaptureLog:
+    magic = "NDCAPLOG2"
+    type_codes = {int: "i", float: "f", str: "s"}
+
+    record_units_mask = 0xFFFF
+    keyframe_flag = 0x10000
+    absent_mask_flag = 0x20000
+    wide_mask_flag = 0x40000
+
+    # Narrow floats are fixed-point thousandths, AIDA64 never sends more than 3 decimals
+    fixed_point_scale = 1000
+
+    narrow_struct = struct.Struct("<h")
+    wide_structs = {"i": struct.Struct("<i"), "f": struct.Struct("<f"), "s": struct.Struct("<I")}
+
+    @staticmethod
+    def strings_file(log_file):
+        return log_file + ".strings"
+
+    @staticmethod
+    def mask_word_count(column_count):
+        return (column_count + 31) // 32
+
+    @staticmethod
+    def float32_value(value):
+        # float32 only holds ~7 significant digits, 12.024 comes back as 12.024000167846680
+        return float("{:.6g}".format(value))
+
+    @staticmethod
+    def mask_bits(mask_words):
+        # Column indexes set in the mask, lowest first
+        for mask_index, mask_word in enumerate(mask_words):
+            while 0 != mask_word:
+                low_bit = mask_word & -mask_word
+                yield (mask_index << 5) + low_bit.bit_length() - 1
+                mask_word ^= low_bit
+
+    @staticmethod
+    def read_header(mapping):
+        # Returns (start time, [(key, type_code), ...], records offset), raises ValueError if the
+        # data isn't a capture log in this format
+        if not mapping[:len(CaptureLog.magic) + 1] == (CaptureLog.magic + "\n").encode("utf-8"):
+            raise ValueError("Not a {} capture log".format(CaptureLog.magic))
+
+        # Four newline terminated lines then alignment padding
+        header_end = 0
+        for line_number in range(4):
+            header_end = mapping.find(b"\n", header_end) + 1
+            if 0 == header_end:
+                raise ValueError("Capture log header is truncated")
+
+        header_lines = mapping[:header_end].decode("utf-8").split("\n")
+        start_time = float(header_lines[1])
+        column_count = int(header_lines[2])
+
+        columns = []
+        for column in header_lines[3].split(","):
+            key, type_code = column.rsplit(":", 1)
+            if type_code not in CaptureLog.type_codes.values():
+                raise ValueError("Capture log column {} has unknown type {}".format(key, type_code))
+            columns.append((key, type_code))
+
+        if column_count != len(columns):
+            raise ValueError("Capture log header lists {} of {} column(s)".format(len(columns), column_count))
+
+        return start_time, columns, header_end + (-header_end % 4)
+
+    @staticmethod
+    def index_records(units):
+        # Walks the record headers, returns unit offsets, timestamps, keyframe record indexes and
+        # the units used. A partially written trailing record is left out.
+        record_offsets = array("I")
+        timestamps_ms = array("I")
+        keyframes = array("I")
+
+        unit_offset = 0
+        unit_count = len(units)
+        while unit_offset + 2 <= unit_count:
+            size_flags = units[unit_offset + 1]
+            record_units = size_flags & CaptureLog.record_units_mask
+            if 2 > record_units or unit_offset + record_units > unit_count:
+                break
+
+            if 0 != size_flags & CaptureLog.keyframe_flag:
+                keyframes.append(len(record_offsets))
+            record_offsets.append(unit_offset)
+            timestamps_ms.append(units[unit_offset])
+            unit_offset += record_units
+
+        return record_offsets, timestamps_ms, keyframes, unit_offset
+
+
+class CaptureLogWriter:
+    # Opens the log on the first appended frame. A new log takes its columns from that frame, an
+    # existing one keeps its own and fields it doesn't have are dropped.
+
+    keyframe_interval = 600
+
+    def __init__(self, log_file, flush_interval=10):
+        assert(log_file is not None)
+
+        self.log_file = log_file
+        self.flush_interval = flush_interval
+
+        self.frame_count = 0
+        self.dropped_field_count = 0
+
+        self._log_stream = None
+        self._strings_stream = None
+        self._strings = {}
+        self._columns = None
+        self._start_time = None
+        self._last_values = None
+        self._records_since_keyframe = 0
+
+    def __open__(self, values, timestamp):
+        if os.path.exists(self.log_file) and 0 != os.path.getsize(self.log_file):
+            self.__open_existing__()
+        else:
+            self.__create__(values, timestamp)
+
+        # Every session starts with a keyframe so it doesn't depend on what the last one wrote
+        self._last_values = {}
+        self._records_since_keyframe = self.keyframe_interval
+
+    def __create__(self, values, timestamp):
+        field_types = DashData.field_types()
+
+        # Column order follows the frame, anything DashData doesn't know is typed from the value
+        self._columns = []
+        for key, value in values.items():
+            value_type = field_types.get(key) or type(value)
+            if value_type not in CaptureLog.type_codes or not isinstance(value, (int, float, str)):
+                continue
+            self._columns.append((key, CaptureLog.type_codes[value_type]))
+
+        self._start_time = timestamp
+
+        header = "{}\n{:.3f}\n{}\n{}\n".format(
+            CaptureLog.magic, timestamp, len(self._columns),
+            ",".join("{}:{}".format(key, type_code) for key, type_code in self._columns))
+        header = header.encode("utf-8")
+        header += b" " * (-len(header) % 4)
+
+        self._log_stream = open(self.log_file, "wb")
+        self._strings_stream = open(CaptureLog.strings_file(self.log_file), "w", encoding="utf-8")
+        self._log_stream.write(header)
+
+    def __open_existing__(self):
+        # Refuse anything that doesn't parse rather than appending records it would misread
+        log_stream = open(self.log_file, "r+b")
+        try:
+            with mmap.mmap(log_stream.fileno(), 0, access=mmap.ACCESS_READ) as mapping:
+                self._start_time, self._columns, records_offset = CaptureLog.read_header(mapping)
+
+                field_types = DashData.field_types()
+                for key, type_code in self._columns:
+                    value_type = field_types.get(key)
+                    if value_type is not None and CaptureLog.type_codes.get(value_type) != type_code:
+                        raise ValueError("Capture log column {} is typed {}, DashData expects {}".format(
+                            key, type_code, CaptureLog.type_codes.get(value_type)))
+
+                records_end = len(mapping) - ((len(mapping) - records_offset) % 4)
+                units = memoryview(mapping)[records_offset:records_end].cast("I")
+                record_offsets, timestamps_ms, keyframes, records_units = CaptureLog.index_records(units)
+                units.release()
+        except:
+            log_stream.close()
+            raise
+
+        # Cut off a record the last session didn't finish
+        log_stream.truncate(records_offset + (records_units * 4))
+        log_stream.seek(0, os.SEEK_END)
+        self._log_stream = log_stream
+
+        strings_file = CaptureLog.strings_file(self.log_file)
+        if os.path.exists(strings_file):
+            with open(strings_file, "r", encoding="utf-8") as strings_stream:
+                for line in strings_stream:
+                    self._strings[line.rstrip("\n")] = len(self._strings)
+        self._strings_stream = open(strings_file, "a", encoding="utf-8")
+
+        if __debug__:
+            print("Appending to capture log {} after {} frame(s)".format(self.log_file, len(record_offsets)))
+
+    def __string_index__(self, value):
+        string_index = self._strings.get(value)
+        if string_index is None:
+            string_index = len(self._strings)
+            self._strings[value] = string_index
+
+            # One per line, AIDA64 values never contain newlines but don't let one break the sidecar
+            self._strings_stream.write(value.replace("\n", " ") + "\n")
+            self._strings_stream.flush()
+
+        return string_index
+
+    @staticmethod
+    def __narrow_value__(value, type_code):
+        # int16 the value fits in, None if it has to be stored wide
+        if "f" == type_code:
+            scaled_value = value * CaptureLog.fixed_point_scale
+            narrow_value = int(round(scaled_value))
+            if 1e-6 < abs(scaled_value - narrow_value):
+                return None
+        else:
+            narrow_value = value
+
+        return narrow_value if -32768 <= narrow_value <= 32767 else None
+
+    def append(self, values, timestamp):
+        assert(0 != len(values))
+
+        if self._log_stream is None:
+            self.__open__(values, timestamp)
+
+        keyframe = self.keyframe_interval <= self._records_since_keyframe
+        if keyframe:
+            self._last_values.clear()
+            self._records_since_keyframe = 0
+        self._records_since_keyframe += 1
+
+        mask_word_count = CaptureLog.mask_word_count(len(self._columns))
+        changed_mask = [0] * mask_word_count
+        absent_mask = [0] * mask_word_count
+        wide_mask = [0] * mask_word_count
+        has_absent = False
+        has_wide = False
+        packed_values = []
+        for column_index, (key, type_code) in enumerate(self._columns):
+            value = values.get(key)
+            if value is not None and "s" != type_code and isinstance(value, str):
+                # Typed as a number but AIDA64 sent text, leave it missing
+                value = None
+
+            if value is None:
+                if column_index in self._last_values:
+                    del self._last_values[column_index]
+                    absent_mask[column_index >> 5] |= 1 << (column_index & 31)
+                    has_absent = True
+                continue
+
+            if self._last_values.get(column_index) == value:
+                continue
+            self._last_values[column_index] = value
+
+            if "s" == type_code:
+                value = self.__string_index__(str(value))
+            elif "i" == type_code:
+                value = int(value)
+
+            narrow_value = self.__narrow_value__(value, type_code)
+            if narrow_value is not None:
+                packed_values.append(CaptureLog.narrow_struct.pack(narrow_value))
+            else:
+                packed_values.append(CaptureLog.wide_structs[type_code].pack(value))
+                wide_mask[column_index >> 5] |= 1 << (column_index & 31)
+                has_wide = True
+            changed_mask[column_index >> 5] |= 1 << (column_index & 31)
+
+        if len(values) > len(self._columns):
+            self.dropped_field_count += len(values.keys() - dict(self._columns).keys())
+
+        masks = changed_mask
+        size_flags = 0
+        if keyframe:
+            size_flags |= CaptureLog.keyframe_flag
+        if has_absent:
+            masks = masks + absent_mask
+            size_flags |= CaptureLog.absent_mask_flag
+        if has_wide:
+            masks = masks + wide_mask
+            size_flags |= CaptureLog.wide_mask_flag
+
+        packed_values = b"".join(packed_values)
+        packed_values += b"\0" * (-len(packed_values) % 4)
+        size_flags |= 2 + len(masks) + (len(packed_values) // 4)
+
+        elapsed_ms = max(0, int(round((timestamp - self._start_time) * 1000)))
+        self._log_stream.write(
+            struct.pack("<II{}I".format(len(masks)), elapsed_ms, size_flags, *masks) + packed_values)
+
+        self.frame_count += 1
+        if 0 == self.frame_count % self.flush_interval:
+            self._log_stream.flush()
+
+    def close(self):
+        if self._log_stream is not None:
+            self._log_stream.close()
+            self._strings_stream.close()
+            self._log_stream = None
+
+
+class CaptureLogReader:
+    # Maps the log read-only and indexes the record headers once. Frame count is fixed at open,
+    # reopen to see frames appended since. Frames are rebuilt from the nearest keyframe, reading
+    # them in order only applies one record each.
+
+    def __init__(self, log_file):
+        assert(log_file is not None)
+
+        self.log_file = log_file
+        with open(log_file, "rb") as log_stream:
+            self._mapping = mmap.mmap(log_stream.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self.start_time, header_columns, self._records_offset = CaptureLog.read_header(self._mapping)
+        self.columns = [key for key, type_code in header_columns]
+        self.column_types = [type_code for key, type_code in header_columns]
+        self.column_indexes = {key: index for index, key in enumerate(self.columns)}
+
+        self._mask_words = CaptureLog.mask_word_count(len(self.columns))
+
+        # Native order cast for the record headers, the writer is little-endian same as the Pi and x86
+        records_end = len(self._mapping) - ((len(self._mapping) - self._records_offset) % 4)
+        self._units = memoryview(self._mapping)[self._records_offset:records_end].cast("I")
+
+        self._record_offsets, self._timestamps_ms, self._keyframes, records_units = \
+            CaptureLog.index_records(self._units)
+        assert(0 == len(self._record_offsets) or (0 != len(self._keyframes) and 0 == self._keyframes[0]))
+
+        # Column values of the last frame rebuilt, frame_values() in order only applies one record
+        self._state = {}
+        self._state_index = None
+
+        self.strings = []
+        try:
+            with open(CaptureLog.strings_file(log_file), "r", encoding="utf-8") as strings_stream:
+                self.strings = [line.rstrip("\n") for line in strings_stream]
+        except FileNotFoundError:
+            pass
+
+    def __len__(self):
+        return len(self._record_offsets)
+
+    def timestamp(self, frame_index):
+        return self.start_time + (self._timestamps_ms[frame_index] / 1000)
+
+    def timestamps_ms(self):
+        # Milliseconds since start_time for every frame
+        return self._timestamps_ms
+
+    def __record_masks__(self, unit_offset):
+        # Returns (flags, changed, absent, wide mask words, byte offset of the first value)
+        size_flags = self._units[unit_offset + 1]
+        mask_offset = unit_offset + 2
+        changed_mask = self._units[mask_offset:mask_offset + self._mask_words]
+        mask_offset += self._mask_words
+
+        absent_mask = None
+        if 0 != size_flags & CaptureLog.absent_mask_flag:
+            absent_mask = self._units[mask_offset:mask_offset + self._mask_words]
+            mask_offset += self._mask_words
+
+        wide_mask = None
+        if 0 != size_flags & CaptureLog.wide_mask_flag:
+            wide_mask = self._units[mask_offset:mask_offset + self._mask_words]
+            mask_offset += self._mask_words
+
+        return size_flags, changed_mask, absent_mask, wide_mask, self._records_offset + (mask_offset * 4)
+
+    def __decode__(self, byte_offset, column_index, wide, raw_strings=False):
+        type_code = self.column_types[column_index]
+        if wide:
+            value = CaptureLog.wide_structs[type_code].unpack_from(self._mapping, byte_offset)[0]
+            if "f" == type_code:
+                value = CaptureLog.float32_value(value)
+        else:
+            value = CaptureLog.narrow_struct.unpack_from(self._mapping, byte_offset)[0]
+            if "f" == type_code:
+                value /= CaptureLog.fixed_point_scale
+
+        if "s" == type_code and not raw_strings:
+            return self.strings[value]
+        return value
+
+    def __apply_record__(self, frame_index):
+        size_flags, changed_mask, absent_mask, wide_mask, byte_offset = \
+            self.__record_masks__(self._record_offsets[frame_index])
+
+        if 0 != size_flags & CaptureLog.keyframe_flag:
+            self._state.clear()
+
+        if absent_mask is not None:
+            for column_index in CaptureLog.mask_bits(absent_mask):
+                self._state.pop(column_index, None)
+
+        for column_index in CaptureLog.mask_bits(changed_mask):
+            wide = wide_mask is not None and 0 != wide_mask[column_index >> 5] & (1 << (column_index & 31))
+            self._state[column_index] = self.__decode__(byte_offset, column_index, wide)
+            byte_offset += 4 if wide else 2
+
+    def __seek__(self, frame_index):
+        assert(0 <= frame_index < len(self._record_offsets))
+
+        keyframe_index = self._keyframes[bisect_right(self._keyframes, frame_index) - 1]
+        if self._state_index is None or frame_index < self._state_index or self._state_index < keyframe_index:
+            # Behind us or past a keyframe, start over from the keyframe at or before frame_index
+            self._state_index = keyframe_index
+            self.__apply_record__(self._state_index)
+
+        while self._state_index < frame_index:
+            self._state_index += 1
+            self.__apply_record__(self._state_index)
+
+    def frame_values(self, frame_index):
+        # Rebuilds a single frame for the dash, only done for the frame being published
+        self.__seek__(frame_index)
+        return {self.columns[column_index]: value for column_index, value in sorted(self._state.items())}
+
+    def value(self, frame_index, key, default_value=None):
+        column_index = self.column_indexes.get(key)
+        if column_index is None:
+            return default_value
+
+        self.__seek__(frame_index)
+        return self._state.get(column_index, default_value)
+
+    def column(self, key):
+        # One field across every frame in a single pass, frames it wasn't present in are NaN and
+        # string columns give the index into strings
+        column_index = self.column_indexes[key]
+        mask_index = column_index >> 5
+        column_bit = 1 << (column_index & 31)
+        lower_bits = column_bit - 1
+
+        missing_value = float("nan")
+        column_values = array("d")
+        value = missing_value
+        for unit_offset in self._record_offsets:
+            size_flags, changed_mask, absent_mask, wide_mask, byte_offset = self.__record_masks__(unit_offset)
+
+            if 0 != size_flags & CaptureLog.keyframe_flag:
+                value = missing_value
+            if absent_mask is not None and 0 != absent_mask[mask_index] & column_bit:
+                value = missing_value
+
+            if 0 != changed_mask[mask_index] & column_bit:
+                # Skip past the values of every lower column that changed, wide ones are 2 bytes more
+                for lower_index in range(mask_index + 1):
+                    lower_mask = changed_mask[lower_index] if lower_index < mask_index else changed_mask[lower_index] & lower_bits
+                    byte_offset += 2 * bin(lower_mask).count("1")
+                    if wide_mask is not None:
+                        byte_offset += 2 * bin(lower_mask & wide_mask[lower_index]).count("1")
+
+                wide = wide_mask is not None and 0 != wide_mask[mask_index] & column_bit
+                value = self.__decode__(byte_offset, column_index, wide, raw_strings=True)
+
+            column_values.append(value)
+
+        return column_values
+
+    def close(self):
+        self._units.release()
+        self._mapping.close()
+
+
+def print_usage():
+    print("")
+    print("Usage: python3 -m data.capturelog --file <capture log> --field <field name>")
+    print("Example: python3 -m data.capturelog --file overnight.ndlog --field cpu_temp")
+
+def get_command_args(argv):
+    log_file = None
+    field_name = None
+    try:
+        opts, args = getopt.getopt(argv, "h", ["file=", "field="])
+
+    except getopt.GetoptError:
+        print_usage()
+        sys.exit(2)
+
+    for opt, arg in opts:
+        if opt == '-h':
+            print_usage()
+            sys.exit()
+        elif opt == "--file":
+            log_file = arg
+        elif opt == "--field":
+            field_name = arg
+
+    if log_file is None:
+        print_usage()
+        sys.exit()
+
+    return log_file, field_name
+
+def main(argv):
+    # Summarizes a log, with --field prints min/max/mean for that field
+    log_file, field_name = get_command_args(argv)
+    reader = CaptureLogReader(log_file)
+
+    frame_count = len(reader)
+    duration = reader.timestamps_ms()[-1] / 1000 if 0 != frame_count else 0
+    print("{} frame(s) spanning {:.1f} seconds, {} column(s)".format(frame_count, duration, len(reader.columns)))
+
+    if field_name is not None and field_name not in reader.column_indexes:
+        print("{} was not captured".format(field_name))
+    elif field_name is not None and 0 != frame_count:
+        # NaN marks frames the field wasn't in
+        present_values = [value for value in reader.column(field_name) if value == value]
+        if 0 != len(present_values):
+            print("{}: {} present, min {:.3f}, max {:.3f}, mean {:.3f}".format(
+                field_name, len(present_values), min(present_values), max(present_values),
+                sum(present_values) / len(present_values)))
+
+    reader.close()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
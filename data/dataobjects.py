@@ -10,7 +10,7 @@ from .units import Unit, Units
 class DataField:
     def __init__(
         self, field_name="", description="", unit = Units.null_unit,
-        min_value=None, caution_value=None, warn_value=None, max_value=None):
+        min_value=None, caution_value=None, warn_value=None, max_value=None, value_type=int):
 
         self.field_name = field_name
         self.description = description
@@ -19,24 +19,414 @@ class DataField:
         self.caution_value = caution_value
         self.warn_value = warn_value
         self.max_value = max_value
-#TODO: (Adam) 2020-11-14 AIDA64 layout file is plain text, could write a converter to grab fields names
-#           from the client-side export file.
+
+        # Type the ingestion thread converts the raw AIDA64 text into, int, float, or str
+        self.value_type = value_type
+
+        # Index into DashSample.slot_values, assigned by the FieldRegistry
+        self.slot = None
+
+    def iterated(self, index):
+        # Concrete field for an iterated template like cpu{}_util
+        assert(-1 != self.field_name.find("{}"))
+
+        return DataField(
+            self.field_name.format(index), self.description.format(index), self.unit,
+            self.min_value, self.caution_value, self.warn_value, self.max_value, self.value_type)
+
+class FieldState:
+    present = 0
+    # Reported before but not in this sample, elements can hold the last value they drew
+    stale = 1
+    # Never reported since startup
+    missing = 2
+
+class FieldRegistry:
+    # Gives every known field a fixed slot index so samples can be stored as a flat list and
+    # presence checked with a bitmask instead of name lookups. Also keeps per-field counts of
+    # frames seen and parse failures, misses are frames received minus frames seen.
+    def __init__(self, data_fields=None):
+        self.data_fields = []
+        self.slots = {}
+
+        # Counts are only written by the ingestion thread through record_frame
+        self.frame_count = 0
+        self.seen_counts = []
+        self.last_seen_frames = []
+        self.parse_failure_counts = []
+
+        # Per slot, expected is False for fields a loaded AIDA64 layout doesn't export. Subscribed
+        # fields are the ones pages read.
+        self.expected = []
+        self.subscribed = []
+        self.has_layout = False
+
+        # Multi-page streams, the AIDA64 page each slot arrives on (None until the layout or a frame
+        # says) and how many frames of each page have arrived
+        self.field_pages = []
+        self.page_frame_counts = {}
+        self._all_pages_seen = False
+
+        # Names the parser decodes, None for everything. Swapped by the render loop when the visible
+        # page changes, read by the ingestion thread each frame.
+        self.active_fields = None
+
+        if data_fields is not None:
+            for data_field in data_fields:
+                self.register(data_field)
+
+    def __len__(self):
+        return len(self.data_fields)
+
+    def register(self, data_field, expected=True, page_index=None):
+        assert(0 != len(data_field.field_name))
+        assert(data_field.field_name not in self.slots)
+
+        data_field.slot = len(self.data_fields)
+        self.slots[data_field.field_name] = data_field.slot
+        self.data_fields.append(data_field)
+        self.seen_counts.append(0)
+        self.last_seen_frames.append(0)
+        self.parse_failure_counts.append(0)
+        self.expected.append(expected)
+        self.subscribed.append(False)
+        self.field_pages.append(page_index)
+
+        return data_field.slot
+
+    def set_field_page(self, field_name, page_index):
+        slot = self.slots.get(field_name)
+        if slot is not None:
+            self.field_pages[slot] = page_index
+
+    def has_seen_all_pages(self):
+        # True once a frame from every page the layout puts fields on has arrived
+        if self._all_pages_seen:
+            return True
+
+        for page_index in self.field_pages:
+            if page_index is not None and page_index not in self.page_frame_counts:
+                return False
+
+        self._all_pages_seen = True
+        return True
+
+    def __slot_frame_count__(self, slot):
+        # Frames the field could have been in, only its own page's once that page has arrived
+        page_index = self.field_pages[slot]
+        if page_index is not None:
+            page_frame_count = self.page_frame_counts.get(page_index, 0)
+            if 0 != page_frame_count:
+                return page_frame_count
+
+        return self.frame_count
+
+    def subscribe(self, data_fields):
+        # Marks fields as read by a page, returns the ones the layout says will never arrive
+        never_arriving = []
+        for data_field in data_fields:
+            slot = self.slot_index(data_field)
+            if slot is None:
+                never_arriving.append(data_field)
+                continue
+
+            self.subscribed[slot] = True
+            if not self.expected[slot]:
+                never_arriving.append(data_field)
+
+        return never_arriving
+
+    def set_active_fields(self, data_fields):
+        # Narrows decoding to the fields one page reads, pass None to decode everything. The set is
+        # replaced whole so the ingestion thread never sees it half built.
+        if data_fields is None:
+            self.active_fields = None
+        else:
+            self.active_fields = frozenset(data_field.field_name for data_field in data_fields)
+
+    def validate_frame(self, values, page_index=None):
+        # Checks the first frame of a stream, or of each page, against the schema and returns warning
+        # strings. A page only has to carry the fields registered for it, missing fields are left to
+        # missing_field_warnings() once every page has arrived.
+        warnings = []
+        if self.has_layout:
+            for key in values:
+                if key not in self.slots:
+                    warnings.append("{} was sent but isn't in the layout".format(key))
+
+        return warnings
+
+    def missing_field_warnings(self):
+        # Fields that haven't arrived on any page yet, check once has_seen_all_pages() says every page
+        # had its chance
+        warnings = []
+        for slot, data_field in enumerate(self.data_fields):
+            if 0 != self.seen_counts[slot]:
+                continue
+
+            if self.subscribed[slot]:
+                warnings.append("{} is used by the dash but the host didn't send it".format(data_field.field_name))
+            elif self.has_layout and self.expected[slot]:
+                warnings.append("{} is in the layout but the host didn't send it".format(data_field.field_name))
+
+        return warnings
+
+    def slot_index(self, data_field):
+        # Resolves fields built outside the registry (DataField.iterated) by name, None if unknown
+        if data_field.slot is None:
+            data_field.slot = self.slots.get(data_field.field_name)
+
+        return data_field.slot
+
+    def compile_values(self, values):
+        # Returns (slot_values, present_mask), names the registry doesn't know only stay in the dict
+        slots = self.slots
+        slot_values = [None] * len(self.data_fields)
+        present_mask = 0
+        for key, value in values.items():
+            slot = slots.get(key)
+            if slot is not None:
+                slot_values[slot] = value
+                present_mask |= 1 << slot
+
+        return slot_values, present_mask
+
+    def record_frame(self, sample, parse_failures=None):
+        # Called once per ingested frame, only touches the fields that arrived
+        self.frame_count += 1
+        frame_count = self.frame_count
+
+        page_index = sample.page_index
+        if page_index is not None:
+            self.page_frame_counts[page_index] = self.page_frame_counts.get(page_index, 0) + 1
+
+        slots = self.slots
+        seen_counts = self.seen_counts
+        last_seen_frames = self.last_seen_frames
+        field_pages = self.field_pages
+        for arrived_keys in (sample.page_values, sample.skipped_fields or ()):
+            for key in arrived_keys:
+                slot = slots.get(key)
+                if slot is not None:
+                    seen_counts[slot] += 1
+                    last_seen_frames[slot] = frame_count
+                    if page_index is not None and field_pages[slot] is None:
+                        field_pages[slot] = page_index
+
+        if parse_failures:
+            for key in parse_failures:
+                slot = slots.get(key)
+                if slot is not None:
+                    self.parse_failure_counts[slot] += 1
+
+    def miss_count(self, data_field):
+        slot = self.slot_index(data_field)
+        if slot is None:
+            return self.frame_count
+
+        return self.__slot_frame_count__(slot) - self.seen_counts[slot]
+
+    def parse_failure_count(self, data_field):
+        slot = self.slot_index(data_field)
+        if slot is None:
+            return 0
+
+        return self.parse_failure_counts[slot]
+
+    def is_absent(self, data_field, after_frames):
+        # True right away for fields the layout doesn't export, otherwise once after_frames have
+        # arrived without the field ever showing up
+        slot = self.slot_index(data_field)
+        if slot is None or not self.expected[slot]:
+            return True
+
+        if self.__slot_frame_count__(slot) < after_frames:
+            return False
+
+        return 0 == self.seen_counts[slot]
+
+    def drop_absent(self, data_fields, after_frames):
+        # Pages call this to stop reading and drawing sensors the host never reports
+        return [data_field for data_field in data_fields if not self.is_absent(data_field, after_frames)]
+
+class DashSample:
+    # Typed values from a single AIDA64 frame, built once by the ingestion thread so elements
+    # never have to convert strings themselves.
+    #
+    # Multi-page streams pass the page_index of the frame, the sample then merges that page's values
+    # over the previous sample so every field stays readable. page_values holds only what arrived,
+    # changed_fields only what that page changed. A field leaves the sample when the page that
+    # carried it arrives without it. skipped_fields arrived but weren't decoded because nothing on
+    # screen reads them, they keep whatever value the previous sample had. decoded_fields is the
+    # subscription the frame was parsed with, None if everything was decoded.
+    def __init__(
+        self, values=None, timestamp=None, previous_sample=None, page_index=None, skipped_fields=None,
+        decoded_fields=None):
+        if values is None:
+            values = {}
+
+        self.timestamp = timestamp
+        self.page_index = page_index
+        self.page_values = values
+        self.skipped_fields = skipped_fields
+
+        # Keys each page carried last time, only tracked for multi-page streams
+        self.page_keys = None
+
+        # Subscription each page's newest frame was decoded with, see is_decoded()
+        self.page_decoded_fields = {page_index: decoded_fields}
+        if previous_sample is not None:
+            self.page_decoded_fields = dict(previous_sample.page_decoded_fields)
+            self.page_decoded_fields[page_index] = decoded_fields
+
+        # Names of fields that differ from the previous sample, None means everything changed
+        self.changed_fields = None
+
+        if page_index is not None and previous_sample is not None and previous_sample.page_keys is not None:
+            self.__merge_page__(values, previous_sample)
+            return
+
+        if page_index is not None:
+            self.page_keys = {page_index: self.__arrived_keys__()}
+
+        self.values = values
+
+        # Flat copy indexed by DataField.slot, reads check the presence bit instead of catching a KeyError
+        self.slot_values, self.present_mask = DashData.field_registry().compile_values(values)
+
+        if previous_sample is not None:
+            changed_fields = {key for key, value in values.items() - previous_sample.values.items()}
+            changed_fields.update(previous_sample.values.keys() - values.keys())
+            self.changed_fields = changed_fields
+
+    def __arrived_keys__(self):
+        if self.skipped_fields:
+            return frozenset(self.page_values).union(self.skipped_fields)
+
+        return frozenset(self.page_values)
+
+    def __merge_page__(self, page_values, previous_sample):
+        # Copies the previous sample and patches only the slots this page touched
+        page_index = self.page_index
+        arrived_keys = self.__arrived_keys__()
+        self.page_keys = dict(previous_sample.page_keys)
+        self.page_keys[page_index] = arrived_keys
+
+        changed_fields = {key for key, value in page_values.items() - previous_sample.values.items()}
+
+        values = dict(previous_sample.values)
+        previous_keys = previous_sample.page_keys.get(page_index)
+        if previous_keys is not None:
+            for key in previous_keys - arrived_keys:
+                # Still fresh if another page carries it too
+                if any(key in keys for other_index, keys in self.page_keys.items() if other_index != page_index):
+                    continue
+                if key in values:
+                    del values[key]
+                    changed_fields.add(key)
+        values.update(page_values)
+        self.values = values
+        self.changed_fields = changed_fields
+
+        slots = DashData.field_registry().slots
+        slot_values = list(previous_sample.slot_values)
+        present_mask = previous_sample.present_mask
+        for key in changed_fields:
+            slot = slots.get(key)
+            if slot is None:
+                continue
+
+            value = values.get(key)
+            slot_values[slot] = value
+            if value is None:
+                present_mask &= ~(1 << slot)
+            else:
+                present_mask |= 1 << slot
+
+        self.slot_values = slot_values
+        self.present_mask = present_mask
+
+    def __len__(self):
+        return len(self.values)
+
+    def is_decoded(self, field_names):
+        # True if the newest frame of every page decoded whichever of field_names it carried, fields
+        # outside the subscription at the time hold values from before
+        for page_index, decoded_fields in self.page_decoded_fields.items():
+            if decoded_fields is None:
+                continue
+
+            if self.page_keys is not None and page_index in self.page_keys:
+                carried_keys = self.page_keys[page_index]
+            else:
+                carried_keys = self.__arrived_keys__()
+            if not (field_names & carried_keys) <= decoded_fields:
+                return False
+
+        return True
+
+    def is_present(self, data_field):
+        slot = DashData.field_registry().slot_index(data_field)
+        if slot is None:
+            return data_field.field_name in self.values
+
+        return 0 != self.present_mask >> slot & 1
+
+    def field_state(self, data_field):
+        field_registry = DashData.field_registry()
+        slot = field_registry.slot_index(data_field)
+        if slot is None:
+            return FieldState.present if data_field.field_name in self.values else FieldState.missing
+
+        if self.slot_values[slot] is not None:
+            return FieldState.present
+        if 0 != field_registry.seen_counts[slot]:
+            return FieldState.stale
+
+        return FieldState.missing
+
+    def has_changed(self, data_field):
+        return self.changed_fields is None or data_field.field_name in self.changed_fields
+
+    def any_changed(self, data_fields):
+        if self.changed_fields is None:
+            return True
+
+        for data_field in data_fields:
+            if data_field.field_name in self.changed_fields:
+                return True
+
+        return False
+
+    def mark_all_changed(self):
+        # Forces a full redraw, used when a page comes back on screen
+        self.changed_fields = None
+
+    @staticmethod
+    def coalesce(older_sample, newer_sample):
+        # Carries changes forward when a sample is replaced before the render loop took it
+        if older_sample.changed_fields is None:
+            newer_sample.changed_fields = None
+        elif newer_sample.changed_fields is not None:
+            newer_sample.changed_fields |= older_sample.changed_fields
+
+        return newer_sample
 
 class DashData:
     unknown = DataField("", "Unknown", Units.null_unit)
     cpu_util = DataField("cpu_util", "CPU Utilization", Units.percent, min_value=0, max_value=100)
     cpu_temp = DataField("cpu_temp", "CPU Temperature", Units.celsius, min_value=20, caution_value=81, max_value=80, warn_value=82)
     cpu_clock = DataField("cpu_clock", "CPU Clock", Units.megahertz, min_value=799, max_value=4500)
-    cpu_power = DataField("cpu_power", "CPU Power", Units.watts, min_value=0, max_value=91)
+    cpu_power = DataField("cpu_power", "CPU Power", Units.watts, min_value=0, max_value=91, value_type=float)
     gpu_clock = DataField("gpu_clock", "GPU Clock", Units.megahertz, min_value=300, max_value=1770)
     gpu_util = DataField("gpu_util", "GPU Utilization", Units.percent, min_value=0, max_value=100)
     gpu_ram_used = DataField("gpu_ram_used", "GPU RAM Used", Units.megabytes, min_value=0, max_value=10240)
-    gpu_power = DataField("gpu_power", "GPU Power", Units.watts, min_value=0, max_value=215)
+    gpu_power = DataField("gpu_power", "GPU Power", Units.watts, min_value=0, max_value=215, value_type=float)
     gpu_temp = DataField("gpu_temp", "GPU Temperature", Units.celsius, min_value=20, caution_value=75, max_value=80, warn_value=88)
-    gpu_perfcap_reason = DataField("gpu_perfcap_reason", "GPU Performance Cap Reason")
+    gpu_perfcap_reason = DataField("gpu_perfcap_reason", "GPU Performance Cap Reason", value_type=str)
     sys_ram_used = DataField("sys_ram_used", "System RAM Used", Units.megabytes, min_value=0, caution_value=30000, max_value=32768)
-    nic1_download_rate = DataField("nic1_download_rate", "NIC1 Download Rate", Units.kilobytes_per_second)
-    nic1_upload_rate = DataField("nic1_upload_rate", "NIC2 Upload Rate", Units.kilobytes_per_second, min_value=0, max_value=1000000)
+    nic1_download_rate = DataField("nic1_download_rate", "NIC1 Download Rate", Units.kilobytes_per_second, value_type=float)
+    nic1_upload_rate = DataField("nic1_upload_rate", "NIC2 Upload Rate", Units.kilobytes_per_second, min_value=0, max_value=1000000, value_type=float)
     cpu_fan = DataField("cpu_fan", "CPU Fan Speed", Units.rpm, warn_value=500, min_value=1000, max_value=1460)
     cpu_opt_fan = DataField("cpu_opt_fan", "Forward Exhaust Fan Speed", Units.rpm, warn_value=300, min_value=0, max_value=2410)
     chassis_1_fan = DataField("chassis_1_fan", "Front Intake Fan Speed", Units.rpm, warn_value=300, min_value=0, max_value=1588)
@@ -44,38 +434,100 @@ class DashData:
     chassis_3_fan = DataField("chassis_3_fan", "Rear Exhaust Fan Speed", Units.rpm, warn_value=300, min_value=0, max_value=2410)
     gpu_fan = DataField("gpu_fan", "GPU Fan Speed", Units.rpm, min_value=0, max_value=3250)
     gpu_2_fan = DataField("gpu_2_fan", "GPU Fan Speed?", Units.rpm, min_value=0, max_value=3250)
-    desktop_resolution = DataField("desktop_resolution", "Desktop Display Resolution")
+    desktop_resolution = DataField("desktop_resolution", "Desktop Display Resolution", value_type=str)
     desktop_refresh_rate = DataField("vertical_refresh_rate", "Display Vertical Refresh Rate")
     motherboard_temp = DataField("motherboard_temp", "Motherboard Temperature", Units.celsius, min_value=15, caution_value=50, max_value=60, warn_value=62)
     rtss_fps = DataField("rtss_fps", "Frames Per Second", Units.fps, min_value=0, max_value=120)
     used_virtual_memory = DataField("used_virtual_memory", "Used Virtual Memory" ,Units.megabytes)
     gpu_used_dynamic_memory = DataField("gpu_used_dynamic_memory", "GPU Dynamic RAM Allocated", Units.megabytes)
-    volts_12 = DataField("12v", "12v Rail", Units.volts, min_value=11.4, max_value=12.6)
-    volts_5 = DataField("5v", Units.volts, min_value=4.75, max_value=5.25)
-    volts_3_3 = DataField("3_3v", "3.3v Rail", Units.volts, min_value=3.135, max_value=3.456)
-    volts_dimm = DataField("v_dimm", "Memory Voltage", Units.volts, min_value=0.5, max_value=2.0)
-    volts_cpu_vid = DataField("cpu_vid", "CPU VID",Units.volts, min_value=0.75, max_value=1.27)
-    volts_cpu_core = DataField("cpu_core_volts", "CPU Core Voltage", Units.volts, min_value=1.2, max_value=1.35)
-    volts_gpu_core = DataField("gpu_core_volts", "GPU Core Voltage", Units.volts, min_value=0.65, max_value=1.35)
+    volts_12 = DataField("12v", "12v Rail", Units.volts, min_value=11.4, max_value=12.6, value_type=float)
+    volts_5 = DataField("5v", Units.volts, min_value=4.75, max_value=5.25, value_type=float)
+    volts_3_3 = DataField("3_3v", "3.3v Rail", Units.volts, min_value=3.135, max_value=3.456, value_type=float)
+    volts_dimm = DataField("v_dimm", "Memory Voltage", Units.volts, min_value=0.5, max_value=2.0, value_type=float)
+    volts_cpu_vid = DataField("cpu_vid", "CPU VID",Units.volts, min_value=0.75, max_value=1.27, value_type=float)
+    volts_cpu_core = DataField("cpu_core_volts", "CPU Core Voltage", Units.volts, min_value=1.2, max_value=1.35, value_type=float)
+    volts_gpu_core = DataField("gpu_core_volts", "GPU Core Voltage", Units.volts, min_value=0.65, max_value=1.35, value_type=float)
     pch_temp = DataField("pch_temp", Units.celsius, min_value=20, caution_value=50, max_value=80, warn_value=60)
     unlabeled_temp = DataField("unlabeled_temp", Units.celsius, min_value=20, caution_value=45, max_value=80, warn_value=50)
-    drive_c_free = DataField("drive_c_free", "Drive C: Free Space", Units.gigabytes, min_value=0, max_value=465)
-    drive_d_free = DataField("drive_d_free", "Drive D: Free Space", Units.gigabytes, min_value=0, max_value=930)
-    drive_e_free = DataField("drive_e_free", "Drive E: Free Space", Units.gigabytes, min_value=0, max_value=232)
-    drive_f_free = DataField("drive_f_free", "Drive F: Free Space", Units.gigabytes, min_value=0, max_value=1810)
+    drive_c_free = DataField("drive_c_free", "Drive C: Free Space", Units.gigabytes, min_value=0, max_value=465, value_type=float)
+    drive_d_free = DataField("drive_d_free", "Drive D: Free Space", Units.gigabytes, min_value=0, max_value=930, value_type=float)
+    drive_e_free = DataField("drive_e_free", "Drive E: Free Space", Units.gigabytes, min_value=0, max_value=232, value_type=float)
+    drive_f_free = DataField("drive_f_free", "Drive F: Free Space", Units.gigabytes, min_value=0, max_value=1810, value_type=float)
     nvme_temp = DataField("nvme_temp", "NVME Temperature", Units.celsius, min_value=0, max_value=80, warn_value=75)
 
     # Iterate the following, labels in data source should be setup to be 0-indexed
     disk_activity = DataField("disk_{}_activity", "Disk {} Activity", Units.percent, min_value=0, max_value=100)
     cpu_core_utilization = DataField("cpu{}_util", "CPU Core {} Utilization", Units.percent, min_value=0, max_value=100)
 
+    # Highest index expanded for iterated fields like cpu{}_util when building the type map
+    iterated_field_limit = 64
+
+    # Frames without a single report before a page treats a field as not exported by the host, ~30s at 100ms
+    absent_frame_limit = 300
+
+    _field_registry = None
+    _field_types = None
+
+    @classmethod
+    def field_registry(class_object, layout_fields=None):
+        # Compiled once, iterated templates are expanded up to iterated_field_limit. Passing the field
+        # list from an AIDA64 layout (see aida64layout.py) puts those first in stream order and marks
+        # any DashData field it doesn't contain as never expected. Layouts have to be passed before
+        # anything reads a slot.
+        if class_object._field_registry is None:
+            field_registry = FieldRegistry()
+
+            if layout_fields is not None:
+                field_registry.has_layout = True
+                for layout_field in layout_fields:
+                    if layout_field.field_name not in field_registry.slots:
+                        field_registry.register(layout_field)
+
+            for data_field in vars(class_object).values():
+                if not isinstance(data_field, DataField) or 0 == len(data_field.field_name):
+                    continue
+
+                if -1 != data_field.field_name.find("{}"):
+                    iterated_fields = [data_field.iterated(index) for index in range(class_object.iterated_field_limit)]
+                else:
+                    iterated_fields = [data_field]
+
+                for iterated_field in iterated_fields:
+                    layout_slot = field_registry.slots.get(iterated_field.field_name)
+                    if layout_slot is None:
+                        field_registry.register(iterated_field, layout_fields is None)
+                    else:
+                        # Keep the DashData instance and its limits in the layout's slot
+                        iterated_field.slot = layout_slot
+                        field_registry.data_fields[layout_slot] = iterated_field
+
+            class_object._field_registry = field_registry
+        else:
+            assert(layout_fields is None)
+
+        return class_object._field_registry
+
+    @classmethod
+    def field_types(class_object):
+        # Maps AIDA64 field names to the type the ingestion thread should convert them to
+        if class_object._field_types is None:
+            class_object._field_types = {
+                data_field.field_name: data_field.value_type for data_field in class_object.field_registry().data_fields}
+
+        return class_object._field_types
+
     def best_attempt_read(data, data_field, default_value):
-        try:
-            value = data[data_field.field_name]
-        except:
-            value = default_value
-            if __debug__:
-                print("Data error: {}".format(data_field.field_name))
-                #traceback.print_exc()
+        # Array index instead of a name lookup, missing fields no longer go through an exception
+        slot = data_field.slot
+        if slot is None:
+            slot = DashData.field_registry().slot_index(data_field)
+            if slot is None:
+                # Not a DashData field, fall back to the raw values
+                return data.values.get(data_field.field_name, default_value)
+
+        # Empty slots are None, same answer as the presence bit but cheaper than shifting a 168 bit int
+        value = data.slot_values[slot]
+        if value is None:
+            return default_value
 
         return value
@@ -5,10 +5,13 @@
 # Author: Adam J. Bauman (https://gist.github.com/adambauman)
 #
 
+import asyncio
 from time import sleep
 
 import Adafruit_DHT
 
+from .ioruntime import IORuntime
+
 class DHT22Data:
     humidity = None
     temperature = None
@@ -61,16 +64,17 @@ class DHT22:
         return DHT22Data(humidity, temperature)
 
     @classmethod
-    def threadable_read_retry(class_object, dht22_data_queue, return_metric = False):
+    async def read_retry_forever(class_object, dht22_data_queue, return_metric = False, read_interval = 300):
+        # IORuntime source, the retrying driver read blocks for up to ~30 seconds so it runs off the loop
         assert(dht22_data_queue is not None)
 
         while True:
-            dht22_data = class_object.read_retry(return_metric)
-            dht22_data_queue.append(dht22_data)
+            dht22_data = await IORuntime.run_blocking(class_object.read_retry, return_metric)
+            dht22_data_queue.publish(dht22_data)
 
             # NOTE: (Adam) 2020-12-04 Ambient data is going to change slowly, we can sleep for a bit to free
             #         resources for other tasks.
-            sleep(300)
+            await asyncio.sleep(read_interval)
 
 
 def main():
@@ -0,0 +1,128 @@
+#
+# ingestionmetrics - Rolling counters for the AIDA64 ingestion thread, queried from the main loop
+# ===============================================================================================
+#
+# Author: Adam J. Bauman (https://gist.github.com/adambauman)
+#
+
+import threading
+from bisect import bisect_right
+from time import monotonic
+from collections import deque
+
+class IngestionSnapshot:
+    def __init__(self):
+        self.frame_count = 0
+        self.frames_per_second = 0.0
+        self.interval_ms_mean = 0.0
+        self.jitter_ms = 0.0
+        self.jitter_histogram = []
+        self.parse_us_p50 = 0.0
+        self.parse_us_p95 = 0.0
+        self.parse_us_p99 = 0.0
+        self.parse_us_max = 0.0
+        self.reconnect_count = 0
+        self.published_count = 0
+        self.overwritten_count = 0
+
+    def describe(self):
+        histogram_text = " ".join(
+            "{}:{}".format(label, count) for label, count in self.jitter_histogram if 0 != count)
+
+        return "\n".join((
+            "Ingestion: {} frame(s), {:.1f} frames/s, {:.1f}ms mean interval, {:.1f}ms jitter".format(
+                self.frame_count, self.frames_per_second, self.interval_ms_mean, self.jitter_ms),
+            "    interval histogram (ms): {}".format(histogram_text),
+            "    parse us p50 {:.0f}, p95 {:.0f}, p99 {:.0f}, max {:.0f}".format(
+                self.parse_us_p50, self.parse_us_p95, self.parse_us_p99, self.parse_us_max),
+            "    reconnects {}, overwritten before draw {} of {}".format(
+                self.reconnect_count, self.overwritten_count, self.published_count)))
+
+class IngestionMetrics:
+    # Written by the ingestion thread, snapshot() can be called from anywhere. Percentiles and rates
+    # cover the last window_size frames since the last reconnect, the histogram and counts run from
+    # startup. Arrivals are stamped with time.monotonic() here, the rate runs up to the snapshot so
+    # a stalled link shows it falling instead of the rate from before the outage.
+
+    # Upper edges of the inter-arrival histogram buckets in milliseconds, the last bucket is open ended
+    interval_bucket_edges_ms = (5, 10, 25, 50, 75, 100, 125, 150, 250, 500, 1000, 2000)
+
+    def __init__(self, window_size=600):
+        assert(1 < window_size)
+
+        self._lock = threading.Lock()
+        self._receive_times = deque(maxlen=window_size)
+        self._parse_seconds = deque(maxlen=window_size)
+        self._interval_counts = [0] * (len(self.interval_bucket_edges_ms) + 1)
+        self._last_receive_time = None
+
+        self.frame_count = 0
+        self.reconnect_count = 0
+
+    def record_frame(self, parse_seconds=None):
+        receive_time = monotonic()
+        with self._lock:
+            if self._last_receive_time is not None:
+                interval_ms = (receive_time - self._last_receive_time) * 1000
+                self._interval_counts[bisect_right(self.interval_bucket_edges_ms, interval_ms)] += 1
+
+            self._last_receive_time = receive_time
+            self._receive_times.append(receive_time)
+            if parse_seconds is not None:
+                self._parse_seconds.append(parse_seconds)
+
+            self.frame_count += 1
+
+    def record_reconnect(self):
+        with self._lock:
+            self.reconnect_count += 1
+
+            # Don't count the outage as a frame interval, in the histogram or the window
+            self._last_receive_time = None
+            self._receive_times.clear()
+
+    @staticmethod
+    def __percentile__(sorted_values, percent):
+        if 0 == len(sorted_values):
+            return 0.0
+
+        return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * percent / 100))]
+
+    def snapshot(self, data_queue=None):
+        # Pass the mailbox to include how many frames were replaced before the renderer took them
+        snapshot_time = monotonic()
+        with self._lock:
+            receive_times = list(self._receive_times)
+            parse_seconds = sorted(self._parse_seconds)
+            interval_counts = list(self._interval_counts)
+            snapshot = IngestionSnapshot()
+            snapshot.frame_count = self.frame_count
+            snapshot.reconnect_count = self.reconnect_count
+
+        if 1 < len(receive_times):
+            intervals = [second - first for first, second in zip(receive_times, receive_times[1:])]
+            interval_mean = sum(intervals) / len(intervals)
+            snapshot.interval_ms_mean = interval_mean * 1000
+
+            # Jitter as mean absolute deviation from the mean interval
+            snapshot.jitter_ms = (sum(abs(interval - interval_mean) for interval in intervals) / len(intervals)) * 1000
+
+            elapsed = snapshot_time - receive_times[0]
+            if 0 < elapsed:
+                snapshot.frames_per_second = (len(receive_times) - 1) / elapsed
+
+        bucket_labels = ["<{}".format(edge) for edge in self.interval_bucket_edges_ms]
+        bucket_labels.append(">{}".format(self.interval_bucket_edges_ms[-1]))
+        snapshot.jitter_histogram = list(zip(bucket_labels, interval_counts))
+
+        snapshot.parse_us_p50 = self.__percentile__(parse_seconds, 50) * 1000000
+        snapshot.parse_us_p95 = self.__percentile__(parse_seconds, 95) * 1000000
+        snapshot.parse_us_p99 = self.__percentile__(parse_seconds, 99) * 1000000
+        if 0 != len(parse_seconds):
+            snapshot.parse_us_max = parse_seconds[-1] * 1000000
+
+        if data_queue is not None:
+            snapshot.published_count = data_queue.published_count
+            snapshot.overwritten_count = data_queue.overwritten_count
+
+        return snapshot
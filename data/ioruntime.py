@@ -0,0 +1,107 @@
+#
+# ioruntime - One asyncio event loop on a background thread for every dash data source
+# ====================================================================================
+#
+# Author: Adam J. Bauman (https://gist.github.com/adambauman)
+#
+# Sources are coroutines, they hand data to the render loop through LatestValueMailboxes or
+# pygame events. Blocking driver calls (DHT22) go through run_blocking so they don't hold up the
+# loop. stop() cancels every source and waits for them to finish their cleanup.
+#
+
+import asyncio
+import threading
+
+if __debug__:
+    import traceback
+
+class IORuntime:
+
+    def __init__(self):
+        self.loop = None
+        self._thread = None
+
+    def start(self):
+        assert(self.loop is None)
+
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="io-runtime")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def add_source(self, coroutine):
+        # Safe to call from any thread, the coroutine runs until it returns or stop() is called
+        assert(self.loop is not None)
+
+        future = asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+        future.add_done_callback(self.__source_done__)
+        return future
+
+    @staticmethod
+    def __source_done__(future):
+        if future.cancelled():
+            return
+
+        exception = future.exception()
+        if exception is not None:
+            print("Data source stopped on an exception: {}".format(repr(exception)))
+            if __debug__:
+                traceback.print_exception(type(exception), exception, exception.__traceback__)
+
+    @staticmethod
+    async def run_blocking(function, *args):
+        # Runs a blocking call on a short lived daemon thread. The default executor isn't used, its
+        # worker threads are joined at exit and a 30 second sensor retry would hold up shutdown.
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def complete(result, exception):
+            if future.done():
+                return
+            if exception is not None:
+                future.set_exception(exception)
+            else:
+                future.set_result(result)
+
+        def call():
+            result, exception = None, None
+            try:
+                result = function(*args)
+            except Exception as caught:
+                exception = caught
+
+            try:
+                loop.call_soon_threadsafe(complete, result, exception)
+            except RuntimeError:
+                # Loop closed while we were blocked, nobody is waiting anymore
+                pass
+
+        threading.Thread(target=call, daemon=True).start()
+        return await future
+
+    async def __cancel_sources__(self):
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+
+        # Let sources close their connections and files
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stop(self, timeout=2.0):
+        if self.loop is None:
+            return
+
+        if self.loop.is_running():
+            try:
+                asyncio.run_coroutine_threadsafe(self.__cancel_sources__(), self.loop).result(timeout)
+            except Exception:
+                if __debug__:
+                    print("Data sources didn't stop within {}s".format(timeout))
+
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout)
+
+        if not self.loop.is_running():
+            self.loop.close()
+
+        self.loop = None
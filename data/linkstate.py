@@ -0,0 +1,109 @@
+#
+# linkstate - Connection state of the AIDA64 feed, published to the render loop as it changes
+# ===========================================================================================
+#
+# Author: Adam J. Bauman (https://gist.github.com/adambauman)
+#
+# connecting -> connected        first frame arrives
+# connected -> stalled           no frame for stall_seconds, stream still open
+# stalled -> connected           frames resume
+# any -> reconnecting            stream dropped or timed out, backing off before the next attempt
+# reconnecting -> connected      first frame on the new connection
+#
+
+import random
+import threading
+from time import time
+
+from .mailbox import LatestValueMailbox
+
+class LinkState:
+    connecting = 0
+    connected = 1
+    stalled = 2
+    reconnecting = 3
+
+    names = ("connecting", "connected", "stalled", "reconnecting")
+
+class ReconnectBackoff:
+    # Exponential backoff with jitter so a restarted AIDA64 isn't hit by every dash at the same
+    # instant. Half of each delay is fixed and half random, keeps retries from collapsing to zero.
+
+    def __init__(self, base_seconds=0.1, max_seconds=10.0, factor=2.0):
+        assert(0 < base_seconds <= max_seconds)
+        assert(1.0 <= factor)
+
+        self.base_seconds = base_seconds
+        self.max_seconds = max_seconds
+        self.factor = factor
+        self.attempt = 0
+
+    def next_delay(self):
+        delay = min(self.max_seconds, self.base_seconds * (self.factor ** self.attempt))
+        self.attempt += 1
+        return (delay / 2) + random.uniform(0, delay / 2)
+
+    def reset(self):
+        self.attempt = 0
+
+class LinkStatus:
+    # Shared between the ingestion thread and the render loop. Every transition is published to
+    # the changes mailbox so the render loop can take(0) it each pass and react straight away.
+    # A blocked read can't notice its own stall, check_stalled() is called by whoever is waiting
+    # on the data, the render loop does it each time its take() times out.
+
+    def __init__(self, stall_seconds=2.0):
+        assert(0 < stall_seconds)
+
+        self.stall_seconds = stall_seconds
+        self.changes = LatestValueMailbox()
+
+        self._lock = threading.Lock()
+        self.state = LinkState.connecting
+        self.state_time = time()
+        self.last_frame_time = None
+        self.retry_delay = 0.0
+        self.transition_count = 0
+
+    def __set_state_locked__(self, state, now):
+        # Caller holds _lock, publishing under it keeps the mailbox from ending on an older state
+        if state == self.state:
+            return False
+
+        self.state = state
+        self.state_time = now
+        self.transition_count += 1
+        self.changes.publish(state)
+        return True
+
+    def frame_received(self, now):
+        # Called for every frame, the lock is only contended by the render loop's stall checks
+        with self._lock:
+            self.last_frame_time = now
+            self.__set_state_locked__(LinkState.connected, now)
+
+    def reconnecting(self, retry_delay, now=None):
+        with self._lock:
+            self.retry_delay = retry_delay
+            self.__set_state_locked__(LinkState.reconnecting, now or time())
+
+    def check_stalled(self, now=None):
+        # Returns True if this call moved the link to stalled. Same lock as frame_received so a frame
+        # landing during the check is either seen here or moves the link straight back to connected.
+        now = now or time()
+        with self._lock:
+            if LinkState.connected != self.state or self.last_frame_time is None:
+                return False
+            if self.stall_seconds > now - self.last_frame_time:
+                return False
+
+            return self.__set_state_locked__(LinkState.stalled, now)
+
+    def is_receiving(self):
+        return LinkState.connected == self.state
+
+    def describe(self):
+        description = "AIDA64 link {} for {:.1f}s".format(LinkState.names[self.state], time() - self.state_time)
+        if LinkState.reconnecting == self.state:
+            description += ", next attempt within {:.1f}s".format(self.retry_delay)
+        return description
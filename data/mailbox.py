@@ -0,0 +1,64 @@
+#
+# mailbox - latest-value handoff between data threads and the render loop
+# ========================================================================
+#
+# Author: Adam J. Bauman (https://gist.github.com/adambauman)
+#
+
+import threading
+
+class LatestValueMailbox:
+    # Holds only the newest published value. Publishing wakes any waiting consumer immediately,
+    # values replaced before anyone took them are counted in overwritten_count. Pass a coalesce
+    # method (older, newer) -> value to fold anything a replaced value carried into the new one.
+
+    def __init__(self, coalesce=None):
+        self._condition = threading.Condition()
+        self._coalesce = coalesce
+        self._value = None
+        self._has_value = False
+
+        self.published_count = 0
+        self.overwritten_count = 0
+
+    def __len__(self):
+        # Mirrors the maxlen=1 deque this replaced, 1 if a value is waiting
+        return 1 if self._has_value else 0
+
+    def publish(self, value):
+        assert(value is not None)
+
+        with self._condition:
+            if self._has_value:
+                self.overwritten_count += 1
+                if self._coalesce is not None:
+                    value = self._coalesce(self._value, value)
+
+            self._value = value
+            self._has_value = True
+            self.published_count += 1
+            self._condition.notify_all()
+
+    def take(self, timeout=None):
+        # Blocks until a value is published or timeout (seconds) expires, returns None on timeout.
+        # A timeout of 0 will return immediately.
+        with self._condition:
+            if not self._has_value:
+                if 0 == timeout:
+                    return None
+
+                self._condition.wait_for(lambda : self._has_value, timeout)
+                if not self._has_value:
+                    return None
+
+            value = self._value
+            self._value = None
+            self._has_value = False
+            self._condition.notify_all()
+
+        return value
+
+    def wait_until_taken(self, timeout=None):
+        # Lets a producer pace itself to the consumer, returns False if the value is still waiting
+        with self._condition:
+            return self._condition.wait_for(lambda : not self._has_value, timeout)
@@ -0,0 +1,70 @@
+#
+# ringbuffer - Preallocated numeric history for graphs
+# ====================================================
+#
+# Author: Adam J. Bauman (https://gist.github.com/adambauman)
+#
+# Raw values live in an array.array that is allocated once, appending overwrites the oldest value
+# in place. newest(count) hands back the last count values oldest first, two C level slices.
+# transform() is the scale and offset the graphs use to map values into plot space, one numpy
+# operation over the array's buffer when numpy is installed. numpy isn't available on every Pi
+# image, without it a list comprehension is used, map(operator.mul, ...) chains measured ~1.8x
+# slower on CPython 3.11 for a screen of points.
+#
+
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+class RingBuffer:
+
+    def __init__(self, capacity, typecode="d"):
+        assert(0 < capacity)
+
+        self.capacity = capacity
+        self._values = array(typecode, [0]) * capacity
+        self._next_index = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def append(self, value):
+        self._values[self._next_index] = value
+        self._next_index += 1
+        if self.capacity == self._next_index:
+            self._next_index = 0
+        if self.capacity != self._count:
+            self._count += 1
+
+    def newest(self, count=None):
+        # Last count values, oldest first
+        if count is None or count > self._count:
+            count = self._count
+
+        start_index = self._next_index - count
+        if 0 <= start_index:
+            return self._values[start_index:self._next_index]
+
+        return self._values[start_index:] + self._values[:self._next_index]
+
+    def last(self, offset=0):
+        # offset 0 is the newest value, 1 the one before it, etc.
+        assert(0 <= offset < self._count)
+
+        return self._values[self._next_index - 1 - offset]
+
+    @staticmethod
+    def transform(values, scale, offset):
+        # Maps every value of an array from newest() to (value * scale) + offset, returns a list
+        if numpy is not None:
+            return ((numpy.frombuffer(values, dtype=values.typecode) * scale) + offset).tolist()
+
+        return [(value * scale) + offset for value in values]
+
+    def clear(self):
+        self._next_index = 0
+        self._count = 0
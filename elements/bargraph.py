@@ -162,7 +162,7 @@ class BarGraph:
         # Draw the value rect
         data_field = config.dash_data
         transposed_value = Helpers.transpose_ranges(
-            float(value), config.value_range[1], config.value_range[0], config.size[0], 0)
+            value, config.value_range[1], config.value_range[0], config.size[0], 0)
         draw_rect = (0, 0, transposed_value, config.size[1])
         pygame.draw.rect(self.working_surface, config.foreground_color, draw_rect)
 
@@ -0,0 +1,116 @@
+#
+# compositor - Merges a page's update rects into the fewest pixels to push to the display
+# =======================================================================================
+#
+# Author: Adam J. Bauman (https://gist.github.com/adambauman)
+#
+# SPI and HDMI panels on slow SoCs spend most of a frame pushing pixels. Pages hand back one rect
+# per redrawn element, Nones for elements that were skipped, and rects that overlap or butt up
+# against their neighbours. push() drops the Nones, clips to the screen, merges rects when the
+# union wastes little, and flips the whole display once the damaged area makes that cheaper.
+#
+
+import pygame
+
+class DirtyRectCompositor:
+
+    def __init__(self, screen_size, full_flip_ratio=0.75, merge_waste_ratio=0.1):
+        # full_flip_ratio is the share of the screen above which a full flip replaces the rect list,
+        # merge_waste_ratio is how many extra pixels, relative to the pair, a merged rect may push
+        assert(0 < full_flip_ratio <= 1.0)
+        assert(0 <= merge_waste_ratio)
+
+        self.screen_rect = pygame.Rect((0, 0), screen_size)
+        self.screen_area = self.screen_rect.width * self.screen_rect.height
+        self.full_flip_area = int(self.screen_area * full_flip_ratio)
+        self.merge_waste_ratio = merge_waste_ratio
+
+        self.frame_count = 0
+        self.full_flip_count = 0
+        self.rects_in_count = 0
+        self.rects_out_count = 0
+        self.pixels_pushed = 0
+        self.last_pixels_pushed = 0
+        self.max_pixels_pushed = 0
+
+    @staticmethod
+    def __touches__(rect, other_rect):
+        # Overlapping or sharing an edge, Rect.colliderect() alone misses rects that only touch
+        return rect.left <= other_rect.right and other_rect.left <= rect.right and \
+            rect.top <= other_rect.bottom and other_rect.top <= rect.bottom
+
+    def __should_merge__(self, rect, other_rect):
+        if not self.__touches__(rect, other_rect):
+            return False
+
+        overlap = rect.clip(other_rect)
+        covered_area = (rect.width * rect.height) + (other_rect.width * other_rect.height) - (overlap.width * overlap.height)
+        union = rect.union(other_rect)
+        return union.width * union.height <= covered_area * (1.0 + self.merge_waste_ratio)
+
+    def compose(self, update_rects):
+        # Returns the merged rect list, None when a full flip is cheaper
+        merged_rects = []
+        for update_rect in update_rects:
+            if update_rect is None:
+                continue
+
+            self.rects_in_count += 1
+            rect = self.screen_rect.clip(update_rect)
+            if 0 == rect.width or 0 == rect.height:
+                continue
+
+            # Fold in anything it should merge with, the grown rect may now reach rects it passed over
+            merging = True
+            while merging:
+                merging = False
+                for index, merged_rect in enumerate(merged_rects):
+                    if self.__should_merge__(rect, merged_rect):
+                        rect = rect.union(merged_rect)
+                        del merged_rects[index]
+                        merging = True
+                        break
+
+            merged_rects.append(rect)
+
+        damaged_area = 0
+        for rect in merged_rects:
+            damaged_area += rect.width * rect.height
+
+        if self.full_flip_area < damaged_area:
+            return None
+
+        return merged_rects
+
+    def push(self, update_rects):
+        # Sends the frame to the display, returns the pixels pushed
+        merged_rects = self.compose(update_rects)
+
+        if merged_rects is None:
+            pygame.display.flip()
+            pixels_pushed = self.screen_area
+            self.full_flip_count += 1
+            self.rects_out_count += 1
+        elif 0 != len(merged_rects):
+            pygame.display.update(merged_rects)
+            pixels_pushed = 0
+            for rect in merged_rects:
+                pixels_pushed += rect.width * rect.height
+            self.rects_out_count += len(merged_rects)
+        else:
+            pixels_pushed = 0
+
+        self.frame_count += 1
+        self.pixels_pushed += pixels_pushed
+        self.last_pixels_pushed = pixels_pushed
+        self.max_pixels_pushed = max(self.max_pixels_pushed, pixels_pushed)
+        return pixels_pushed
+
+    def describe(self):
+        if 0 == self.frame_count:
+            return "Compositor: no frames pushed"
+
+        mean_pixels = self.pixels_pushed / self.frame_count
+        return "Compositor: {} frame(s), {:.0f} pixels/frame ({:.1f}% of screen), max {}, {} full flip(s), {} rect(s) merged to {}".format(
+            self.frame_count, mean_pixels, (mean_pixels / self.screen_area) * 100, self.max_pixels_pushed,
+            self.full_flip_count, self.rects_in_count, self.rects_out_count)
@@ -0,0 +1,56 @@
+#
+# fontmanager - One shared pygame.freetype.Font per face, size and style
+# ======================================================================
+#
+# Author: Adam J. Bauman (https://gist.github.com/adambauman)
+#
+# Most elements want Fira Code SemiBold at 12pt and used to open their own copy, each with its own
+# FreeType face and glyph cache. get() loads each face/size/style once and hands the same instance
+# to everyone, which also lets TextCache share entries between elements. Fonts are shared, never
+# change a returned font's attributes, ask for the style you need instead.
+#
+
+import pygame, pygame.freetype
+from time import perf_counter
+
+from .styles import FontPath
+
+try:
+    import resource
+except ImportError:
+    # Windows debugging, RSS isn't reported
+    resource = None
+
+class FontManager:
+    _fonts = {}
+
+    request_count = 0
+    load_seconds = 0.0
+
+    @classmethod
+    def get(class_object, size, kerning=False, strong=False, path=None):
+        if path is None:
+            path = FontPath.fira_code_semibold()
+
+        class_object.request_count += 1
+        key = (path, size, kerning, strong)
+        font = class_object._fonts.get(key)
+        if font is None:
+            load_start = perf_counter()
+            font = pygame.freetype.Font(path, size)
+            font.kerning = kerning
+            font.strong = strong
+            class_object.load_seconds += perf_counter() - load_start
+
+            class_object._fonts[key] = font
+
+        return font
+
+    @classmethod
+    def describe(class_object):
+        description = "Fonts: {} loaded for {} request(s), {:.1f}ms loading".format(
+            len(class_object._fonts), class_object.request_count, class_object.load_seconds * 1000)
+        if resource is not None:
+            # ru_maxrss is KiB on Linux
+            description += ", process peak RSS {:.1f} MiB".format(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024)
+        return description
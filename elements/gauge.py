@@ -10,7 +10,9 @@ import pygame
 import os
 
 from .helpers import Helpers
+from .textcache import TextCache
 from .styles import Color, FontPath, AssetPath
+from .fontmanager import FontManager
 
 # Set true to benchmark the update process
 g_benchmark = False
@@ -24,12 +26,15 @@ class GaugeConfig:
         # Uses smooth rotozoom animation. This has a bit of a performance penalty if enabled.
         self.use_smoothed_rotation = True
 
+        # Needle rotations are rendered once per step of this many degrees and shared between gauges
+        # with the same needle, 0 rotates for every update
+        self.needle_angle_resolution = 0.5
+
         self.value_font_size = value_font_size
         self.value_font_origin = value_font_origin # If None the value will be centered
         self.value_font = value_font
         if not self.value_font:
-            self.value_font = pygame.freetype.Font(FontPath.fira_code_semibold(), self.value_font_size)
-            self.value_font.strong = True
+            self.value_font = FontManager.get(self.value_font_size, strong=True)
 
         self.arc_main_color = Color.windows_cyan_1
         self.arc_redline_color = Color.windows_red_1
@@ -53,6 +58,96 @@ class GaugeConfig:
         self.draw_label_instead_of_value = False
         self.label = ""
 
+class NeedleSprites:
+    # Needle and shadow pre-rotated at angle_resolution steps, built lazily as values show up. Sprites
+    # are cropped to what's visible so each update is two small blits instead of two rotozooms.
+
+    def __init__(self, needle_surface, shadow_surface, angle_resolution, smoothed):
+        assert(0 < angle_resolution)
+
+        self.needle_surface = needle_surface
+        self.shadow_surface = shadow_surface
+        self.angle_resolution = angle_resolution
+        self.smoothed = smoothed
+
+        self._rotations = {}
+        self.hit_count = 0
+        self.miss_count = 0
+
+    def __len__(self):
+        return len(self._rotations)
+
+    @staticmethod
+    def __cropped__(rotated_surface, parent_surface):
+        # Returns the visible part of a centered rotation and where it lands on the parent
+        center_align = Helpers.calculate_center_align(parent_surface, rotated_surface)
+        visible_rect = rotated_surface.get_bounding_rect()
+        return (
+            rotated_surface.subsurface(visible_rect).copy(),
+            (center_align[0] + visible_rect.x, center_align[1] + visible_rect.y))
+
+    def __rotate__(self, step, parent_surface):
+        rotation_degrees = step * self.angle_resolution
+        if self.smoothed:
+            rotated_needle = pygame.transform.rotozoom(self.needle_surface, rotation_degrees, 1)
+        else:
+            rotated_needle = pygame.transform.rotate(self.needle_surface, rotation_degrees)
+
+        sprites = []
+        if self.shadow_surface is not None:
+            shadow_rotation = FlatArcGauge.shadow_rotation(rotation_degrees)
+            rotated_shadow = pygame.transform.rotozoom(self.shadow_surface, shadow_rotation, 0.93)
+            sprites.append(self.__cropped__(rotated_shadow, parent_surface))
+
+        sprites.append(self.__cropped__(rotated_needle, parent_surface))
+        return sprites
+
+    def draw(self, rotation_degrees, parent_surface):
+        step = round(rotation_degrees / self.angle_resolution)
+        sprites = self._rotations.get(step)
+        if sprites is None:
+            sprites = self.__rotate__(step, parent_surface)
+            self._rotations[step] = sprites
+            self.miss_count += 1
+        else:
+            self.hit_count += 1
+
+        for sprite_surface, sprite_position in sprites:
+            parent_surface.blit(sprite_surface, sprite_position)
+
+class NeedleSpriteCache:
+    # Gauges with the same needle look share one set of sprites, the fan gauges on SystemStats
+    _sprites = {}
+
+    @staticmethod
+    def key(gauge_config):
+        return (
+            gauge_config.radius, tuple(gauge_config.needle_color), gauge_config.draw_shadow,
+            tuple(gauge_config.shadow_color), gauge_config.shadow_alpha, gauge_config.use_smoothed_rotation,
+            gauge_config.needle_angle_resolution)
+
+    @classmethod
+    def get(class_object, gauge_config):
+        return class_object._sprites.get(class_object.key(gauge_config))
+
+    @classmethod
+    def add(class_object, gauge_config, needle_surface, shadow_surface):
+        sprites = NeedleSprites(
+            needle_surface, shadow_surface, gauge_config.needle_angle_resolution, gauge_config.use_smoothed_rotation)
+        class_object._sprites[class_object.key(gauge_config)] = sprites
+        return sprites
+
+    @classmethod
+    def describe(class_object):
+        rotation_count, hit_count, miss_count = 0, 0, 0
+        for sprites in class_object._sprites.values():
+            rotation_count += len(sprites)
+            hit_count += sprites.hit_count
+            miss_count += sprites.miss_count
+
+        return "Needle sprites: {} needle(s), {} rotation(s) cached, {} hit(s), {} miss(es)".format(
+            len(class_object._sprites), rotation_count, hit_count, miss_count)
+
 class FlatArcGauge:
     working_surface = None
     base_rect = None
@@ -62,6 +157,7 @@ class FlatArcGauge:
     _static_elements_surface = None
     _needle_surface = None
     _needle_shadow_surface = None
+    _needle_sprites = None
 
     def __init__(self, gauge_config, direct_surface=None, direct_rect=None, surface_flags=0, force_update=False):
         assert(gauge_config.data_field)
@@ -130,7 +226,7 @@ class FlatArcGauge:
         # Draw static text to a discrete surface then blit it with center alignments as reference
         # Unit
         if self._config.draw_unit_symbol:
-            font_unit = pygame.freetype.Font(FontPath.fira_code_semibold(), 120)
+            font_unit = FontManager.get(120)
             unit_text_surface = font_unit.render(self._config.data_field.unit.symbol, self._config.unit_text_color)
             center_align = Helpers.calculate_center_align(gauge_base_surface, unit_text_surface[0])
             gauge_base_surface.blit(unit_text_surface[0], (center_align[0], center_align[1] + 300))
@@ -143,6 +239,16 @@ class FlatArcGauge:
         # Needle
         ########
 
+        # Another gauge may have already built this needle
+        if 0 < self._config.needle_angle_resolution:
+            self._needle_sprites = NeedleSpriteCache.get(self._config)
+            if self._needle_sprites is not None:
+                self._needle_surface = self._needle_sprites.needle_surface
+                self._needle_shadow_surface = self._needle_sprites.shadow_surface
+                if __debug__:
+                    print("Sharing needle sprites, done generating components!")
+                return
+
         # Create a temporary working surface for the needle, mirror dimensions of the unscaled arc bitmap
         # for proper centering. Alpha flag required.
         needle_surface = pygame.Surface(gauge_base_surface.get_size(), surface_flags | pygame.SRCALPHA)
@@ -170,27 +276,35 @@ class FlatArcGauge:
             shadow_color.a = self._config.shadow_alpha
             self._needle_shadow_surface.fill(shadow_color, special_flags=pygame.BLEND_RGBA_MULT)
 
+        if 0 < self._config.needle_angle_resolution:
+            self._needle_sprites = NeedleSpriteCache.add(self._config, self._needle_surface, self._needle_shadow_surface)
+
         if __debug__:
             print("Done generating components!")
 
+    @staticmethod
+    def shadow_rotation(rotation_degrees):
+        # Add a small %-change multiplier to give the shadow farther distance as values approach limits
+        shadow_distance = 4 + ((abs(rotation_degrees) / 135) * 10)
+
+        if rotation_degrees > 0: #counter-clockwise
+            return rotation_degrees + shadow_distance
+        else: #clockwise
+            return rotation_degrees - shadow_distance
+
     def __draw_needle_rotation__(self, rotation_degrees):
+        if self._needle_sprites is not None:
+            self._needle_sprites.draw(rotation_degrees, self.working_surface)
+            return
+
         if self._config.use_smoothed_rotation:
             rotated_needle = pygame.transform.rotozoom(self._needle_surface, rotation_degrees, 1)
         else:
             rotated_needle = pygame.transform.rotate(self._needle_surface, rotation_degrees)
 
         # Shadow
-        # Add a small %-change multiplier to give the shadow farther distance as values approach limits
         if self._config.draw_shadow:
-            abs_change_from_zero = abs(rotation_degrees)
-            shadow_distance = 4 + ((abs(rotation_degrees) / 135) * 10)
-
-            shadow_rotation = rotation_degrees
-            if rotation_degrees > 0: #counter-clockwise
-                shadow_rotation += shadow_distance
-            else: #clockwise
-                shadow_rotation += -shadow_distance
-            rotated_shadow = pygame.transform.rotozoom(self._needle_shadow_surface, shadow_rotation, 0.93)
+            rotated_shadow = pygame.transform.rotozoom(self._needle_shadow_surface, self.shadow_rotation(rotation_degrees), 0.93)
             shadow_center = Helpers.calculate_center_align(self.working_surface, rotated_shadow)
             self.working_surface.blit(rotated_shadow, shadow_center)
 
@@ -201,9 +315,9 @@ class FlatArcGauge:
         # Set value text color, change it to the warning color if the data field has a warn level value
         value_color = self._config.value_text_color
         if self._config.data_field.warn_value:
-            if not self._config.counter_sweep and int(value) > self._config.data_field.warn_value:
+            if not self._config.counter_sweep and value > self._config.data_field.warn_value:
                 value_color = self._config.value_text_warn_color
-            elif self._config.counter_sweep and int(value) < self._config.data_field.warn_value:
+            elif self._config.counter_sweep and value < self._config.data_field.warn_value:
                 value_color = self._config.value_text_warn_color
 
         if self._config.draw_label_instead_of_value:
@@ -212,7 +326,7 @@ class FlatArcGauge:
             value_text = "{}".format(value)
 
         # Draw value to temporary surface so we can calculate centers
-        value_surface = self._config.value_font.render(value_text, value_color)[0]
+        value_surface = TextCache.render(self._config.value_font, value_text, value_color)
 
         # Use configured origin point, otherwise calculate it
         if self._config.value_font_origin:
@@ -253,10 +367,12 @@ class FlatArcGauge:
 
         self.__draw_value_text__(value)
             
-        # Transpose value into gauge rotation space
+        # Transpose value into gauge rotation space, out of range values pin the needle at the ends of
+        # the arc so the sprite cache only ever holds rotations within it
         max_value = self._config.data_field.max_value
         min_value = self._config.data_field.min_value
-        arc_transposed_value = Helpers.transpose_ranges(float(value), max_value, min_value, -135, 135)
+        arc_value = min(max(value, min_value), max_value)
+        arc_transposed_value = Helpers.transpose_ranges(arc_value, max_value, min_value, -135, 135)
 
         self.__draw_needle_rotation__(arc_transposed_value)
         # Use full update rect if we had to draw the needle
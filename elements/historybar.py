@@ -142,39 +142,37 @@ class HistoryBar:
     def draw_update(self, value):
         assert(self.working_surface)
 
-        value_float = float(value)
-
         # Return last draw result if the value hasn't changed
         if not self._force_update:
-            if self.current_value == value_float:
+            if self.current_value == value:
                 return None
 
         self.working_surface.fill((0, 0, 0, 0))
 
         # Start tracking min/max values
         if not self.min_history_value or not self.max_history_value:
-            self.min_history_value = value_float
-            self.max_history_value = value_float
+            self.min_history_value = value
+            self.max_history_value = value
 
-        if self.min_history_value > value_float:
-            self.min_history_value = value_float
+        if self.min_history_value > value:
+            self.min_history_value = value
         
-        if self.max_history_value < value_float:
-            self.max_history_value = value_float
+        if self.max_history_value < value:
+            self.max_history_value = value
 
         # Translate value to element display face
         max_value = self._config.dash_data.max_value
         min_value = self._config.dash_data.min_value
-        transposed_x = Helpers.transpose_ranges(value_float, max_value, min_value, self.working_surface.get_width(), 0)
+        transposed_x = Helpers.transpose_ranges(value, max_value, min_value, self.working_surface.get_width(), 0)
         
         is_warning = False
-        if max_value <= value_float or min_value >= value_float:
+        if max_value <= value or min_value >= value:
             is_warning = True
 
         self.__draw_history__(transposed_x, is_warning)
         self.__draw_indicator__(transposed_x, is_warning)
         self.__draw_outline__(is_warning)
 
-        self.current_value = value_float
+        self.current_value = value
 
         return self.base_rect
\ No newline at end of file
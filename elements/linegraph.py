@@ -7,7 +7,8 @@
 
 import pygame
 import os
-from collections import deque
+
+from data.ringbuffer import RingBuffer
 
 from .styles import Color, AssetPath
 from .helpers import Helpers
@@ -26,6 +27,11 @@ class LineGraphConfig:
         self.display_background = False
         self.draw_on_zero = True
 
+        # Scroll the existing plot and only draw the newest segment, the grid scrolls along with it.
+        # The period is how many pixels the background pattern takes to repeat.
+        self.scroll_incremental = True
+        self.background_scroll_period = 8
+
 class LineGraphReverse:
     working_surface = None
     base_rect = None
@@ -46,6 +52,9 @@ class LineGraphReverse:
         self._background = None
         if self._config.display_background:
             self._background = pygame.image.load(os.path.join(AssetPath.graphs, "grid_cyan_dots.png")).convert()
+            if self._config.scroll_incremental:
+                # Exposed strips are cut from up to one period further right
+                assert(self._background.get_width() >= self.working_surface.get_width() + self._config.background_scroll_period)
 
         # Built a plotting area that accounts for padding and the line width
         plot_x = self._config.plot_vertical_padding
@@ -54,20 +63,83 @@ class LineGraphReverse:
         plot_height = self.working_surface.get_height() - (self._config.plot_vertical_padding * 2) - (self._config.line_width)
         self._plot_area = pygame.Rect(plot_x, plot_y, plot_width, plot_height)
 
-        plot_queue_length = int(self.working_surface.get_width() / self._config.steps_per_update)
-        self._plot_points = deque([], maxlen=plot_queue_length)
-        self._plot_points.append((plot_width, plot_height))
+        # Raw values are kept, X is derived from each value's age and Y from the current value range
+        # whenever the plot is drawn. Enough samples are kept to reach the left edge at one step apart
+        self._screen_samples = -(-self.working_surface.get_width() // self._config.steps_per_update) + 1
+        self._history = RingBuffer(self._screen_samples)
+        self._history.append(self._config.data_field.min_value)
+
+        self._value_range = None
+        self._value_scale = 0.0
+        self._value_offset = 0.0
+
+        # Background pixels the plot has scrolled through, modulo the background's period
+        self._scroll_phase = 0
+        self._needs_full_draw = True
+
+    def __update_value_transform__(self):
+        # Returns True if the data field's range changed and everything plotted needs rescaling
+        data_field = self._config.data_field
+        value_range = (data_field.min_value, data_field.max_value)
+        if value_range == self._value_range:
+            return False
+
+        # Same mapping as Helpers.transpose_ranges(), plot min/max reversed, as a scale and offset
+        # so a whole window is rescaled in one pass
+        plot_y = self._plot_area[1]
+        plot_height = self._plot_area[3]
+        self._value_range = value_range
+        self._value_scale = (plot_y - plot_height) / (data_field.max_value - data_field.min_value)
+        self._value_offset = plot_height - (data_field.min_value * self._value_scale)
+        return True
+
+    def __plot_heights__(self, count):
+        return RingBuffer.transform(self._history.newest(count), self._value_scale, self._value_offset)
+
+    def __plot_points__(self):
+        # Newest point sits on the right edge, older ones one step apart to the left, the same spacing
+        # __draw_newest_segment__() scrolls by so full and incremental draws line up
+        plot_heights = self.__plot_heights__(self._screen_samples)
+        x_step = self._config.steps_per_update
+        x = self.working_surface.get_width() - ((len(plot_heights) - 1) * x_step)
+        plot_points = []
+        for plot_height in plot_heights:
+            plot_points.append((x, plot_height))
+            x += x_step
+        return plot_points
+
+    def __draw_full__(self):
+        # Clear the working surface, the background is offset to line up with later scrolled strips
+        if self._background:
+            self.working_surface.blit(
+                self._background, (0, 0), pygame.Rect((self._scroll_phase, 0), self.working_surface.get_size()))
+        else:
+            self.working_surface.fill((0, 0, 0, 0))
+
+        if 1 < len(self._history):
+            pygame.draw.lines(
+                self.working_surface, self._config.line_color, False, self.__plot_points__(), self._config.line_width)
 
-    def __shift_plots__(self):
-        assert(self._plot_points)
+    def __draw_newest_segment__(self):
+        # Scroll what's already plotted left, repaint the exposed strip, draw the segment to the new point
+        steps_per_update = self._config.steps_per_update
+        width, height = self.working_surface.get_size()
+        self.working_surface.scroll(-steps_per_update, 0)
 
-        # Shift each point's X to the left
-        for index in range(len(self._plot_points)):
-            self._plot_points[index] = (self._plot_points[index][0] - self._config.steps_per_update, self._plot_points[index][1])
+        strip_rect = pygame.Rect(width - steps_per_update, 0, steps_per_update, height)
+        if self._background:
+            self.working_surface.blit(
+                self._background, strip_rect, pygame.Rect(strip_rect.x + self._scroll_phase, 0, steps_per_update, height))
+        else:
+            self.working_surface.fill((0, 0, 0, 0), strip_rect)
 
-        # First point will be out of the working area, pop it
-        if 0 > (self._plot_points[0][0] - self._config.steps_per_update):
-            self._plot_points.popleft()
+        # The previous segment is drawn again, its last column was past the right edge until now
+        history, scale, offset = self._history, self._value_scale, self._value_offset
+        plot_points = (
+            (width - (steps_per_update * 2), (history.last(2) * scale) + offset),
+            (width - steps_per_update, (history.last(1) * scale) + offset),
+            (width, (history.last(0) * scale) + offset))
+        pygame.draw.lines(self.working_surface, self._config.line_color, False, plot_points, self._config.line_width)
 
     def set_direct_draw(self, direct_surface, direct_rect):
         # Draw element directly to a subsurface of the direct_surface
@@ -76,38 +148,34 @@ class LineGraphReverse:
 
         self.working_surface = direct_surface.subsurface(direct_rect)
         self.base_rect = direct_rect
+        self._needs_full_draw = True
 
     def draw_update(self, value):
         assert(self.working_surface)
         assert(self._config)
         assert(self._plot_area)
 
-        # Clear the working surface
-        if self._background:
-            self.working_surface.blit(self._background, (0, 0))
-        else:
-            self.working_surface.fill(0, 0, 0, 0)
-
-        # Prepare plot points by shifting them left by steps_per_update
-        self.__shift_plots__()
-
-        # Transpose value into graph space, plot min/max reversed
-        data_field = self._config.data_field
-        plot_y = self._plot_area[1]
-        plot_height = self._plot_area[3]
-        transposed_value = Helpers.transpose_ranges(
-            float(value), 
-            data_field.max_value, data_field.min_value, 
-            plot_y, plot_height)
+        # Raw value goes into the history, the oldest falls off the left. A changed value range
+        # rescales everything so the plot is drawn in full.
+        self._history.append(value)
+        if self.__update_value_transform__():
+            self._needs_full_draw = True
 
-        # Append new plot point with transposed value as Y
-        self._plot_points.append((self.working_surface.get_width(), transposed_value))
-
-        # Skip drawing on zero, send None as base_rect to avoid unecessary update
-        if 0 == int(value) and not self._config.draw_on_zero:
+        # Skip drawing on zero, send None as base_rect to avoid unecessary update. The surface is left
+        # alone so what's on the display still matches it, the next drawn value catches up in full.
+        if 0 == value and not self._config.draw_on_zero:
+            self._needs_full_draw = True
             return None
 
-        pygame.draw.lines(
-            self.working_surface, self._config.line_color, False, self._plot_points, self._config.line_width)
+        if self._config.scroll_incremental:
+            self._scroll_phase = (self._scroll_phase + self._config.steps_per_update) % self._config.background_scroll_period
+
+            if self._needs_full_draw or 3 > len(self._history):
+                self.__draw_full__()
+            else:
+                self.__draw_newest_segment__()
+        else:
+            self.__draw_full__()
+        self._needs_full_draw = False
 
         return self.base_rect
@@ -7,9 +7,11 @@
 
 import pygame
 
-from data.dataobjects import DataField, DashData
+from data.dataobjects import DataField, DashData, FieldState
 from .styles import Color, FontPath, AssetPath
+from .fontmanager import FontManager
 from .helpers import Helpers
+from .textcache import TextCache
 
 class DynamicField:
     def __init__(self, origin, subsurface, text, text_color, font, value=None, clamp_chars=0):
@@ -31,9 +33,9 @@ class DynamicField:
             render_text = self._text.format(new_value)
 
         if override_color:
-            self._font.render_to(self._subsurface, (0,0), render_text, override_color)
+            TextCache.render_to(self._font, self._subsurface, (0,0), render_text, override_color)
         else:
-            self._font.render_to(self._subsurface, (0,0), render_text, self._text_color)
+            TextCache.render_to(self._font, self._subsurface, (0,0), render_text, self._text_color)
 
         self.current_value = new_value
 
@@ -50,6 +52,9 @@ class DetailsStackConfig:
         self.draw_zero = draw_zero
 
 class CPUDetails:
+    # Fields read by draw_update, pages can skip the update if none of these changed
+    data_fields = (DashData.cpu_power, DashData.cpu_clock, DashData.cpu_util, DashData.used_virtual_memory)
+
     # Surfaces
     working_surface = None
     base_rect = None
@@ -66,8 +71,7 @@ class CPUDetails:
         # Config and fonts
         self._config = details_stack_config
         if self._config.font_normal is None:
-            self._font_normal = pygame.freetype.Font(FontPath.fira_code_semibold(), 12)
-            self._font_normal.kerning = True
+            self._font_normal = FontManager.get(12, kerning=True)
         else:
             self._font_normal = self._config.font_normal
 
@@ -144,22 +148,27 @@ class CPUDetails:
         self.working_surface.fill((0,0,0,0))
         self.working_surface.blit(self._static_elements, (0, 0))
 
-        cpu_power_value = DashData.best_attempt_read(data, DashData.cpu_power, "0")
+        cpu_power_value = DashData.best_attempt_read(data, DashData.cpu_power, 0)
         self._cpu_power.update(cpu_power_value)
 
-        cpu_clock_value = DashData.best_attempt_read(data, DashData.cpu_clock, "0")
+        cpu_clock_value = DashData.best_attempt_read(data, DashData.cpu_clock, 0)
         self._cpu_clock.update(cpu_clock_value)
 
-        cpu_utilization_value = DashData.best_attempt_read(data, DashData.cpu_util, "0")
+        cpu_utilization_value = DashData.best_attempt_read(data, DashData.cpu_util, 0)
         self._cpu_utilization.update(cpu_utilization_value)
 
-        page_alloc_value = DashData.best_attempt_read(data, DashData.used_virtual_memory, "0")
+        page_alloc_value = DashData.best_attempt_read(data, DashData.used_virtual_memory, 0)
         self._page_alloc.update(page_alloc_value)
 
         return self.base_rect
 
 
 class GPUDetails:
+    # Fields read by draw_update, pages can skip the update if none of these changed
+    data_fields = (
+        DashData.gpu_perfcap_reason, DashData.gpu_power, DashData.gpu_clock, DashData.gpu_util,
+        DashData.gpu_used_dynamic_memory)
+
     working_surface = None
     base_rect = None
 
@@ -176,8 +185,7 @@ class GPUDetails:
         # Config and fonts
         self._config = details_stack_config
         if self._config.font_normal is None:
-            self._font_normal = pygame.freetype.Font(FontPath.fira_code_semibold(), 12)
-            self._font_normal.kerning = True
+            self._font_normal = FontManager.get(12, kerning=True)
 
         if direct_surface is not None:
             self.working_surface = direct_surface.subsurface(element_rect)
@@ -267,16 +275,16 @@ class GPUDetails:
         perfcap_reason_data = DashData.best_attempt_read(data, DashData.gpu_perfcap_reason, "")
         self._perfcap_reason.update(perfcap_reason_data)
 
-        gpu_power_value = DashData.best_attempt_read(data, DashData.gpu_power, "0")
+        gpu_power_value = DashData.best_attempt_read(data, DashData.gpu_power, 0)
         self._gpu_power.update(gpu_power_value)
 
-        gpu_clock_value = DashData.best_attempt_read(data, DashData.gpu_clock, "0")
+        gpu_clock_value = DashData.best_attempt_read(data, DashData.gpu_clock, 0)
         self._gpu_clock.update(gpu_clock_value)
 
-        gpu_utilization = DashData.best_attempt_read(data, DashData.gpu_util, "0")
+        gpu_utilization = DashData.best_attempt_read(data, DashData.gpu_util, 0)
         self._gpu_utilization.update(gpu_utilization)
 
-        dynamic_ram_used_value = DashData.best_attempt_read(data, DashData.gpu_used_dynamic_memory, "0")
+        dynamic_ram_used_value = DashData.best_attempt_read(data, DashData.gpu_used_dynamic_memory, 0)
         self._dynamic_ram_used.update(dynamic_ram_used_value)
 
         return self.base_rect
@@ -306,13 +314,11 @@ class FPSText:
         self._force_update = force_update
 
         if self._config.number_font is None:
-            self._config.number_font = pygame.freetype.Font(FontPath.fira_code_semibold(), 50)
-            self._config.number_font.kerning = True
+            self._config.number_font = FontManager.get(50, kerning=True)
             self.base_rect = fps_field_rect
 
         if self._config.label_font is None:
-            self._config.label_font = pygame.freetype.Font(FontPath.fira_code_semibold(), 12)
-            self._config.label_font.kerning = True
+            self._config.label_font = FontManager.get(12, kerning=True)
 
         if direct_surface is not None:
             self.working_surface = direct_surface.subsurface(fps_field_rect)
@@ -341,11 +347,11 @@ class FPSText:
                 return None
 
         self.working_surface.fill((0,0,0,0))
-        self._config.label_font.render_to(self.working_surface, self._label_position, "FPS", self._config.label_color)
-        if 0 == int(value) and self._config.draw_zero is False:
+        TextCache.render_to(self._config.label_font, self.working_surface, self._label_position, "FPS", self._config.label_color)
+        if 0 == value and self._config.draw_zero is False:
             pass
         else:
-            self._config.number_font.render_to(self.working_surface, (0, 0), "{}".format(value), self._config.number_color)
+            TextCache.render_to(self._config.number_font, self.working_surface, (0, 0), "{}".format(value), self._config.number_color)
 
         self.current_value = value
 
@@ -368,8 +374,7 @@ class TemperatureHumidity:
         self._force_update = force_update
 
         if font is None:
-            self._font = pygame.freetype.Font(FontPath.fira_code_semibold(), 12)
-            self._font.kerning = True
+            self._font = FontManager.get(12, kerning=True)
         else:
             self._font = font
 
@@ -449,6 +454,9 @@ class TemperatureHumidity:
 
 
 class MotherboardTemperatureSensors:
+    # Fields read by draw_update, pages can skip the update if none of these changed
+    data_fields = (DashData.motherboard_temp, DashData.pch_temp, DashData.nvme_temp)
+
     working_surface = None
     base_rect = None
 
@@ -462,10 +470,8 @@ class MotherboardTemperatureSensors:
 
     def __init__(self, element_rect, direct_surface=None, surface_flags=0):
 
-        self._label_font = pygame.freetype.Font(FontPath.fira_code_semibold(), 12)
-        self._label_font.kerning = True
-        self._value_font = pygame.freetype.Font(FontPath.fira_code_semibold(), 16)
-        self._value_font.kerning = True
+        self._label_font = FontManager.get(12, kerning=True)
+        self._value_font = FontManager.get(16, kerning=True)
 
         base_size = (element_rect[2], element_rect[3])
         if direct_surface:
@@ -522,6 +528,11 @@ class MotherboardTemperatureSensors:
             self.working_surface.subsurface((origin[0], origin[1], self.working_surface.get_width(), value_font_height + y_offset)),
             "{}\u00b0C", Color.windows_cyan_1, self._value_font)
 
+        self._dynamic_fields = (
+            (DashData.motherboard_temp, self._motherboard),
+            (DashData.pch_temp, self._pch),
+            (DashData.nvme_temp, self._nvme))
+
     def set_direct_draw(self, direct_surface, direct_rect):
         # Draw element directly to a subsurface of the direct_surface
         assert(direct_surface)
@@ -530,30 +541,32 @@ class MotherboardTemperatureSensors:
         self.working_surface = direct_surface.subsurface(direct_rect)
         self.base_rect = direct_rect
 
+    def drop_absent_fields(self, field_registry, after_frames):
+        # Sensors the host never reported stop being read, they're drawn as dashes from then on
+        self.data_fields = tuple(field_registry.drop_absent(self.data_fields, after_frames))
+        return self.data_fields
+
     def draw_update(self, aida64_data):
         assert(self.working_surface)
         assert(self._static_elements)
 
         self.working_surface.blit(self._static_elements, (0, 0))
 
-        motherboard_temp = DashData.best_attempt_read(aida64_data, DashData.motherboard_temp, "0")
-        pch_temp = DashData.best_attempt_read(aida64_data, DashData.pch_temp, "0")
-        nvme_temp = DashData.best_attempt_read(aida64_data, DashData.nvme_temp, "0")
+        for data_field, dynamic_field in self._dynamic_fields:
+            value = None
+            if data_field in self.data_fields:
+                value = DashData.best_attempt_read(aida64_data, data_field, None)
 
-        if DashData.motherboard_temp.warn_value <= int(motherboard_temp):
-            self._motherboard.update(motherboard_temp, Color.windows_red_1)
-        else:
-            self._motherboard.update(motherboard_temp)
-
-        if DashData.pch_temp.warn_value <= int(pch_temp):
-            self._pch.update(pch_temp, Color.windows_red_1)
-        else:
-            self._pch.update(pch_temp)
+                # Hold the last reading through a dropped frame
+                if value is None and FieldState.stale == aida64_data.field_state(data_field):
+                    value = dynamic_field.current_value
 
-        if DashData.nvme_temp.warn_value <= int(nvme_temp):
-            self._nvme.update(nvme_temp, Color.windows_red_1)
-        else:
-            self._nvme.update(nvme_temp)
+            if value is None or isinstance(value, str):
+                dynamic_field.update("--")
+            elif data_field.warn_value <= value:
+                dynamic_field.update(value, Color.windows_red_1)
+            else:
+                dynamic_field.update(value)
 
         return self.base_rect
 
@@ -578,7 +591,7 @@ class SimpleText:
         if font:
             self._font = font
         else:
-            self._font = pygame.freetype.Font(FontPath.fira_code_semibold(), 12)
+            self._font = FontManager.get(12)
 
         base_size = (element_rect.size)
         if direct_surface:
@@ -606,7 +619,7 @@ class SimpleText:
             self._text_color = new_text_color
 
         self.working_surface.fill((0,0,0,0))
-        self._font.render_to(self.working_surface, (0, 0), self._text_template.format(value), self._text_color)
+        TextCache.render_to(self._font, self.working_surface, (0, 0), self._text_template.format(value), self._text_color)
 
         self.current_value = value
 
@@ -634,7 +647,7 @@ class NetworkInformation:
         self._force_update = force_update
 
         if font is None:
-            self._font_normal = pygame.freetype.Font(FontPath.fira_code_semibold(), 12)
+            self._font_normal = FontManager.get(12)
         else:
             self._font_normal = font
 
@@ -725,7 +738,7 @@ class EnclosedLabelConfig:
         if font:
             self.font = font
         else:
-            self.font = pygame.freetype.Font(FontPath.fira_code_semibold(), 12)
+            self.font = FontManager.get(12)
 
 class EnclosedLabel:
     working_surface = None
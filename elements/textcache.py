@@ -0,0 +1,73 @@
+#
+# textcache - Shared LRU of rendered text surfaces so repeated sensor values are a single blit
+# ==========================================================================================
+#
+# Author: Adam J. Bauman (https://gist.github.com/adambauman)
+#
+# Sensor readouts cycle through a small set of strings (temps 30-90, utilization 0-100), FreeType
+# rasterizing the same string over and over is wasted work on the Pi. render_to() is a drop in for
+# Font.render_to() and render() for Font.render()[0], surfaces keep their alpha so blits are pixel
+# identical. Keyed by font, text and color, set a font's size, kerning, etc. before its first render.
+#
+
+import pygame
+from collections import OrderedDict
+
+class TextCache:
+    max_entries = 512
+
+    _entries = OrderedDict()
+    _byte_count = 0
+
+    hit_count = 0
+    miss_count = 0
+    eviction_count = 0
+
+    @classmethod
+    def render_to(class_object, font, surface, origin, text, color):
+        # Returns the drawn rect like Font.render_to()
+        if 0 == len(text):
+            return font.render_to(surface, origin, text, color)
+
+        return surface.blit(class_object.render(font, text, color), origin)
+
+    @classmethod
+    def render(class_object, font, text, color):
+        # Returns the shared surface, blit it but never draw onto it
+        assert(0 != len(text))
+
+        key = (font, text, tuple(color))
+        rendered_surface = class_object._entries.get(key)
+        if rendered_surface is not None:
+            class_object._entries.move_to_end(key)
+            class_object.hit_count += 1
+        else:
+            rendered_surface = font.render(text, color)[0]
+            class_object.__store__(key, rendered_surface)
+            class_object.miss_count += 1
+
+        return rendered_surface
+
+    @classmethod
+    def __store__(class_object, key, rendered_surface):
+        class_object._entries[key] = rendered_surface
+        class_object._byte_count += rendered_surface.get_bytesize() * rendered_surface.get_width() * rendered_surface.get_height()
+
+        while class_object.max_entries < len(class_object._entries):
+            evicted_key, evicted_surface = class_object._entries.popitem(last=False)
+            class_object._byte_count -= \
+                evicted_surface.get_bytesize() * evicted_surface.get_width() * evicted_surface.get_height()
+            class_object.eviction_count += 1
+
+    @classmethod
+    def clear(class_object):
+        class_object._entries.clear()
+        class_object._byte_count = 0
+
+    @classmethod
+    def describe(class_object):
+        lookup_count = class_object.hit_count + class_object.miss_count
+        hit_percent = (class_object.hit_count / lookup_count) * 100 if 0 != lookup_count else 0
+        return "Text cache: {} of {} entries, {:.1f} KiB, {} hit(s), {} miss(es) ({:.1f}% hit), {} eviction(s)".format(
+            len(class_object._entries), class_object.max_entries, class_object._byte_count / 1024,
+            class_object.hit_count, class_object.miss_count, hit_percent, class_object.eviction_count)
@@ -9,8 +9,10 @@ import pygame
 
 import os, sys
 
+from data.dataobjects import DashData, DashSample
 from .helpers import Helpers
 from .styles import Color, AssetPath, FontPath
+from .fontmanager import FontManager
 from .bargraph import BarGraph, BarGraphConfig
 
 if not pygame.freetype.get_init():
@@ -79,14 +81,20 @@ class SimpleCoreVisualizer:
         else:
             self.working_surface = pygame.Surface((base_width, base_height), surface_flags)
 
+        # Fields read by draw_update, pages can skip the update if none of these changed. Slots are
+        # resolved here so reads are plain indexing.
+        field_registry = DashData.field_registry()
+        self.data_fields = [DashData.cpu_core_utilization.iterated(index) for index in range(self._core_count)]
+        for data_field in self.data_fields:
+            field_registry.slot_index(data_field)
+
         # Initialize last core activity and do a hack update
         initialize_data = {}
-        for index in range(self._core_count):
-            key = "cpu{}_util".format(index)
-            initialize_data[key] = 0
+        for data_field in self.data_fields:
+            initialize_data[data_field.field_name] = 0
             self._last_core_activity.append(False)
 
-        self.draw_update(initialize_data)
+        self.draw_update(DashSample(initialize_data))
         self._first_run = False
 
     def set_direct_draw(self, direct_surface, direct_rect):
@@ -113,15 +121,7 @@ class SimpleCoreVisualizer:
         core_activity_tracking = []
         for index in range(self._core_count):
 
-            key_name = "cpu{}_util".format(index)
-            core_activity_value = 0
-            try:
-                core_activity_value = int(data[key_name])
-            except:
-                core_activity_value = 0
-                if __debug__:
-                    print("Data error: core {}".format(index))
-                    #traceback.print_exc()
+            core_activity_value = DashData.best_attempt_read(data, self.data_fields[index], 0)
 
             core_active = False
             if core_activity_value >= self._config.activity_threshold_percent:
@@ -166,8 +166,7 @@ class PumpStatusConfig:
     def __init__(self, size=(80, 80), temperature_font=None):
         self.size = size
         if temperature_font is None:
-            self.temperature_font = pygame.freetype.Font(FontPath.fira_code_semibold(), 18)
-            self.temperature_font.kerning = True
+            self.temperature_font = FontManager.get(18, kerning=True)
         else:
             self.temperature_font = font
         
@@ -246,9 +245,9 @@ class PumpStatus:
         # Do not clear the entire working surface, everything we need to update is within the indicator 
         # surface's bounds
         draw_warning = False
-        if self._config.pump_rpm_underspeed_value >= int(pump_rpm_value):
+        if self._config.pump_rpm_underspeed_value >= pump_rpm_value:
             draw_warning = True
-        if self._config.warning_temperature <= int(temperature_value):
+        if self._config.warning_temperature <= temperature_value:
             draw_warning = True
 
         if draw_warning:
@@ -275,8 +274,7 @@ class GPUTemperatureConfig:
     def __init__(self, size=(305, 71), temperature_font=None):
         self.size = size
         if temperature_font is None:
-            self.temperature_font = pygame.freetype.Font(FontPath.fira_code_semibold(), 18)
-            self.temperature_font.kerning = True
+            self.temperature_font = FontManager.get(18, kerning=True)
         else:
             self.temperature_font = font
 
@@ -376,7 +374,7 @@ class GPUTemperature:
         self.working_surface.blit(self._indicator_housing, indicator_origin)
 
         # TODO: Could add GPU fan warning, lots of modern GPUs spin down when idle though
-        if self._config.warning_temperature <= int(temperature_value):
+        if self._config.warning_temperature <= temperature_value:
             self.working_surface.blit(self._indicator_warn, indicator_origin)
         else:
             self.working_surface.blit(self._indicator_okay, indicator_origin)
@@ -397,8 +395,7 @@ class GPUTemperature:
 class HomeTemperatureConfig:
     def __init__(self):
         self.text_color = Color.windows_cyan_1
-        self.temperature_font = pygame.freetype.Font(FontPath.fira_code_semibold(), 16)
-        self.temperature_font.kerning = True
+        self.temperature_font = FontManager.get(16, kerning=True)
         self.temperature_text_template = "{:.1f}\u00b0"
         self.icon_text_spacing = 6
         self.override_home_icon_filename = None
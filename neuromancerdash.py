@@ -8,8 +8,7 @@
 import os
 import pygame, pygame.freetype
 import sys, getopt
-from collections import deque
-import threading
+import asyncio
 import traceback
 
 # Set true to benchmark various parts of the update process
@@ -19,11 +18,23 @@ g_benchmark = False
 g_dump_display_frames = False
 
 from data.aida64lcdsse import AIDA64LCDSSE
+from data.aida64replay import AIDA64Replay
+from data.mailbox import LatestValueMailbox
+from data.ingestionmetrics import IngestionMetrics
+from data.linkstate import LinkState, LinkStatus
+from data.dataobjects import DashData, DashSample
+from data.aida64layout import AIDA64Layout
+from data.ioruntime import IORuntime
 from utilities.screensaver import MatrixScreensaver
+from utilities.framegovernor import FrameGovernor
 from pages.systemstats import SystemStats
 from pages.cooling import Cooling
 from pages.power import Power
 from elements.styles import FontPath, Color
+from elements.compositor import DirtyRectCompositor
+from elements.textcache import TextCache
+from elements.fontmanager import FontManager
+from elements.gauge import NeedleSpriteCache
 from elements.styles import Color, AssetPath, FontPath
 
 # Simple check for RPi GPIO, will disable any stuff that requires GPIO access so you can
@@ -53,6 +64,17 @@ class Hardware:
     screen_width = 480
     screen_height = 320
     gpio_button = 15
+    page_button_event = pygame.USEREVENT + 1
+
+
+async def watch_page_button(poll_interval=0.02, debounce_seconds=0.2):
+    # IORuntime source, posts a page_button_event for each press so the render loop doesn't poll GPIO
+    while True:
+        if GPIO.input(Hardware.gpio_button):
+            pygame.event.post(pygame.event.Event(Hardware.page_button_event))
+            await asyncio.sleep(debounce_seconds)
+
+        await asyncio.sleep(poll_interval)
 
 
 def print_usage():
@@ -60,15 +82,33 @@ def print_usage():
     print("Usage: neuromancer_dash.py <options>")
     print("Example: python3 neuromancer_dash.py --aidasse http://localhost:8080/sse")
     print("")
-    print("       Required Options:")
-    print("           --aidasse <full http address:port to AIDA64 LCD SSE stream>")
+    print("       Required Options (one of):")
+    print("           --aidasse <full http address:port to AIDA64 LCD SSE stream, comma separate or repeat for failover>")
+    print("           --replay <captured SSE stream file to play back instead of a live stream>")
+    print("")
+    print("       Optional:")
+    print("           --capture <file to append the live AIDA64 SSE session to, for later replay>")
+    print("           --capturelog <compact binary log of the parsed frames, also replayable>")
+    print("           --replayspeed <playback speed multiplier, 0 draws every frame as fast as possible>")
+    print("           --layout <AIDA64 .rslcd layout export to build the field schema from, 'none' to skip>")
+    print("           --metrics <print ingestion metrics every this many seconds>")
+    print("           --fps <most frames to render per second, independent of the AIDA64 update rate>")
+    print("           --idlefps <how often the loop still wakes per second while no data arrives>")
 
 def get_command_args(argv):
-    aida_sse_server = None
+    aida_sse_servers = []
+    replay_file = None
+    replay_speed = 1.0
+    capture_file = None
+    capture_log_file = None
+    layout_file = AIDA64Layout.default_layout_file
+    metrics_interval = 0
+    target_fps = 30
+    idle_fps = 4
     gpio_enabled = True
 
     try:
-        opts, args = getopt.getopt(argv,"aidasse:",["aidasse=", ])
+        opts, args = getopt.getopt(argv,"aidasse:",["aidasse=", "replay=", "replayspeed=", "capture=", "capturelog=", "layout=", "metrics=", "fps=", "idlefps="])
 
     except getopt.GetoptError:
         print_usage()
@@ -79,21 +119,50 @@ def get_command_args(argv):
             print_usage()
             sys.exit()
         elif opt in ("--aidasse"):
-            aida_sse_server = arg
-
-    if (aida_sse_server is None):
+            # Redundant endpoints in order of preference, the first healthy one feeds the dash
+            aida_sse_servers += [address.strip() for address in arg.split(",") if 0 != len(address.strip())]
+        elif opt == "--replay":
+            replay_file = arg
+        elif opt == "--replayspeed":
+            replay_speed = float(arg)
+        elif opt == "--capture":
+            capture_file = arg
+        elif opt == "--capturelog":
+            capture_log_file = arg
+        elif opt == "--layout":
+            layout_file = arg
+        elif opt == "--metrics":
+            metrics_interval = float(arg)
+        elif opt == "--fps":
+            target_fps = int(arg)
+        elif opt == "--idlefps":
+            idle_fps = int(arg)
+
+    if (0 == len(aida_sse_servers) and replay_file is None):
         print_usage()
         sys.exit()
 
-    return aida_sse_server
+    if "none" == layout_file.lower() or not os.path.exists(layout_file):
+        layout_file = None
+
+    # Never wake less often than we render
+    idle_fps = max(1, min(idle_fps, target_fps))
+
+    return aida_sse_servers, replay_file, replay_speed, capture_file, capture_log_file, layout_file, metrics_interval,\
+        target_fps, idle_fps
 
 def main(argv):
-    aida_sse_server = get_command_args(argv)
-    assert(aida_sse_server is not None)
+    aida_sse_servers, replay_file, replay_speed, capture_file, capture_log_file, layout_file, metrics_interval,\
+        target_fps, idle_fps = get_command_args(argv)
+    assert(0 != len(aida_sse_servers) or replay_file is not None)
 
     if __debug__:
         print("Passed arguments:")
-        print("    aidasse = {}".format(aida_sse_server))
+        print("    aidasse = {}".format(", ".join(aida_sse_servers)))
+        print("    replay = {}, replayspeed = {}".format(replay_file, replay_speed))
+        print("    capture = {}, capturelog = {}".format(capture_file, capture_log_file))
+        print("    layout = {}".format(layout_file))
+        print("    fps = {}, idlefps = {}".format(target_fps, idle_fps))
 
     if g_gpio_button_enabled:
         # Button wiring: 3.3v -> button -> inline resistor -> GPIO15
@@ -113,32 +182,17 @@ def main(argv):
         print("pygame started display started. driver: {}, display_info: \n{}".format(pygame.display.get_driver(), display_info))
 
     display_surface.fill(Color.black)
-    font_message = pygame.freetype.Font(FontPath.fira_code_semibold(), 16)
-    font_message.kerning = True
+    font_message = FontManager.get(16, kerning=True)
     font_message.render_to(display_surface, (10, 10), "Building elements and connecting...", Color.white)
     pygame.display.flip()
 
     ########
-    # Data Gathering
+    # Field Schema
     ########
-    # Start the AIDA64 data thread, fastest update interval is usually ~100ms and can be
-    # adjusted in the AIDA64 preferences.
-    data_queue_maxlen = 1
-    aida64_deque = deque([], maxlen=data_queue_maxlen)
-    aida64_data_thread = threading.Thread(target=AIDA64LCDSSE.threadable_stream_read, args=(aida64_deque, aida_sse_server))
-    aida64_data_thread.setDaemon(True)
-    aida64_data_thread.start()
-
-    # Start DHT22 thread if GPIO is available. Reading this data can take awhile, don't expect
-    # updates to occur under 3-5 seconds.
-    dht22_deque = None
-    dht22_data = None
-    dht22_last_data = None
-    if g_dht22_enabled:
-        dht22_deque = deque([], maxlen=data_queue_maxlen)
-        dht22_data_thread = threading.Thread(target=DHT22.threadable_read_retry, args=(dht22_deque,))
-        dht22_data_thread.setDaemon(True)
-        dht22_data_thread.start()
+    # Slots are compiled from the AIDA64 layout export before any page resolves them
+    if layout_file is not None:
+        AIDA64Layout.compile_field_registry(layout_file)
+    field_registry = DashData.field_registry()
 
     ########
     # Dash Page Setup
@@ -151,20 +205,88 @@ def main(argv):
     available_pages.append(Cooling(base_size, direct_surface=display_surface, direct_rect=base_rect))
     available_pages.append(Power(base_size, direct_surface=display_surface, direct_rect=base_rect))
 
+    # Let the registry know what pages read, the first frame is checked against these
+    page_field_names = [frozenset(data_field.field_name for data_field in page.data_fields) for page in available_pages]
+    for page in available_pages:
+        for data_field in field_registry.subscribe(page.data_fields):
+            print("Field warning: {} reads {} but the layout doesn't export it".format(
+                type(page).__name__, data_field.field_name))
+
+    # The parser skips decoding whatever the visible page doesn't read, starts on the first page
+    field_registry.set_active_fields(available_pages[0].data_fields)
+
+    ########
+    # Data Gathering
+    ########
+    # Started after the pages so their subscriptions are in place for the first frame check.
+    # Every source runs on the one IORuntime loop and hands data over through a mailbox, or a
+    # pygame event for the page button, nothing else is shared with the render loop.
+    io_runtime = IORuntime()
+    io_runtime.start()
+
+    # AIDA64 fastest update interval is usually ~100ms and can be adjusted in the AIDA64
+    # preferences. The mailbox only holds the newest frame and wakes the main loop as soon as one lands.
+    aida64_mailbox = LatestValueMailbox(coalesce=DashSample.coalesce)
+    ingestion_metrics = IngestionMetrics()
+    aida64_link = LinkStatus()
+    if replay_file is not None:
+        # Deterministic runs, same data source interface as the live stream
+        io_runtime.add_source(AIDA64Replay.replay(
+            aida64_mailbox, replay_file, replay_speed, True, ingestion_metrics, aida64_link))
+    else:
+        io_runtime.add_source(AIDA64LCDSSE.stream_read(
+            aida64_mailbox, aida_sse_servers, capture_file, capture_log_file, ingestion_metrics, aida64_link))
+
+    # Read DHT22 if GPIO is available. Reading this data can take awhile, don't expect
+    # updates to occur under 3-5 seconds.
+    dht22_mailbox = None
+    dht22_data = None
+    if g_dht22_enabled:
+        dht22_mailbox = LatestValueMailbox()
+        io_runtime.add_source(DHT22.read_retry_forever(dht22_mailbox))
+
+    if g_gpio_button_enabled:
+        io_runtime.add_source(watch_page_button())
+
     # Track selected page and copies of previously displayed pages
     current_page = 0
     requested_page = current_page
+    subscribed_page = current_page
 
     ########
     # Main loop, this will juggle data and painting the dash page(s)
     ########
-    ticks_since_last_data = 0
-    data_retry_delay = 50
-    retry_ticks_before_screensaver = 2000
+    # Renders are paced by the governor, AIDA64 can update faster or slower than we draw
+    frame_governor = FrameGovernor(target_fps, idle_fps)
 
     if g_dump_display_frames:
         current_frame_number = 0
 
+    # Ingestion metrics print on their own schedule, the BENCHMARK output is per frame
+    if g_benchmark and 0 == metrics_interval:
+        metrics_interval = 5
+    next_metrics_ticks = pygame.time.get_ticks() + (metrics_interval * 1000)
+
+    compositor = DirtyRectCompositor(display_surface.get_size())
+
+    def print_metrics_when_due():
+        nonlocal next_metrics_ticks
+        if 0 == metrics_interval or next_metrics_ticks > pygame.time.get_ticks():
+            return
+
+        print(ingestion_metrics.snapshot(aida64_mailbox).describe())
+        print(compositor.describe())
+        print(frame_governor.describe())
+        print(TextCache.describe())
+        print(FontManager.describe())
+        print(NeedleSpriteCache.describe())
+        next_metrics_ticks = pygame.time.get_ticks() + (metrics_interval * 1000)
+
+    def draw_timed_elements():
+        # Ticks that don't draw a sample still run the page's clock and interval elements, they'd
+        # freeze while the stream is slow, stalled, or only sending other pages
+        compositor.push(available_pages[current_page].draw_timed(dht22_data))
+
     display_surface.fill(Color.black)
     restore_surface = None
     while True:
@@ -172,20 +294,19 @@ def main(argv):
         if g_benchmark:
             loop_start_ticks = pygame.time.get_ticks()
 
-        # Handle any GPIO inputs
-        # TODO: Thread the GPIO read, handle send up a pygame event when pressed
-        if g_gpio_button_enabled:
-            if GPIO.input(Hardware.gpio_button):
+        # Checked before anything can skip the rest of the pass, metrics matter most during outages
+        # and stretches of skipped frames
+        print_metrics_when_due()
+
+        # Handle events, GPIO button presses arrive as page_button_event
+        for event in pygame.event.get():
+            if event.type == Hardware.page_button_event:
                 # Bump up a page, wrap around if it would overrun page list
                 if len(available_pages) != current_page + 1:
                     requested_page = current_page + 1
                 else:
                     requested_page = 0
-                pygame.time.wait(200) # debounce
 
-        # Handle events
-        for event in pygame.event.get():
-            # TODO: Swap for GPIO read of hardware key
             if __debug__:
                 # For debug change pages on press of the UP key
                 if event.type == pygame.KEYDOWN:
@@ -199,38 +320,55 @@ def main(argv):
 
             if event.type == pygame.QUIT:
                 print("User quit")
+
+                # Cancels every data source, connections and capture files are closed on the way out
+                io_runtime.stop()
                 pygame.quit()
                 sys.exit()
-                # TODO: (Adam) 2020-12-02 Properly close out threads and active connections
         pygame.event.clear()
 
-        # AIDA64 data is critical, if it stops we will display a screensaver until the feed returns
-        if data_queue_maxlen > len(aida64_deque):
-            # We can't safely access data if the data queue isn't deep enough. 
-            ticks_since_last_data += data_retry_delay
-            if ticks_since_last_data > retry_ticks_before_screensaver:
+        # The parser only decodes what the visible page reads, switch the subscription as soon as
+        # another page is requested so the frames it will be drawn from have its fields
+        if subscribed_page != requested_page:
+            field_registry.set_active_fields(available_pages[requested_page].data_fields)
+            subscribed_page = requested_page
+
+        # AIDA64 data is critical, if it stops we will display a screensaver until the feed returns.
+        # Takes the newest frame once per tick, idle ticks still come around so GPIO and pygame
+        # events get handled.
+        aida64_data = frame_governor.next_sample(aida64_mailbox)
+        if aida64_data is None:
+            # The ingestion thread publishes drops as they happen, stalls are noticed here
+            aida64_link.check_stalled()
+
+        link_state = aida64_link.changes.take(0)
+        if link_state is not None and __debug__:
+            print(aida64_link.describe())
+
+        if aida64_data is None:
+            if aida64_link.state in (LinkState.stalled, LinkState.reconnecting):
                 if __debug__:
                     print("Data stream lost, starting screensaver...")
 
                 backup_surface = display_surface.copy()
-                MatrixScreensaver.start(restore_surface = display_surface.copy(), data_queue_length = lambda : len(aida64_deque))
+                # The screensaver polls stop_requested every frame, metrics keep printing through the outage
+                MatrixScreensaver.start(
+                    restore_surface = display_surface.copy(), data_queue_length = lambda : len(aida64_mailbox),
+                    stop_requested = lambda : print_metrics_when_due() or False)
                 display_surface.fill(Color.black)
                 display_surface.blit(backup_surface, (0, 0))
                 pygame.display.flip()
+            else:
+                draw_timed_elements()
 
-            # Add a tiny delay while we wait to stop system resources from getting thrashed.
-            pygame.time.wait(data_retry_delay)
             continue
-        else:
-            ticks_since_last_data = 0
-
-        # Best attempt to grab DHT22 Data for ambient temperature and humidity readings
-        if dht22_deque is not None:
-            if data_queue_maxlen <= len(dht22_deque):
-                dht22_data = dht22_deque.popleft()
-                dht22_last_data = dht22_data
-            else:
-                dht22_data = dht22_last_data
+
+        # Best attempt to grab DHT22 Data for ambient temperature and humidity readings, keeps the
+        # last reading until a new one arrives.
+        if dht22_mailbox is not None:
+            new_dht22_data = dht22_mailbox.take(0)
+            if new_dht22_data is not None:
+                dht22_data = new_dht22_data
 
         if __debug__:
             # Debug override, probably developing on a system without GPIO, here's some fake values for testing
@@ -239,7 +377,13 @@ def main(argv):
         if g_benchmark:
             draw_start_ticks = pygame.time.get_ticks()
 
-        # Data is ready, select the page and bring it to the display surface
+        # Data is ready, select the page and bring it to the display surface. Frames decoded with the
+        # old page's subscription would draw the new page from stale or missing fields, the switch
+        # waits for one that has them.
+        if current_page != requested_page and not aida64_data.is_decoded(page_field_names[requested_page]):
+            frame_governor.skipped()
+            continue
+
         if current_page != requested_page:
             assert(len(available_pages) >= requested_page)
 
@@ -250,29 +394,42 @@ def main(argv):
             available_pages[current_page].backup_element_surface()
             current_page = requested_page
 
-            # Flush the previous page, restore the new page, then continue into the next update loop
+            # Flush the previous page and restore the new page, the frame we just took draws over it.
+            # Fields may have changed while the page was hidden, redraw everything.
             display_surface.fill(Color.black)
             available_pages[current_page].restore_element_surface()
             pygame.display.flip()
+            aida64_data.mark_all_changed()
+
+        # Multi-page streams send AIDA64 pages at their own rates, frames from an AIDA64 page carrying
+        # nothing this dash page reads only scroll the graphs and run what's due on a timer
+        if aida64_data.changed_fields is not None and aida64_data.page_index is not None and \
+                page_field_names[current_page].isdisjoint(aida64_data.page_keys[aida64_data.page_index]) and \
+                page_field_names[current_page].isdisjoint(aida64_data.changed_fields):
+            frame_governor.skipped()
+            compositor.push(available_pages[current_page].draw_sampled(aida64_data, dht22_data))
             continue
 
         # Returns a surface to blit, if direct_surface and direct_rect defined it uses subsurfaces and
         # returns "blitable_surface, updated rects" for each element that will not be None if they were redrawn.
         try:
-            update_rects = available_pages[current_page].draw_update(aida64_deque.popleft(), dht22_data)
+            update_rects = available_pages[current_page].draw_update(aida64_data, dht22_data)
         except:
             if __debug__:
                 print("Exception during update")
                 traceback.print_exc()
                 continue
 
-        assert(0 != len(update_rects))
-        pygame.display.update(update_rects)
+        # Pages skip elements whose fields didn't change, the compositor merges what's left into the
+        # fewest pixels and pushes nothing if the sample was a repeat
+        pixels_pushed = compositor.push(update_rects)
 
         if g_benchmark:
-            print("BENCHMARK: Draw: {}ms".format(pygame.time.get_ticks() - draw_start_ticks))
+            print("BENCHMARK: Draw: {}ms, {} pixels pushed".format(pygame.time.get_ticks() - draw_start_ticks, pixels_pushed))
         if g_benchmark:
             print("BENCHMARK: Loop update: {}ms".format(pygame.time.get_ticks() - loop_start_ticks))
+            print("BENCHMARK: Frames overwritten before draw: {} of {}".format(
+                aida64_mailbox.overwritten_count, aida64_mailbox.published_count))
 
         if g_dump_display_frames:
             output_filename = "frame_{}.png".format(current_frame_number)
@@ -0,0 +1,145 @@
+#
+# cadence - Calls only the page elements that are due each frame
+# ===============================================================
+#
+# Author: Adam J. Bauman (https://gist.github.com/adambauman)
+#
+# Pages register a draw call per element with how often it needs to run:
+#   every_sample    line graphs that scroll with each sample
+#   on_change       any of its data_fields changed, or the watch(aida64_data, dht22_data) value did
+#   interval        every interval_ms, slow movers like network rates and drive space
+#   wall_second     once per wall clock second, the clock
+# A sample with changed_fields None (first frame, page switch) runs everything so restored pages
+# come back complete. Draw calls take (aida64_data, dht22_data) and return an update rect or None.
+# draw_timed() runs the interval and wall_second entries on ticks without a sample to draw, with the
+# last sample draw_due() saw, so clocks keep time through slow or stalled streams. draw_sampled()
+# adds the every_sample entries for samples from AIDA64 pages the dash page doesn't read.
+#
+
+import pygame
+from time import time
+
+class Cadence:
+    every_sample = 0
+    on_change = 1
+    interval = 2
+    wall_second = 3
+
+    names = ("every_sample", "on_change", "interval", "wall_second")
+
+class CadenceEntry:
+    def __init__(self, draw, cadence, data_fields=None, watch=None, interval_ms=0):
+        assert(draw is not None)
+        assert(Cadence.interval != cadence or 0 < interval_ms)
+
+        self.draw = draw
+        self.cadence = cadence
+        self.data_fields = tuple(data_fields) if data_fields is not None else ()
+        self.watch = watch
+        self.interval_ms = interval_ms
+
+        self.last_watch_value = None
+        self.last_run_ticks = None
+        self.last_run_second = None
+        self.run_count = 0
+
+class CadenceScheduler:
+
+    def __init__(self):
+        self.entries = []
+        self.called_count = 0
+        self.skipped_count = 0
+        self.timed_count = 0
+
+        self._last_aida64_data = None
+
+    def add(self, draw, cadence, data_fields=None, watch=None, interval_ms=0):
+        entry = CadenceEntry(draw, cadence, data_fields, watch, interval_ms)
+        self.entries.append(entry)
+        return entry
+
+    def every_sample(self, draw):
+        return self.add(draw, Cadence.every_sample)
+
+    def on_change(self, draw, data_fields=None, watch=None):
+        # No fields and no watch only draws on full redraws, static labels
+        return self.add(draw, Cadence.on_change, data_fields=data_fields, watch=watch)
+
+    def interval(self, draw, interval_ms):
+        return self.add(draw, Cadence.interval, interval_ms=interval_ms)
+
+    def wall_second(self, draw):
+        return self.add(draw, Cadence.wall_second)
+
+    @staticmethod
+    def __is_due__(entry, aida64_data, dht22_data, now_ticks, now_second):
+        if Cadence.every_sample == entry.cadence:
+            return True
+
+        if Cadence.on_change == entry.cadence:
+            if entry.watch is not None:
+                watch_value = entry.watch(aida64_data, dht22_data)
+                if watch_value != entry.last_watch_value:
+                    entry.last_watch_value = watch_value
+                    return True
+            return 0 != len(entry.data_fields) and aida64_data.any_changed(entry.data_fields)
+
+        if Cadence.interval == entry.cadence:
+            return entry.last_run_ticks is None or entry.interval_ms <= now_ticks - entry.last_run_ticks
+
+        if Cadence.wall_second == entry.cadence:
+            return now_second != entry.last_run_second
+
+        assert(False)
+        return False
+
+    def __run__(self, entry, aida64_data, dht22_data, now_ticks, now_second):
+        entry.last_run_ticks = now_ticks
+        entry.last_run_second = now_second
+        entry.run_count += 1
+        self.called_count += 1
+        return entry.draw(aida64_data, dht22_data)
+
+    def draw_due(self, aida64_data, dht22_data=None):
+        # Returns the update rects of every element that ran, same shape pages already return
+        now_ticks = pygame.time.get_ticks()
+        now_second = int(time())
+        redraw_all = aida64_data.changed_fields is None
+        self._last_aida64_data = aida64_data
+
+        update_rects = []
+        for entry in self.entries:
+            if not redraw_all and not self.__is_due__(entry, aida64_data, dht22_data, now_ticks, now_second):
+                self.skipped_count += 1
+                continue
+
+            update_rects.append(self.__run__(entry, aida64_data, dht22_data, now_ticks, now_second))
+
+        return update_rects
+
+    def __draw_cadences__(self, cadences, aida64_data, dht22_data):
+        now_ticks = pygame.time.get_ticks()
+        now_second = int(time())
+
+        update_rects = []
+        for entry in self.entries:
+            if entry.cadence not in cadences or not self.__is_due__(entry, aida64_data, dht22_data, now_ticks, now_second):
+                continue
+
+            update_rects.append(self.__run__(entry, aida64_data, dht22_data, now_ticks, now_second))
+            self.timed_count += 1
+
+        return update_rects
+
+    def draw_sampled(self, aida64_data, dht22_data=None):
+        # A sample that changed nothing the page reads, every_sample entries still run so graphs
+        # scroll once per sample, plus any time based entries that are due
+        self._last_aida64_data = aida64_data
+        return self.__draw_cadences__((Cadence.every_sample, Cadence.interval, Cadence.wall_second), aida64_data, dht22_data)
+
+    def draw_timed(self, dht22_data=None):
+        # Time based entries only, nothing runs until draw_due() has seen a sample
+        if self._last_aida64_data is None:
+            return []
+
+        return self.__draw_cadences__((Cadence.interval, Cadence.wall_second), self._last_aida64_data, dht22_data)
@@ -15,6 +15,7 @@ from data.dataobjects import DataField, DashData
 
 from elements.helpers import Helpers
 from elements.styles import Color, AssetPath, FontPath
+from elements.fontmanager import FontManager
 from elements.bargraph import BarGraph, BarGraphConfig
 from elements.text import  TemperatureHumidity, MotherboardTemperatureSensors
 from elements.visualizers import PumpStatus, PumpStatusConfig, GPUTemperature, GPUTemperatureConfig, HomeTemperature, HomeTemperatureConfig
@@ -105,6 +106,7 @@ class Cooling:
     _backup_surface = None
     _background = None
     _surface_flags = None
+    _absent_fields_dropped = False
 
     def __init__(self, base_size, direct_surface=None, direct_rect=None, surface_flags=0):
         assert((0, 0) != base_size)
@@ -116,11 +118,7 @@ class Cooling:
         else:
             self.working_surface = pygame.Surface(base_size, surface_flags)
 
-        self._font_normal = pygame.freetype.Font(FontPath.fira_code_semibold(), 12)
-        self._font_normal.kerning = True
-
-        # TODO: (Adam) 2020-12-11 Pass in a shared fonts object, lots of these controls have their own
-        #           font instances. Would cut down on memory usage and make it easier to match font styles.
+        self._font_normal = FontManager.get(12, kerning=True)
 
         self._configs = CoolingConfigs(self._font_normal)
         self._positions = CoolingPositions(base_size, self._configs)
@@ -154,6 +152,23 @@ class Cooling:
         self._case_profile.fill(Color.grey_40, special_flags=pygame.BLEND_RGBA_MULT)
         self._heat_map = pygame.image.load(os.path.join(AssetPath.misc, "case_heatmap.png")).convert() # Meant as BG, no alpha
 
+        # Static page background, blitted once here. Elements drawn on top of it get their area restored
+        # from this copy before they redraw so the rest of the page doesn't have to be touched.
+        self._background = pygame.Surface(base_size, surface_flags)
+        self._background.fill(Color.black)
+        self._background.blit(self._heat_map, (0, 34))
+        self._background.blit(self._case_profile, (366, 0))
+        self.working_surface.blit(self._background, (0, 0))
+
+        # Everything draw_update reads, subscribed with the field registry
+        self.data_fields = (
+            DashData.cpu_temp, DashData.cpu_fan, DashData.gpu_temp, DashData.gpu_fan, DashData.chassis_3_fan,
+            DashData.cpu_opt_fan, DashData.chassis_1_fan, DashData.chassis_2_fan) +\
+            tuple(self._motherboard_temps.data_fields)
+
+        # Sensors the layout doesn't export can be dropped now, the rest once enough frames show up
+        self._motherboard_temps.drop_absent_fields(DashData.field_registry(), DashData.absent_frame_limit)
+
     def __draw_front_intake_fans__(self, value, using_direct_surface=False):
 
         # Draw two bars matching the exhaust style, flip 90 CCW
@@ -190,6 +205,9 @@ class Cooling:
          
         return update_rect
 
+    def __restore_background__(self, rect):
+        self.working_surface.blit(self._background, rect, rect)
+
     def backup_element_surface(self):
         # Blit, copy doesn't work if this is a subsurfaced direct-draw element
         self._backup_surface = pygame.Surface(self.working_surface.get_size())
@@ -198,43 +216,70 @@ class Cooling:
     def restore_element_surface(self):
         if self._backup_surface:
             self.working_surface.blit(self._backup_surface, (0, 0))
+        else:
+            # First visit, other pages share the display surface and will have drawn over the background
+            self.working_surface.blit(self._background, (0, 0))
 
     def draw_update(self, aida64_data, dht22_data=None, redraw_all=False):
 
         assert(0 != len(aida64_data))
 
-        self.working_surface.blit(self._heat_map, (0, 34))
-        self.working_surface.blit(self._case_profile, (366, 0))
-
+        # Elements are skipped entirely if none of their fields changed since the last sample
         update_rects = []
 
-        cpu_fan_value = DashData.best_attempt_read(aida64_data, DashData.cpu_fan, "0")
-        cpu_temperature_value = DashData.best_attempt_read(aida64_data, DashData.cpu_temp, "0")
-        update_rects.append(self._cpu_pump_status.draw_update(cpu_temperature_value, cpu_fan_value))
+        if aida64_data.any_changed((DashData.cpu_temp, DashData.cpu_fan)):
+            cpu_fan_value = DashData.best_attempt_read(aida64_data, DashData.cpu_fan, 0)
+            cpu_temperature_value = DashData.best_attempt_read(aida64_data, DashData.cpu_temp, 0)
+            self.__restore_background__(self._positions.cpu_pump)
+            update_rects.append(self._cpu_pump_status.draw_update(cpu_temperature_value, cpu_fan_value))
 
-        gpu_temperature_value = DashData.best_attempt_read(aida64_data, DashData.gpu_temp, "0")
-        gpu_fan_value = DashData.best_attempt_read(aida64_data, DashData.gpu_fan, "0")
-        update_rects.append(self._gpu_temperature.draw_update(gpu_temperature_value, gpu_fan_value))
+        if aida64_data.any_changed((DashData.gpu_temp, DashData.gpu_fan)):
+            gpu_temperature_value = DashData.best_attempt_read(aida64_data, DashData.gpu_temp, 0)
+            gpu_fan_value = DashData.best_attempt_read(aida64_data, DashData.gpu_fan, 0)
+            self.__restore_background__(self._positions.gpu_temperature)
+            update_rects.append(self._gpu_temperature.draw_update(gpu_temperature_value, gpu_fan_value))
 
         # Fan bar graphs
-        rear_exhaust_fan_value = DashData.best_attempt_read(aida64_data, DashData.chassis_3_fan, "0")
-        update_rects.append(self._rear_exhaust_fan_bar.draw_update(rear_exhaust_fan_value))
-
-        forward_exhaust_fan_value = DashData.best_attempt_read(aida64_data, DashData.cpu_opt_fan, "0")
-        update_rects.append(self._forward_exhaust_fan_bar.draw_update(forward_exhaust_fan_value))
-
-        front_intake_fan_value = DashData.best_attempt_read(aida64_data, DashData.chassis_1_fan, "0")
-        update_rects.append(
-            self.__draw_front_intake_fans__(front_intake_fan_value, using_direct_surface=True))
-
-        bottom_intake_fan_value = DashData.best_attempt_read(aida64_data, DashData.chassis_2_fan, "0")
-        update_rects.append(
-            self.__draw_bottom_intake_fans_(bottom_intake_fan_value, using_direct_surface=True))
-
-        update_rects.append(self._motherboard_temps.draw_update(aida64_data))
+        if aida64_data.has_changed(DashData.chassis_3_fan):
+            rear_exhaust_fan_value = DashData.best_attempt_read(aida64_data, DashData.chassis_3_fan, 0)
+            update_rects.append(self._rear_exhaust_fan_bar.draw_update(rear_exhaust_fan_value))
+
+        if aida64_data.has_changed(DashData.cpu_opt_fan):
+            forward_exhaust_fan_value = DashData.best_attempt_read(aida64_data, DashData.cpu_opt_fan, 0)
+            update_rects.append(self._forward_exhaust_fan_bar.draw_update(forward_exhaust_fan_value))
+
+        if aida64_data.has_changed(DashData.chassis_1_fan):
+            front_intake_fan_value = DashData.best_attempt_read(aida64_data, DashData.chassis_1_fan, 0)
+            update_rects.append(
+                self.__draw_front_intake_fans__(front_intake_fan_value, using_direct_surface=True))
+
+        if aida64_data.has_changed(DashData.chassis_2_fan):
+            bottom_intake_fan_value = DashData.best_attempt_read(aida64_data, DashData.chassis_2_fan, 0)
+            update_rects.append(
+                self.__draw_bottom_intake_fans_(bottom_intake_fan_value, using_direct_surface=True))
+
+        # Hosts without PCH or NVME sensors, stop reading them once it's clear they won't show up
+        if not self._absent_fields_dropped and DashData.absent_frame_limit <= DashData.field_registry().frame_count:
+            self._absent_fields_dropped = True
+            kept_fields = self._motherboard_temps.drop_absent_fields(DashData.field_registry(), DashData.absent_frame_limit)
+            if __debug__:
+                print("Cooling: reading {} of {} motherboard sensor(s)".format(
+                    len(kept_fields), len(MotherboardTemperatureSensors.data_fields)))
+
+        if aida64_data.any_changed(self._motherboard_temps.data_fields):
+            self.__restore_background__(self._positions.motherboard_temps_rect)
+            update_rects.append(self._motherboard_temps.draw_update(aida64_data))
 
         # Ambient temperature and humidity
         if dht22_data:
             update_rects.append(self._home_temperature.draw_update(dht22_data.temperature))
 
         return update_rects
+
+    def draw_timed(self, dht22_data=None):
+        # Nothing on this page runs on a timer, it only changes with samples
+        return []
+
+    def draw_sampled(self, aida64_data, dht22_data=None):
+        # Nothing on this page scrolls, samples that changed nothing here draw nothing
+        return []
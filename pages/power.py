@@ -17,6 +17,7 @@ from elements.text import EnclosedLabel, EnclosedLabelConfig, SimpleText
 from elements.linegraph import LineGraphConfig, LineGraphReverse
 from elements.helpers import Helpers
 from elements.styles import Color, AssetPath, FontPath
+from elements.fontmanager import FontManager
 
 if __debug__:
     import traceback
@@ -115,8 +116,7 @@ class Power:
         else:
             self.working_surface = pygame.Surface(base_size, surface_flags)
 
-        self._font_normal = pygame.freetype.Font(FontPath.fira_code_semibold(), 12)
-        self._font_normal.kerning = True
+        self._font_normal = FontManager.get(12, kerning=True)
 
         self._configs = PowerConfigs(self._font_normal)
         self._positions = PowerPositions(base_size, self._configs)
@@ -263,6 +263,11 @@ class Power:
         self._gpu_util_label = SimpleText(
             self._positions.gpu_graph_label, "GPU Utilization: {}%", text_color=Color.grey_75, direct_surface=self.working_surface)
 
+        # Everything draw_update reads, subscribed with the field registry
+        self.data_fields = (
+            DashData.volts_12, DashData.volts_5, DashData.volts_3_3, DashData.volts_cpu_vid, DashData.volts_dimm,
+            DashData.volts_gpu_core, DashData.cpu_util, DashData.gpu_util)
+
     def backup_element_surface(self):
         # Blit, copy doesn't work if this is a subsurfaced direct-draw element
         self._backup_surface = pygame.Surface(self.working_surface.get_size())
@@ -279,54 +284,55 @@ class Power:
         update_rects = []
 
         # NOTE: Don't update bars or values if updates fail or read zero, it will mess up your history bar's history
+        # Rails only redraw when their field changed, min/max history isn't affected by repeated values
 
         # PSU 12v
         volts_12_value = DashData.best_attempt_read(aida64_data, DashData.volts_12, None)
-        if volts_12_value or "0" != volts_12_value:
+        if volts_12_value and aida64_data.has_changed(DashData.volts_12):
             update_rects.append(self._volts_12.draw_update(volts_12_value))
-            update_rects.append(self._volts_12_value.draw("{}v".format(volts_12_value)))
+            update_rects.append(self._volts_12_value.draw("{:.3f}v".format(volts_12_value)))
             update_rects.append(self._volts_12_label.draw())
 
-            if DashData.volts_12.min_value > float(volts_12_value):
+            if DashData.volts_12.min_value > volts_12_value:
                 update_rects.append(self._volts_12_min.draw_update(self._volts_12.min_history_value, Color.windows_red_1))
             else:
                 update_rects.append(self._volts_12_min.draw_update(self._volts_12.min_history_value))
 
-            if DashData.volts_12.max_value < float(volts_12_value):
+            if DashData.volts_12.max_value < volts_12_value:
                 update_rects.append(self._volts_12_max.draw_update(self._volts_12.max_history_value, Color.windows_red_1))
             else:
                 update_rects.append(self._volts_12_max.draw_update(self._volts_12.max_history_value))
 
         # PSU 5v
         volts_5_value = DashData.best_attempt_read(aida64_data, DashData.volts_5, None)
-        if volts_5_value or "0" != volts_5_value:
+        if volts_5_value and aida64_data.has_changed(DashData.volts_5):
             update_rects.append(self._volts_5.draw_update(volts_5_value))
-            update_rects.append(self._volts_5_value.draw(" {}v".format(volts_5_value)))
+            update_rects.append(self._volts_5_value.draw(" {:.3f}v".format(volts_5_value)))
             update_rects.append(self._volts_5_label.draw())
 
-            if DashData.volts_5.min_value > float(volts_5_value):
+            if DashData.volts_5.min_value > volts_5_value:
                 update_rects.append(self._volts_5_min.draw_update(self._volts_5.min_history_value, Color.windows_red_1))
             else:
                 update_rects.append(self._volts_5_min.draw_update(self._volts_5.min_history_value))
 
-            if DashData.volts_5.max_value < float(volts_5_value):
+            if DashData.volts_5.max_value < volts_5_value:
                 update_rects.append(self._volts_5_max.draw_update(self._volts_5.max_history_value, Color.windows_red_1))
             else:
                 update_rects.append(self._volts_5_max.draw_update(self._volts_5.max_history_value))
 
         # PSU 3.3v
         volts_3_3_value = DashData.best_attempt_read(aida64_data, DashData.volts_3_3, None)
-        if volts_3_3_value or "0" != volts_3_3_value:
+        if volts_3_3_value and aida64_data.has_changed(DashData.volts_3_3):
             update_rects.append(self._volts_3_3.draw_update(volts_3_3_value))
-            update_rects.append(self._volts_3_3_value.draw(" {}v".format(volts_3_3_value)))
+            update_rects.append(self._volts_3_3_value.draw(" {:.3f}v".format(volts_3_3_value)))
             update_rects.append(self._volts_3_3_label.draw())
 
-            if DashData.volts_3_3.min_value > float(volts_3_3_value):
+            if DashData.volts_3_3.min_value > volts_3_3_value:
                 update_rects.append(self._volts_3_3_min.draw_update(self._volts_3_3.min_history_value, Color.windows_red_1))
             else:
                 update_rects.append(self._volts_3_3_min.draw_update(self._volts_3_3.min_history_value))
 
-            if DashData.volts_3_3.max_value < float(volts_3_3_value):
+            if DashData.volts_3_3.max_value < volts_3_3_value:
                 update_rects.append(self._volts_3_3_max.draw_update(self._volts_3_3.max_history_value, Color.windows_red_1))
             else:
                 update_rects.append(self._volts_3_3_max.draw_update(self._volts_3_3.max_history_value))
@@ -334,65 +340,83 @@ class Power:
         # CPU VID
         # NOTE: AIDA64 reports cpu_vid and cpu_core voltages as same value on my system
         volts_cpuvid_value = DashData.best_attempt_read(aida64_data, DashData.volts_cpu_vid, None)
-        if volts_cpuvid_value or "0" != volts_cpuvid_value:
+        if volts_cpuvid_value and aida64_data.has_changed(DashData.volts_cpu_vid):
             update_rects.append(self._volts_cpuvid.draw_update(volts_cpuvid_value))
-            update_rects.append(self._volts_cpuvid_value.draw(" {}v".format(volts_cpuvid_value)))
+            update_rects.append(self._volts_cpuvid_value.draw(" {:.3f}v".format(volts_cpuvid_value)))
             update_rects.append(self._volts_cpuvid_label.draw())
 
-            if DashData.volts_cpu_vid.min_value > float(volts_cpuvid_value):
+            if DashData.volts_cpu_vid.min_value > volts_cpuvid_value:
                 update_rects.append(self._volts_cpuvid_min.draw_update(self._volts_cpuvid.min_history_value, Color.windows_red_1))
             else:
                 update_rects.append(self._volts_cpuvid_min.draw_update(self._volts_cpuvid.min_history_value))
 
-            if DashData.volts_cpu_vid.max_value < float(volts_cpuvid_value):
+            if DashData.volts_cpu_vid.max_value < volts_cpuvid_value:
                 update_rects.append(self._volts_cpuvid_max.draw_update(self._volts_cpuvid.max_history_value, Color.windows_red_1))
             else:
                 update_rects.append(self._volts_cpuvid_max.draw_update(self._volts_cpuvid.max_history_value))
 
         # DIMM V
         volts_dimm_value = DashData.best_attempt_read(aida64_data, DashData.volts_dimm, None)
-        if volts_dimm_value or "0" != volts_dimm_value:
+        if volts_dimm_value and aida64_data.has_changed(DashData.volts_dimm):
             update_rects.append(self._volts_dimm.draw_update(volts_dimm_value))
-            update_rects.append(self._volts_dimm_value.draw(" {}v".format(volts_dimm_value)))
+            update_rects.append(self._volts_dimm_value.draw(" {:.3f}v".format(volts_dimm_value)))
             update_rects.append(self._volts_dimm_label.draw())
 
-            if DashData.volts_dimm.min_value > float(volts_dimm_value):
+            if DashData.volts_dimm.min_value > volts_dimm_value:
                 update_rects.append(self._volts_dimm_min.draw_update(self._volts_dimm.min_history_value, Color.windows_red_1))
             else:
                 update_rects.append(self._volts_dimm_min.draw_update(self._volts_dimm.min_history_value))
 
-            if DashData.volts_dimm.max_value < float(volts_dimm_value):
+            if DashData.volts_dimm.max_value < volts_dimm_value:
                 update_rects.append(self._volts_dimm_max.draw_update(self._volts_dimm.max_history_value, Color.windows_red_1))
             else:
                 update_rects.append(self._volts_dimm_max.draw_update(self._volts_dimm.max_history_value))
 
         # GPU Core
         volts_gpu_core_value = DashData.best_attempt_read(aida64_data, DashData.volts_gpu_core, None)
-        if volts_gpu_core_value or "0" != volts_gpu_core_value:
+        if volts_gpu_core_value and aida64_data.has_changed(DashData.volts_gpu_core):
             update_rects.append(self._volts_gpu_core.draw_update(volts_gpu_core_value))
-            update_rects.append(self._volts_gpu_core_value.draw(" {}v".format(volts_gpu_core_value)))
+            update_rects.append(self._volts_gpu_core_value.draw(" {:.3f}v".format(volts_gpu_core_value)))
             update_rects.append(self._volts_gpu_core_label.draw())
 
-            if DashData.volts_gpu_core.min_value > float(volts_gpu_core_value):
+            if DashData.volts_gpu_core.min_value > volts_gpu_core_value:
                 update_rects.append(self._volts_gpu_core_min.draw_update(self._volts_gpu_core.min_history_value, Color.windows_red_1))
             else:
                 update_rects.append(self._volts_gpu_core_min.draw_update(self._volts_gpu_core.min_history_value))
 
-            if DashData.volts_gpu_core.max_value < float(volts_gpu_core_value):
+            if DashData.volts_gpu_core.max_value < volts_gpu_core_value:
                 update_rects.append(self._volts_gpu_core_max.draw_update(self._volts_gpu_core.max_history_value, Color.windows_red_1))
             else:
                 update_rects.append(self._volts_gpu_core_max.draw_update(self._volts_gpu_core.max_history_value))
 
+        update_rects += self.__draw_utilization__(aida64_data, draw_labels=True)
+
+        return update_rects
+
+    def __draw_utilization__(self, aida64_data, draw_labels):
+        # Graphs scroll with every sample, labels only redraw when their value changed
+        update_rects = []
+
         # CPU Utilization
         cpu_util = DashData.best_attempt_read(aida64_data, DashData.cpu_util, None)
-        if cpu_util:
+        if cpu_util is not None:
             update_rects.append(self._cpu_util_graph.draw_update(cpu_util))
-            update_rects.append(self._cpu_util_label.draw_update(cpu_util))
+            if draw_labels and aida64_data.has_changed(DashData.cpu_util):
+                update_rects.append(self._cpu_util_label.draw_update(cpu_util))
 
         # GPU Utilization
         gpu_util = DashData.best_attempt_read(aida64_data, DashData.gpu_util, None)
-        if gpu_util:
+        if gpu_util is not None:
             update_rects.append(self._gpu_util_graph.draw_update(gpu_util))
-            update_rects.append(self._gpu_util_label.draw_update(gpu_util))
+            if draw_labels and aida64_data.has_changed(DashData.gpu_util):
+                update_rects.append(self._gpu_util_label.draw_update(gpu_util))
 
         return update_rects
+
+    def draw_timed(self, dht22_data=None):
+        # Nothing on this page runs on a timer, it only changes with samples
+        return []
+
+    def draw_sampled(self, aida64_data, dht22_data=None):
+        # Samples that changed nothing here, the utilization graphs keep scrolling with time
+        return self.__draw_utilization__(aida64_data, draw_labels=False)
@@ -16,6 +16,7 @@ from data.units import Unit, Units
 from data.dataobjects import DataField, DashData
 
 from elements.styles import Color, AssetPath, FontPath
+from elements.fontmanager import FontManager
 from elements.gauge import FlatArcGauge, GaugeConfig 
 from elements.bargraph import BarGraph, BarGraphConfig
 from elements.linegraph import LineGraphReverse, LineGraphConfig
@@ -24,6 +25,8 @@ from elements.text import FPSText, CPUDetails, GPUDetails, TemperatureHumidity,
 
 from elements.helpers import Helpers
 
+from pages.cadence import CadenceScheduler
+
 if __debug__:
     import traceback
 
@@ -145,8 +148,7 @@ class SystemStats:
         else:
             self.working_surface = pygame.Surface(self._base_size, surface_flags)
 
-        self.font_normal = pygame.freetype.Font(FontPath.fira_code_semibold(), 12)
-        self.font_normal.kerning = True
+        self.font_normal = FontManager.get(12, kerning=True)
         
         assert(self.working_surface)
 
@@ -213,75 +215,103 @@ class SystemStats:
         self._network_info = NetworkInformation(self._positions.network_info, direct_surface=self.working_surface)
         self._clock = SimpleText(self._positions.clock, direct_surface=self.working_surface)
 
-    def backup_element_surface(self):
-        # Blit, copy doesn't work if this is a subsurfaced direct-draw element
-        self._backup_surface = pygame.Surface(self.working_surface.get_size())
-        self._backup_surface.blit(self.working_surface, (0, 0))
-
-    def restore_element_surface(self):
-        if self._backup_surface:
-            self.working_surface.blit(self._backup_surface, (0, 0))
+        # Everything draw_update reads, subscribed with the field registry
+        self.data_fields = (
+            DashData.cpu_util, DashData.gpu_util, DashData.rtss_fps, DashData.cpu_temp, DashData.gpu_temp,
+            DashData.sys_ram_used, DashData.gpu_ram_used, DashData.chassis_1_fan, DashData.cpu_opt_fan,
+            DashData.cpu_fan, DashData.gpu_fan, DashData.motherboard_temp, DashData.nic1_download_rate,
+            DashData.nic1_upload_rate) +\
+            tuple(self._cpu_details.data_fields) + tuple(self._gpu_details.data_fields) +\
+            tuple(self._core_visualizer.data_fields)
 
-    def draw_update(self, aida64_data, dht22_data=None):
-        assert(0 != len(aida64_data))
+        self._scheduler = CadenceScheduler()
+        self.__schedule_elements__()
 
-        # Track the rects that were updated so we can tell the display surface where to redraw.
-        # Elements that don't require updates will append a None value.
-        update_rects = []
+    @staticmethod
+    def __field_draw__(element, data_field):
+        return lambda aida64_data, dht22_data : element.draw_update(DashData.best_attempt_read(aida64_data, data_field, 0))
 
-        cpu_utilization_value = DashData.best_attempt_read(aida64_data, DashData.cpu_util, "0")
-        update_rects.append(self._cpu_graph.draw_update(cpu_utilization_value))
+    def __schedule_elements__(self):
+        scheduler = self._scheduler
 
-        gpu_utilization_value = DashData.best_attempt_read(aida64_data, DashData.gpu_util, "0")
-        update_rects.append(self._gpu_graph.draw_update(gpu_utilization_value))
+        # Line graphs scroll on every sample
+        scheduler.every_sample(self.__field_draw__(self._cpu_graph, DashData.cpu_util))
+        scheduler.every_sample(self.__field_draw__(self._gpu_graph, DashData.gpu_util))
 
-        cpu_temperature = DashData.best_attempt_read(aida64_data, DashData.cpu_temp, "0")
-        update_rects.append(self._cpu_temp_gauge.draw_update(cpu_temperature))
-        gpu_temperature = DashData.best_attempt_read(aida64_data, DashData.gpu_temp, "0")
-        update_rects.append(self._gpu_temp_gauge.draw_update(gpu_temperature))
+        # Everything else is skipped if none of its fields changed since the last sample
+        scheduler.on_change(self.__field_draw__(self._cpu_temp_gauge, DashData.cpu_temp), (DashData.cpu_temp,))
+        scheduler.on_change(self.__field_draw__(self._gpu_temp_gauge, DashData.gpu_temp), (DashData.gpu_temp,))
 
-        fan1_value = DashData.best_attempt_read(aida64_data, DashData.chassis_1_fan, "0")
-        update_rects.append(self._fan1_gauge.draw_update(fan1_value))
-        fan_opt_value = DashData.best_attempt_read(aida64_data, DashData.cpu_opt_fan, "0")
-        update_rects.append(self._fan_opt_gauge.draw_update(fan_opt_value))
-        gpu_fan_value = DashData.best_attempt_read(aida64_data, DashData.gpu_fan, "0")
-        update_rects.append(self._gpu_fan_gauge.draw_update(gpu_fan_value))
+        scheduler.on_change(self.__field_draw__(self._fan1_gauge, DashData.chassis_1_fan), (DashData.chassis_1_fan,))
+        scheduler.on_change(self.__field_draw__(self._fan_opt_gauge, DashData.cpu_opt_fan), (DashData.cpu_opt_fan,))
+        scheduler.on_change(self.__field_draw__(self._gpu_fan_gauge, DashData.gpu_fan), (DashData.gpu_fan,))
 
         # NOTE: CPU fan reporting is flaky on this motherboard? Disabling for now.
-        #cpu_fan_value = DashData.best_attempt_read(aida64_data, DashData.cpu_fan, "0")
-        #update_rects.append(self._cpu_fan_gauge.draw_update(cpu_fan_value)[1])
+        #scheduler.on_change(self.__field_draw__(self._cpu_fan_gauge, DashData.cpu_fan), (DashData.cpu_fan,))
 
-        update_rects.append(self._cpu_details.draw_update(aida64_data))
-        update_rects.append(self._gpu_details.draw_update(aida64_data))
+        scheduler.on_change(
+            lambda aida64_data, dht22_data : self._cpu_details.draw_update(aida64_data), self._cpu_details.data_fields)
+        scheduler.on_change(
+            lambda aida64_data, dht22_data : self._gpu_details.draw_update(aida64_data), self._gpu_details.data_fields)
 
-        sys_memory_value = DashData.best_attempt_read(aida64_data, DashData.sys_ram_used, "0")
-        update_rects.append(self._sys_memory_bar.draw_update(sys_memory_value))
-        gpu_memory_value = DashData.best_attempt_read(aida64_data, DashData.gpu_ram_used, "0")
-        update_rects.append(self._gpu_memory_bar.draw_update(gpu_memory_value))
-       
-        update_rects.append(self._core_visualizer.draw_update(aida64_data))
+        scheduler.on_change(self.__field_draw__(self._sys_memory_bar, DashData.sys_ram_used), (DashData.sys_ram_used,))
+        scheduler.on_change(self.__field_draw__(self._gpu_memory_bar, DashData.gpu_ram_used), (DashData.gpu_ram_used,))
 
-        fps_value = DashData.best_attempt_read(aida64_data, DashData.rtss_fps, "0")
-        update_rects.append(self._fps_graph.draw_update(fps_value))
-        update_rects.append(self._fps_text.draw_update(fps_value))
+        scheduler.on_change(
+            lambda aida64_data, dht22_data : self._core_visualizer.draw_update(aida64_data), self._core_visualizer.data_fields)
 
-        # Ambient temperature and humidity
-        if dht22_data is not None:
-            update_rects.append(self._temperature_humidity.draw_update(dht22_data))
+        scheduler.every_sample(self.__field_draw__(self._fps_graph, DashData.rtss_fps))
+        scheduler.on_change(self.__field_draw__(self._fps_text, DashData.rtss_fps), (DashData.rtss_fps,))
 
-        # Motherboard temp (nestled between all the fans)
-        mobo_temperature_value = DashData.best_attempt_read(aida64_data, DashData.motherboard_temp, "0")
-        update_rects.append(self._mobo_temperature_label.draw_update("Mobo"))
-        update_rects.append(self._mobo_temperature.draw_update(mobo_temperature_value))
+        # Ambient temperature and humidity, the main loop keeps the last DHT22 reading until a new one lands
+        scheduler.on_change(self.__draw_temperature_humidity__, watch=lambda aida64_data, dht22_data : dht22_data)
 
-        # Network Info
-        nic1_down_value = DashData.best_attempt_read(aida64_data, DashData.nic1_download_rate, "0")
-        nic1_up_value = DashData.best_attempt_read(aida64_data, DashData.nic1_upload_rate, "0")
-        update_rects.append(self._network_info.draw_update(nic1_down_value, nic1_up_value))
+        # Motherboard temp (nestled between all the fans), the label only needs drawing on full redraws
+        scheduler.on_change(lambda aida64_data, dht22_data : self._mobo_temperature_label.draw_update("Mobo"))
+        scheduler.on_change(self.__field_draw__(self._mobo_temperature, DashData.motherboard_temp), (DashData.motherboard_temp,))
+
+        # Network rates jump around every sample, once a second is readable and plenty
+        scheduler.interval(self.__draw_network_info__, 1000)
 
         # Clock
+        scheduler.wall_second(self.__draw_clock__)
+
+    def __draw_temperature_humidity__(self, aida64_data, dht22_data):
+        if dht22_data is None:
+            return None
+        return self._temperature_humidity.draw_update(dht22_data)
+
+    def __draw_network_info__(self, aida64_data, dht22_data):
+        nic1_down_value = DashData.best_attempt_read(aida64_data, DashData.nic1_download_rate, 0)
+        nic1_up_value = DashData.best_attempt_read(aida64_data, DashData.nic1_upload_rate, 0)
+        return self._network_info.draw_update(nic1_down_value, nic1_up_value)
+
+    def __draw_clock__(self, aida64_data, dht22_data):
         now = datetime.now()
         time_string = now.strftime("%H:%M:%S")
-        update_rects.append(self._clock.draw_update(time_string))
+        return self._clock.draw_update(time_string)
+
+    def backup_element_surface(self):
+        # Blit, copy doesn't work if this is a subsurfaced direct-draw element
+        self._backup_surface = pygame.Surface(self.working_surface.get_size())
+        self._backup_surface.blit(self.working_surface, (0, 0))
+
+    def restore_element_surface(self):
+        if self._backup_surface:
+            self.working_surface.blit(self._backup_surface, (0, 0))
+
+    def draw_update(self, aida64_data, dht22_data=None):
+        assert(0 != len(aida64_data))
+
+        # Track the rects that were updated so we can tell the display surface where to redraw.
+        # Elements that don't require updates will append a None value. The scheduler only calls
+        # elements that are due, see __schedule_elements__ for each element's cadence.
+        return self._scheduler.draw_due(aida64_data, dht22_data)
+
+    def draw_timed(self, dht22_data=None):
+        # Ticks without a sample to draw, keeps the clock and network readout on time
+        return self._scheduler.draw_timed(dht22_data)
 
-        return update_rects
+    def draw_sampled(self, aida64_data, dht22_data=None):
+        # Samples that changed nothing here, graphs keep scrolling with time
+        return self._scheduler.draw_sampled(aida64_data, dht22_data)
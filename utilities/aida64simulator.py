@@ -0,0 +1,360 @@
+#
+# aida64simulator - Local stand-in for the AIDA64 RemoteSensor LCD SSE endpoint
+# ============================================================================
+#
+# Author: Adam J. Bauman (https://gist.github.com/adambauman)
+#
+# Serves the same "data: Page0|{|}Simple1|cpu_util 16{|}..." stream AIDA64 does, one thread per client.
+# Fields come from the .rslcd layout export, numeric values follow a waveform between the DashData
+# min/max limits. Can drop or stall connections on a schedule to exercise reconnect handling.
+#
+# Run from the repository root: python3 -m utilities.aida64simulator --port 8080 --interval 10
+# then point the dash at it: python3 neuromancerdash.py --aidasse http://localhost:8080/sse
+#
+
+import sys, getopt
+import math
+import random
+import threading
+from time import perf_counter, sleep
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from data.aida64layout import AIDA64Layout
+from data.aida64replay import AIDA64Replay
+from data.aida64lcdsse import AIDA64LCDSSE
+from data.dataobjects import DashData
+
+g_default_stream_file = "assets/aida64_layouts/stream_response_example.txt"
+
+class Waveform:
+    kinds = ("sine", "square", "saw", "random", "constant")
+
+    def __init__(self, kind="sine", low=0.0, high=100.0, period=10.0, phase=0.0):
+        assert(kind in Waveform.kinds)
+        assert(0 < period)
+
+        self.kind = kind
+        self.low = low
+        self.high = high
+        self.period = period
+        self.phase = phase
+
+    def value(self, seconds):
+        # Position in the current cycle, 0.0-1.0
+        cycle = ((seconds / self.period) + self.phase) % 1.0
+
+        if "sine" == self.kind:
+            level = (math.sin(cycle * 2 * math.pi) + 1) / 2
+        elif "square" == self.kind:
+            level = 1.0 if 0.5 > cycle else 0.0
+        elif "saw" == self.kind:
+            level = cycle
+        elif "random" == self.kind:
+            level = random.random()
+        else:
+            level = 0.5
+
+        return self.low + ((self.high - self.low) * level)
+
+class SimulatedField:
+    def __init__(self, field_name, value_type, waveform=None, constant_text=None):
+        self.field_name = field_name
+        self.value_type = value_type
+        self.waveform = waveform
+        self.constant_text = constant_text
+
+    def value_text(self, seconds):
+        if self.waveform is None:
+            return self.constant_text
+
+        value = self.waveform.value(seconds)
+        if int is self.value_type:
+            return str(int(round(value)))
+
+        return "{:.3f}".format(value)
+
+class SimulatorConfig:
+    def __init__(self):
+        self.host = "localhost"
+        self.port = 8080
+        self.interval_ms = 100.0
+        self.layout_file = AIDA64Layout.default_layout_file
+        self.default_waveform = "sine"
+        self.field_overrides = {}
+        self.extra_field_count = 0
+
+        # Splits the fields into consecutive AIDA64 pages, one interval in milliseconds per page.
+        # Empty streams everything as Page0 every interval_ms.
+        self.page_intervals_ms = []
+
+        # Reconnect testing, 0 disables. Clients are dropped after disconnect_seconds, every
+        # stall_every_seconds the stream goes quiet for stall_seconds, reload_every_seconds sends
+        # AIDA64's "reload" message.
+        self.disconnect_seconds = 0.0
+        self.stall_every_seconds = 0.0
+        self.stall_seconds = 0.0
+        self.reload_every_seconds = 0.0
+
+class SharedFrames:
+    # Every client streams the same frame for a given tick, only the first one to ask builds it.
+    # Keeps many clients at 1ms intervals from each spending ~100us formatting identical frames.
+    def __init__(self, simulated_fields, interval, page_index=0):
+        self._simulated_fields = simulated_fields
+        self._page_index = page_index
+        self.interval = interval
+        self._start_time = perf_counter()
+        self._lock = threading.Lock()
+        self._tick = -1
+        self._frame = None
+
+    def frame(self, now):
+        tick = int((now - self._start_time) / self.interval)
+        with self._lock:
+            if tick != self._tick:
+                message_data = AIDA64Simulator.build_message(
+                    self._simulated_fields, tick * self.interval, self._page_index)
+                self._frame = "data: {}\r\n\r\n".format(message_data).encode("utf-8")
+                self._tick = tick
+
+            return self._frame
+
+class AIDA64Simulator:
+
+    @staticmethod
+    def build_fields(config):
+        # Text fields keep the values from the captured example, numbers get waveforms
+        example_values = {}
+        example_frames = AIDA64Replay.load_frames(g_default_stream_file)
+        if 0 != len(example_frames):
+            example_values = AIDA64LCDSSE.__parse_data__(example_frames[0][1])
+
+        field_names = [layout_item.field_name for layout_item in AIDA64Layout.load(config.layout_file)]
+        field_names += ["sim{}_value".format(index) for index in range(config.extra_field_count)]
+
+        field_registry = DashData.field_registry()
+        simulated_fields = []
+        for index, field_name in enumerate(field_names):
+            data_field = None
+            slot = field_registry.slots.get(field_name)
+            if slot is not None:
+                data_field = field_registry.data_fields[slot]
+
+            value_type = int
+            if data_field is not None and data_field.value_type is not None:
+                value_type = data_field.value_type
+
+            if str is value_type:
+                simulated_fields.append(
+                    SimulatedField(field_name, str, constant_text=example_values.get(field_name, "Simulated")))
+                continue
+
+            low, high = 0.0, 100.0
+            if data_field is not None and data_field.min_value is not None and data_field.max_value is not None:
+                low, high = data_field.min_value, data_field.max_value
+
+            # Spread periods and phases out so fields don't all move in lockstep
+            waveform = Waveform(config.default_waveform, low, high, 5.0 + (index % 7) * 2.5, (index * 0.13) % 1.0)
+
+            override = config.field_overrides.get(field_name)
+            if override is not None:
+                waveform = override
+
+            simulated_fields.append(SimulatedField(field_name, value_type, waveform))
+
+        return simulated_fields
+
+    @staticmethod
+    def build_message(simulated_fields, seconds, page_index=0):
+        items = ["Page{}|{{|}}".format(page_index)]
+        for index, simulated_field in enumerate(simulated_fields):
+            items.append("Simple{}|{} {}{{|}}".format(index + 1, simulated_field.field_name, simulated_field.value_text(seconds)))
+
+        return "".join(items)
+
+    @staticmethod
+    def build_pages(config, simulated_fields):
+        # Returns a SharedFrames per streamed page
+        if 0 == len(config.page_intervals_ms):
+            return [SharedFrames(simulated_fields, config.interval_ms / 1000)]
+
+        page_count = len(config.page_intervals_ms)
+        page_size = (len(simulated_fields) + page_count - 1) // page_count
+        return [
+            SharedFrames(simulated_fields[page_index * page_size:(page_index + 1) * page_size], interval_ms / 1000, page_index)
+            for page_index, interval_ms in enumerate(config.page_intervals_ms)]
+
+    @classmethod
+    def make_handler(class_object, config, shared_pages):
+
+        class SimulatorHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Access-Control-Allow-Origin", "*")
+                self.end_headers()
+
+                client = "{}:{}".format(*self.client_address[:2])
+                print("Client connected {}".format(client))
+
+                start_time = perf_counter()
+                next_times = [start_time] * len(shared_pages)
+                next_stall_time = start_time + config.stall_every_seconds
+                next_reload_time = start_time + config.reload_every_seconds
+                frames_sent = 0
+                late_frames = 0
+                try:
+                    while True:
+                        now = perf_counter()
+                        elapsed = now - start_time
+                        if 0 < config.disconnect_seconds and config.disconnect_seconds <= elapsed:
+                            print("Dropping {} after {:.1f}s".format(client, elapsed))
+                            break
+
+                        if 0 < config.stall_every_seconds and next_stall_time <= now:
+                            print("Stalling {} for {:.1f}s".format(client, config.stall_seconds))
+                            sleep(config.stall_seconds)
+                            next_stall_time = perf_counter() + config.stall_every_seconds
+                            next_times = [perf_counter()] * len(shared_pages)
+
+                        if 0 < config.reload_every_seconds and next_reload_time <= now:
+                            self.wfile.write(b"data: reload\r\n\r\n")
+                            next_reload_time = now + config.reload_every_seconds
+
+                        # Send whichever page is due next
+                        page_index = min(range(len(shared_pages)), key=next_times.__getitem__)
+                        shared_frames = shared_pages[page_index]
+                        self.wfile.write(shared_frames.frame(now))
+                        frames_sent += 1
+
+                        # Schedule against the start so the rate holds, pages due together go back to back.
+                        # Count frames that fell a whole interval behind and restart their schedule.
+                        next_times[page_index] += shared_frames.interval
+                        delay = min(next_times) - perf_counter()
+                        if 0 < delay:
+                            sleep(delay)
+                        elif -shared_frames.interval > next_times[page_index] - perf_counter():
+                            late_frames += 1
+                            next_times[page_index] = perf_counter()
+
+                except ConnectionError:
+                    pass
+
+                elapsed = perf_counter() - start_time
+                print("Client gone {}, {} frame(s) in {:.1f}s ({:.1f}/s), {} late".format(
+                    client, frames_sent, elapsed, frames_sent / elapsed if 0 < elapsed else 0, late_frames))
+                self.close_connection = True
+
+        return SimulatorHandler
+
+    @classmethod
+    def serve(class_object, config):
+        assert(1 <= config.interval_ms)
+
+        simulated_fields = class_object.build_fields(config)
+        shared_pages = class_object.build_pages(config, simulated_fields)
+        server = ThreadingHTTPServer((config.host, config.port), class_object.make_handler(config, shared_pages))
+        server.daemon_threads = True
+
+        print("Simulating {} field(s) on {} page(s) every {}ms on http://{}:{}/sse".format(
+            len(simulated_fields), len(shared_pages),
+            "/".join("{:g}".format(shared_frames.interval * 1000) for shared_frames in shared_pages),
+            config.host, config.port))
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+        server.server_close()
+
+    @staticmethod
+    def parse_field_override(override_text):
+        # name=kind[:low:high[:period]], ex: cpu_temp=square:30:90:4
+        field_name, waveform_text = override_text.split("=", 1)
+        waveform_parts = waveform_text.split(":")
+
+        waveform = Waveform(waveform_parts[0])
+        if 3 <= len(waveform_parts):
+            waveform.low, waveform.high = float(waveform_parts[1]), float(waveform_parts[2])
+        if 4 <= len(waveform_parts):
+            waveform.period = float(waveform_parts[3])
+
+        return field_name, waveform
+
+
+def print_usage():
+    print("")
+    print("Usage: python3 -m utilities.aida64simulator <options>")
+    print("Example: python3 -m utilities.aida64simulator --port 8080 --interval 1 --field cpu_temp=square:30:90:4")
+    print("")
+    print("       Options:")
+    print("           --host <address to bind, default localhost>")
+    print("           --port <port, default 8080>")
+    print("           --interval <milliseconds between frames, 1 or more, default 100>")
+    print("           --pages <comma separated milliseconds per page, splits the fields into that many pages>")
+    print("           --layout <AIDA64 .rslcd export the field set is read from>")
+    print("           --extrafields <count of synthetic fields to add for parser load>")
+    print("           --waveform <sine|square|saw|random|constant, default sine>")
+    print("           --field <name=kind[:low:high[:period seconds]], repeatable>")
+    print("           --disconnect <drop clients after this many seconds>")
+    print("           --stall <every seconds:stall seconds, stream goes quiet without disconnecting>")
+    print("           --reload <send an AIDA64 reload message every this many seconds>")
+
+def get_command_args(argv):
+    config = SimulatorConfig()
+    try:
+        opts, args = getopt.getopt(
+            argv, "h",
+            ["host=", "port=", "interval=", "pages=", "layout=", "extrafields=", "waveform=", "field=", "disconnect=",
+             "stall=", "reload="])
+
+    except getopt.GetoptError:
+        print_usage()
+        sys.exit(2)
+
+    for opt, arg in opts:
+        if opt == '-h':
+            print_usage()
+            sys.exit()
+        elif opt == "--host":
+            config.host = arg
+        elif opt == "--port":
+            config.port = int(arg)
+        elif opt == "--interval":
+            config.interval_ms = max(1.0, float(arg))
+        elif opt == "--pages":
+            config.page_intervals_ms = [max(1.0, float(interval_ms)) for interval_ms in arg.split(",")]
+        elif opt == "--layout":
+            config.layout_file = arg
+        elif opt == "--extrafields":
+            config.extra_field_count = int(arg)
+        elif opt == "--waveform":
+            assert(arg in Waveform.kinds)
+            config.default_waveform = arg
+        elif opt == "--field":
+            field_name, waveform = AIDA64Simulator.parse_field_override(arg)
+            config.field_overrides[field_name] = waveform
+        elif opt == "--disconnect":
+            config.disconnect_seconds = float(arg)
+        elif opt == "--stall":
+            stall_every, stall_duration = arg.split(":")
+            config.stall_every_seconds = float(stall_every)
+            config.stall_seconds = float(stall_duration)
+        elif opt == "--reload":
+            config.reload_every_seconds = float(arg)
+
+    return config
+
+def main(argv):
+    config = get_command_args(argv)
+    AIDA64Simulator.serve(config)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
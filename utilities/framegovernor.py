@@ -0,0 +1,52 @@
+#
+# framegovernor - Paces the render loop with pygame.time.Clock instead of the AIDA64 frame rate
+# ===========================================================================================
+#
+# Author: Adam J. Bauman (https://gist.github.com/adambauman)
+#
+# Each tick is capped at target_fps and hands back the newest sample from the mailbox, anything that
+# landed in between was already coalesced into it. Ticks with nothing new are skipped. While the feed
+# is quiet the loop still wakes idle_fps times a second for events and stall checks, a sample landing
+# during that wait is picked up straight away rather than on the next idle tick.
+#
+
+import pygame
+
+class FrameGovernor:
+
+    def __init__(self, target_fps=30, idle_fps=4):
+        assert(0 < idle_fps <= target_fps)
+
+        self.target_fps = target_fps
+        self.idle_fps = idle_fps
+        self.clock = pygame.time.Clock()
+
+        self.tick_count = 0
+        self.rendered_count = 0
+        self.skipped_count = 0
+
+    def next_sample(self, mailbox):
+        # Returns the newest sample for this tick, None if there's nothing new to render
+        self.clock.tick(self.target_fps)
+        self.tick_count += 1
+
+        sample = mailbox.take(0)
+        if sample is None:
+            # Sleep out the rest of an idle tick, woken early if a sample is published
+            sample = mailbox.take(max(0, (1.0 / self.idle_fps) - (1.0 / self.target_fps)))
+
+        if sample is None:
+            self.skipped_count += 1
+        else:
+            self.rendered_count += 1
+
+        return sample
+
+    def skipped(self):
+        # A sample was taken but nothing on the visible page changed
+        self.rendered_count -= 1
+        self.skipped_count += 1
+
+    def describe(self):
+        return "Frame governor: {:.1f} ticks/s (target {}, idle {}), {} tick(s), {} rendered, {} skipped".format(
+            self.clock.get_fps(), self.target_fps, self.idle_fps, self.tick_count, self.rendered_count, self.skipped_count)
@@ -0,0 +1,118 @@
+#
+# parserbenchmark - Compares AIDA64 SSE frame parser throughput using a captured stream response
+# ==============================================================================================
+#
+# Author: Adam J. Bauman (https://gist.github.com/adambauman)
+#
+# Run from the repository root: python3 -m utilities.parserbenchmark --iterations 20000
+#
+
+import sys, getopt
+import timeit
+
+from data.aida64lcdsse import AIDA64LCDSSE
+from data.dataobjects import DashData
+
+g_default_stream_file = "assets/aida64_layouts/stream_response_example.txt"
+g_default_iterations = 10000
+
+# Roughly what the Power page reads, the rails plus utilization
+g_subscribed_fields = frozenset(data_field.field_name for data_field in (
+    DashData.volts_12, DashData.volts_5, DashData.volts_3_3, DashData.volts_dimm, DashData.volts_cpu_vid,
+    DashData.volts_cpu_core, DashData.volts_gpu_core, DashData.cpu_util, DashData.gpu_util))
+
+def load_message_datas(stream_file):
+    # Pull out the payload of each SSE data line, skip the HTTP response header
+    message_datas = []
+    with open(stream_file, "r") as stream:
+        for line in stream:
+            line = line.rstrip("\r\n")
+            if line.startswith("data: "):
+                message_datas.append(line[len("data: "):])
+
+    assert(0 != len(message_datas))
+    return message_datas
+
+def parse_and_convert(message_data):
+    # What the split parser costs once elements have run their own float() conversions
+    parsed_datas = AIDA64LCDSSE.__parse_data__(message_data)
+    for key in parsed_datas:
+        try:
+            parsed_datas[key] = float(parsed_datas[key])
+        except ValueError:
+            pass
+
+    return parsed_datas
+
+def run_benchmark(name, parse_method, message_datas, iterations):
+    def parse_all():
+        for message_data in message_datas:
+            parse_method(message_data)
+
+    elapsed_seconds = timeit.timeit(parse_all, number=iterations)
+    frame_count = iterations * len(message_datas)
+    field_count = len(parse_method(message_datas[0]))
+
+    print("{:<13} {:>10.1f} frames/s {:>10.2f} us/frame ({} fields)".format(
+        name, frame_count / elapsed_seconds, (elapsed_seconds / frame_count) * 1000000, field_count))
+
+    return elapsed_seconds
+
+def print_usage():
+    print("")
+    print("Usage: python3 -m utilities.parserbenchmark --file <captured SSE stream> --iterations <count>")
+    print("Example: python3 -m utilities.parserbenchmark --iterations 20000")
+
+def get_command_args(argv):
+    stream_file = g_default_stream_file
+    iterations = g_default_iterations
+    try:
+        opts, args = getopt.getopt(argv, "h", ["file=", "iterations="])
+
+    except getopt.GetoptError:
+        print_usage()
+        sys.exit(2)
+
+    for opt, arg in opts:
+        if opt == '-h':
+            print_usage()
+            sys.exit()
+        elif opt == "--file":
+            stream_file = arg
+        elif opt == "--iterations":
+            iterations = int(arg)
+
+    return stream_file, iterations
+
+def main(argv):
+    stream_file, iterations = get_command_args(argv)
+    message_datas = load_message_datas(stream_file)
+
+    # Sanity check, both parsers should find the same keys
+    legacy_keys = AIDA64LCDSSE.__parse_data__(message_datas[0]).keys()
+    typed_keys = AIDA64LCDSSE.__parse_typed_data__(message_datas[0]).keys()
+    assert(legacy_keys == typed_keys)
+
+    print("Parsing {} frame(s) from {}, {} iterations".format(len(message_datas), stream_file, iterations))
+    legacy_seconds = run_benchmark("split parser", AIDA64LCDSSE.__parse_data__, message_datas, iterations)
+    converted_seconds = run_benchmark("split+float", parse_and_convert, message_datas, iterations)
+    typed_seconds = run_benchmark("typed parser", AIDA64LCDSSE.__parse_typed_data__, message_datas, iterations)
+    print("Typed parser speedup: {:.2f}x vs split, {:.2f}x vs split+float".format(
+        legacy_seconds / typed_seconds, converted_seconds / typed_seconds))
+
+    # What the dash decodes with a page's field subscription, typed like the ingestion thread does
+    field_types = DashData.field_types()
+    full_seconds = run_benchmark(
+        "typed+types", lambda message_data : AIDA64LCDSSE.__parse_typed_data__(message_data, field_types),
+        message_datas, iterations)
+    subscribed_seconds = run_benchmark(
+        "subscribed",
+        lambda message_data : AIDA64LCDSSE.__parse_typed_data__(
+            message_data, field_types, None, g_subscribed_fields, []),
+        message_datas, iterations)
+    print("Subscription speedup: {:.2f}x decoding {} of the fields".format(
+        full_seconds / subscribed_seconds, len(g_subscribed_fields)))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -165,6 +165,8 @@ class MatrixScreensaver:
             # Process events to avoid freezing behavior
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
+                    # Hand the quit back so the caller's event loop sees it too
+                    pygame.event.post(event)
                     return
 
             if cls.__is_written__(max_letters, x_heads, startup_message):
@@ -245,6 +247,8 @@ class MatrixScreensaver:
             # Process events to avoid freezing behavior
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
+                    # Hand the quit back so the caller's event loop sees it too
+                    pygame.event.post(event)
                     return
 
             if random.randint(1, 2) == 1:
@@ -0,0 +1,142 @@
+#
+# ssebenchmark - Compares the built-in AIDA64 SSE transport against sseclient/requests
+# ===================================================================================
+#
+# Author: Adam J. Bauman (https://gist.github.com/adambauman)
+#
+# Reads the same live stream with each transport for a fixed time and reports events per second
+# and reading thread CPU per event, plus what importing each stack costs. Start the simulator
+# first, a short interval shows the per-event cost best:
+#   python3 -m utilities.aida64simulator --port 8080 --interval 1
+#   python3 -m utilities.ssebenchmark --url http://localhost:8080/sse --seconds 10
+#
+
+import sys, getopt
+import asyncio
+import subprocess
+from time import perf_counter, thread_time
+
+from data.aida64lcdsse import AIDA64LCDSSE
+from data.dataobjects import DashData
+
+g_default_url = "http://localhost:8080/sse"
+g_default_seconds = 10.0
+
+class TransportResult:
+    def __init__(self, name):
+        self.name = name
+        self.event_count = 0
+        self.byte_count = 0
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.import_ms = 0.0
+
+    def describe(self):
+        events_per_second = self.event_count / self.wall_seconds if 0 < self.wall_seconds else 0
+        cpu_us = (self.cpu_seconds / self.event_count) * 1000000 if 0 != self.event_count else 0
+        return "{:<10} {:>8} event(s) {:>9.1f} events/s {:>8.1f} us CPU/event {:>7.1f} ms import".format(
+            self.name, self.event_count, events_per_second, cpu_us, self.import_ms)
+
+def measure_import_ms(module_names):
+    # Fresh interpreter so nothing is already cached in sys.modules
+    code = "import time; start = time.perf_counter(); import {}; print(time.perf_counter() - start)".format(
+        ", ".join(module_names))
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    return float(output) * 1000
+
+def handle_payload(result, message_data, field_types):
+    # Same per-event work the dash does before publishing, optionally including the parse
+    if 0 == len(message_data) or "reload" == message_data.lower():
+        return
+
+    result.event_count += 1
+    result.byte_count += len(message_data)
+    if field_types is not None:
+        AIDA64LCDSSE.__parse_typed_data__(message_data, field_types)
+
+def run_sseclient(url, seconds, field_types):
+    result = TransportResult("sseclient")
+    result.import_ms = measure_import_ms(["sseclient"])
+
+    from sseclient import SSEClient
+
+    server_messages = SSEClient(url, timeout=5.0)
+    cpu_start = thread_time()
+    wall_start = perf_counter()
+    for server_message in server_messages:
+        handle_payload(result, server_message.data, field_types)
+        if seconds <= perf_counter() - wall_start:
+            break
+
+    result.wall_seconds = perf_counter() - wall_start
+    result.cpu_seconds = thread_time() - cpu_start
+    server_messages.resp.close()
+    return result
+
+def run_builtin(url, seconds, field_types):
+    result = TransportResult("built-in")
+    result.import_ms = measure_import_ms(["asyncio", "urllib.parse"])
+
+    async def read():
+        try:
+            await asyncio.wait_for(
+                AIDA64LCDSSE.read_sse(url, lambda message_data : handle_payload(result, message_data, field_types)),
+                seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    cpu_start = thread_time()
+    wall_start = perf_counter()
+    asyncio.run(read())
+    result.wall_seconds = perf_counter() - wall_start
+    result.cpu_seconds = thread_time() - cpu_start
+    return result
+
+
+def print_usage():
+    print("")
+    print("Usage: python3 -m utilities.ssebenchmark --url <SSE stream> --seconds <per transport> [--parse]")
+    print("Example: python3 -m utilities.ssebenchmark --url http://localhost:8080/sse --seconds 10")
+
+def get_command_args(argv):
+    url = g_default_url
+    seconds = g_default_seconds
+    parse = False
+    try:
+        opts, args = getopt.getopt(argv, "h", ["url=", "seconds=", "parse"])
+
+    except getopt.GetoptError:
+        print_usage()
+        sys.exit(2)
+
+    for opt, arg in opts:
+        if opt == '-h':
+            print_usage()
+            sys.exit()
+        elif opt == "--url":
+            url = arg
+        elif opt == "--seconds":
+            seconds = float(arg)
+        elif opt == "--parse":
+            parse = True
+
+    return url, seconds, parse
+
+def main(argv):
+    url, seconds, parse = get_command_args(argv)
+    field_types = DashData.field_types() if parse else None
+
+    print("Reading {} for {:.1f}s per transport{}".format(url, seconds, ", parsing each event" if parse else ""))
+    results = [run_sseclient(url, seconds, field_types), run_builtin(url, seconds, field_types)]
+    for result in results:
+        print(result.describe())
+
+    sseclient_result, builtin_result = results
+    if 0 != sseclient_result.event_count and 0 != builtin_result.event_count and 0 < builtin_result.cpu_seconds:
+        print("Built-in CPU/event speedup: {:.2f}x".format(
+            (sseclient_result.cpu_seconds / sseclient_result.event_count) /
+            (builtin_result.cpu_seconds / builtin_result.event_count)))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])